@@ -1,10 +1,8 @@
 from flask import Flask
+from typing import Any
 import logging
 import sys
 
-from app.services.threadPoolExecutor import AsyncThreadPoolExecutor
-from app.services.batch_processor import GlobalBatchProcessor
-
 logger: logging.Logger = logging.getLogger(__name__)
 
 
@@ -39,6 +37,23 @@ def create_app():
     return app
 
 
-# Instância global
-batch_processor = GlobalBatchProcessor()
-async_executor = AsyncThreadPoolExecutor(max_workers=10)
+# Instâncias globais (criadas sob demanda para que submódulos como
+# app.integrations.decrypt possam ser importados sem conectar aos bancos)
+_instances: dict[str, Any] = {}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in ("batch_processor", "async_executor"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    if name not in _instances:
+        if name == "batch_processor":
+            from app.services.batch_processor import GlobalBatchProcessor
+
+            _instances[name] = GlobalBatchProcessor()
+        else:
+            from app.services.threadPoolExecutor import AsyncThreadPoolExecutor
+
+            _instances[name] = AsyncThreadPoolExecutor(max_workers=10)
+
+    return _instances[name]
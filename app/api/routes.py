@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, abort, render_template, request
 import logging
 
+from app.services.mediaStore import media_store
+from app.utils.metrics import metrics
+
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -18,3 +21,20 @@ def home():
 @main_bp.route("/static/<path:filename>")
 def serve_static(filename: str):
     return main_bp.send_static_file(filename)
+
+
+# Rota para servir mídias mantidas em memória (URLs assinadas e temporárias)
+@main_bp.route("/media/<blob_id>")
+def serve_media(blob_id: str):
+    blob = media_store.get(
+        blob_id, request.args.get("expires", ""), request.args.get("sig", "")
+    )
+    if blob is None:
+        abort(404)
+    return Response(blob.data, mimetype=blob.mimetype)
+
+
+# Rota para exportar as métricas do processo (formato texto do Prometheus)
+@main_bp.route("/metrics")
+def export_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
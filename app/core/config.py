@@ -10,18 +10,160 @@ class Config:
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4.1-mini-2025-04-14")
     OPENAI_PROMPT_ID: str = os.getenv("OPENAI_PROMPT_ID", "")
     PROMPT_ID_VERSION: str = os.getenv("PROMPT_ID_VERSION", "1")
+    # Usa o cliente assíncrono (não bloqueia o event loop durante as chamadas)
+    OPENAI_ASYNC: bool = os.getenv("OPENAI_ASYNC", "true").lower() == "true"
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "10"))
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "60"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+    # Imagens reduzidas e recomprimidas antes da OpenAI (requer Pillow)
+    IMAGE_PREPROCESS_ENABLED: bool = (
+        os.getenv("IMAGE_PREPROCESS_ENABLED", "false").lower() == "true"
+    )
+    IMAGE_MAX_DIMENSION: int = int(os.getenv("IMAGE_MAX_DIMENSION", "1536"))
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+    IMAGE_CACHE_TTL: int = int(os.getenv("IMAGE_CACHE_TTL", "86400"))
+    # Texto extraído dos documentos enviado no lugar do arquivo (cache por hash)
+    DOCUMENT_EXTRACTION_ENABLED: bool = (
+        os.getenv("DOCUMENT_EXTRACTION_ENABLED", "false").lower() == "true"
+    )
+    # Limitado a HISTORY_ITEM_MAX_TOKENS: o orçamento do histórico conta cada documento por esse valor
+    DOCUMENT_MAX_TOKENS: int = int(os.getenv("DOCUMENT_MAX_TOKENS", "2000"))
+    DOCUMENT_CHUNK_TOKENS: int = int(os.getenv("DOCUMENT_CHUNK_TOKENS", "500"))
+    DOCUMENT_CACHE_TTL: int = int(os.getenv("DOCUMENT_CACHE_TTL", "86400"))
+    # Áudios longos: trechos de N segundos (com sobreposição) transcritos em paralelo
+    TRANSCRIBE_LONG_AUDIO: bool = (
+        os.getenv("TRANSCRIBE_LONG_AUDIO", "false").lower() == "true"
+    )
+    TRANSCRIBE_CHUNK_SECONDS: float = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "60"))
+    TRANSCRIBE_CHUNK_OVERLAP: float = float(
+        os.getenv("TRANSCRIBE_CHUNK_OVERLAP", "1.5")
+    )
+    TRANSCRIBE_MAX_PARALLEL: int = int(os.getenv("TRANSCRIBE_MAX_PARALLEL", "4"))
+    # Fila de envio para a Evolution (mensagens/s global, intervalo por número e tamanho máximo)
+    DELIVERY_QUEUE_ENABLED: bool = (
+        os.getenv("DELIVERY_QUEUE_ENABLED", "false").lower() == "true"
+    )
+    DELIVERY_GLOBAL_RATE: float = float(os.getenv("DELIVERY_GLOBAL_RATE", "10"))
+    DELIVERY_GLOBAL_BURST: int = int(os.getenv("DELIVERY_GLOBAL_BURST", "20"))
+    DELIVERY_PER_NUMBER_INTERVAL: float = float(
+        os.getenv("DELIVERY_PER_NUMBER_INTERVAL", "1")
+    )
+    DELIVERY_MAX_CHARS: int = int(os.getenv("DELIVERY_MAX_CHARS", "1500"))
+    # Escrita do histórico: mensagem do usuário e resposta juntas, em lote entre conversas
+    HISTORY_WRITE_BEHIND: bool = (
+        os.getenv("HISTORY_WRITE_BEHIND", "false").lower() == "true"
+    )
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.05"))
+    HISTORY_FLUSH_MAX_BATCH: int = int(os.getenv("HISTORY_FLUSH_MAX_BATCH", "200"))
+    # Outbox das respostas (tentativas até o dead-letter, backoff, reserva e
+    # permanência no dead-letter em segundos)
+    OUTBOX_ENABLED: bool = os.getenv("OUTBOX_ENABLED", "false").lower() == "true"
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BACKOFF_BASE: float = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+    OUTBOX_BACKOFF_MAX: float = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    OUTBOX_LEASE: float = float(os.getenv("OUTBOX_LEASE", "60"))
+    OUTBOX_DEAD_TTL: int = int(os.getenv("OUTBOX_DEAD_TTL", "604800"))
+    # Circuit breakers (falhas seguidas para abrir e segundos até a próxima sonda)
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    # Hedge: modelo de fallback (vazio desativa) e espera antes de dispará-lo
+    OPENAI_FALLBACK_MODEL: str = os.getenv("OPENAI_FALLBACK_MODEL", "")
+    OPENAI_HEDGE_DELAY: float = float(os.getenv("OPENAI_HEDGE_DELAY", "8"))
+    OPENAI_HEDGE_MIN_DELAY: float = float(os.getenv("OPENAI_HEDGE_MIN_DELAY", "1"))
+    # Envia só o batch novo com previous_response_id (contexto mantido pela OpenAI)
+    OPENAI_INCREMENTAL_CONTEXT: bool = (
+        os.getenv("OPENAI_INCREMENTAL_CONTEXT", "false").lower() == "true"
+    )
+    OPENAI_RESPONSE_CHAIN_TTL: int = int(
+        os.getenv("OPENAI_RESPONSE_CHAIN_TTL", "86400")
+    )
+    # Histórico enviado à OpenAI limitado por tokens (mais recentes primeiro)
+    HISTORY_MAX_MESSAGES: int = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+    HISTORY_ITEM_MAX_TOKENS: int = int(os.getenv("HISTORY_ITEM_MAX_TOKENS", "2000"))
+    # Resumo incremental das mensagens antigas (mantém as últimas SUMMARY_KEEP_MESSAGES)
+    SUMMARY_ENABLED: bool = os.getenv("SUMMARY_ENABLED", "false").lower() == "true"
+    SUMMARY_KEEP_MESSAGES: int = int(os.getenv("SUMMARY_KEEP_MESSAGES", "20"))
+    SUMMARY_MIN_BATCH: int = int(os.getenv("SUMMARY_MIN_BATCH", "10"))
+    SUMMARY_MODEL: str = os.getenv("SUMMARY_MODEL", OPENAI_MODEL)
+    SUMMARY_MAX_TOKENS: int = int(os.getenv("SUMMARY_MAX_TOKENS", "500"))
+    # Roteamento de modelo por batch (regras em JSON; vazio usa as rotas padrão)
+    MODEL_ROUTING_ENABLED: bool = (
+        os.getenv("MODEL_ROUTING_ENABLED", "false").lower() == "true"
+    )
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-4.1-nano")
+    OPENAI_STRONG_MODEL: str = os.getenv("OPENAI_STRONG_MODEL", OPENAI_MODEL)
+    MODEL_ROUTES: str = os.getenv("MODEL_ROUTES", "")
+    MODEL_PRICES: str = os.getenv("MODEL_PRICES", "")
+    # Cache de respostas para perguntas repetidas em conversas sem contexto
+    REPLY_CACHE_ENABLED: bool = (
+        os.getenv("REPLY_CACHE_ENABLED", "false").lower() == "true"
+    )
+    REPLY_CACHE_MAX_ENTRIES: int = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "1000"))
+    REPLY_CACHE_TTL: int = int(os.getenv("REPLY_CACHE_TTL", "3600"))
+    REPLY_CACHE_MAX_HISTORY: int = int(os.getenv("REPLY_CACHE_MAX_HISTORY", "1"))
+    # Envio da resposta em trechos à medida que o modelo gera (streaming)
+    OPENAI_STREAMING: bool = os.getenv("OPENAI_STREAMING", "false").lower() == "true"
+    STREAM_MIN_CHUNK_CHARS: int = int(os.getenv("STREAM_MIN_CHUNK_CHARS", "80"))
+    STREAM_FLUSH_TIMEOUT: float = float(os.getenv("STREAM_FLUSH_TIMEOUT", "2.5"))
+    # Limite de requisições/tokens por minuto compartilhado entre instâncias (Redis)
+    OPENAI_RATE_LIMIT_ENABLED: bool = (
+        os.getenv("OPENAI_RATE_LIMIT_ENABLED", "false").lower() == "true"
+    )
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", "500"))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", "200000"))
+    OPENAI_RATE_LIMIT_MAX_WAIT: float = float(
+        os.getenv("OPENAI_RATE_LIMIT_MAX_WAIT", "120")
+    )
 
     # Configuração da EvolutionAPI
     EVOLUTION_APIKEY: str = os.getenv("EVOLUTION_APIKEY", "")
     EVOLUTION_SERVER_URL: str = os.getenv("EVOLUTION_SERVER_URL", "")
     EVOLUTION_NAME_INSTANCE: str = os.getenv("EVOLUTION_NAME_INSTANCE", "")
 
+    # Configuração da descriptografia de mídias (tamanho do bloco de leitura em bytes)
+    DECRYPT_CHUNK_SIZE: int = int(os.getenv("DECRYPT_CHUNK_SIZE", "65536"))
+    # Onde a descriptografia é executada: inline, thread ou process
+    DECRYPT_EXECUTOR_MODE: str = os.getenv("DECRYPT_EXECUTOR_MODE", "thread")
+    # Número de workers do pool (0 = número de CPUs)
+    DECRYPT_WORKERS: int = int(os.getenv("DECRYPT_WORKERS", "0"))
+
+    # Configuração do cliente HTTP compartilhado (CDN do WhatsApp e EvolutionAPI)
+    HTTP_CLIENT_HTTP2: bool = os.getenv("HTTP_CLIENT_HTTP2", "false").lower() == "true"
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(
+        os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")
+    )
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+
+    # Entrega de mídias para a OpenAI: "url" (pasta static/ via ngrok) ou "memory"
+    MEDIA_HANDOFF_MODE: str = os.getenv("MEDIA_HANDOFF_MODE", "url")
+    # No modo "memory", mídias até este tamanho vão inline (base64) na requisição
+    MEDIA_INLINE_MAX_BYTES: int = int(os.getenv("MEDIA_INLINE_MAX_BYTES", "4194304"))
+    # Mídias maiores ficam em memória e são servidas por URL assinada
+    MEDIA_URL_TTL: int = int(os.getenv("MEDIA_URL_TTL", "300"))
+    MEDIA_URL_SECRET: str = os.getenv("MEDIA_URL_SECRET", "")
+    MEDIA_STORE_MAX_BYTES: int = int(os.getenv("MEDIA_STORE_MAX_BYTES", "268435456"))
+
+    # Arquivos temporários de mídia em static/ (tempo de vida em segundos e cota)
+    TEMP_FILE_TTL: float = float(os.getenv("TEMP_FILE_TTL", "10"))
+    TEMP_FILES_MAX_BYTES: int = int(os.getenv("TEMP_FILES_MAX_BYTES", "1073741824"))
+
     # Configuração do Ngrok
     NGROK_URL: str = os.getenv("NGROK_URL", ".")
 
     # Configuração do MongoDB
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     MONGO_INITDB_DATABASE: str = os.getenv("MONGO_INITDB_DATABASE", "whatsapp_bot")
+    # Histórico em buckets de mensagens (coleção conversation_buckets) e tamanho de cada bucket
+    MONGO_BUCKETED_HISTORY: bool = (
+        os.getenv("MONGO_BUCKETED_HISTORY", "false").lower() == "true"
+    )
+    MONGO_BUCKET_SIZE: int = int(os.getenv("MONGO_BUCKET_SIZE", "20"))
 
     # Configuração do Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -30,9 +172,20 @@ class Config:
     # Configuração do Supabase
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    # Anexa e lê o histórico por funções no Postgres (requer supabase/migrations aplicadas)
+    SUPABASE_ATOMIC_APPEND: bool = (
+        os.getenv("SUPABASE_ATOMIC_APPEND", "false").lower() == "true"
+    )
 
-    # Escolha do banco de dados (MongoDB ou Supabase)
+    # Supabase como banco principal quando STORAGE_BACKENDS não é definido (legado)
     USE_SUPABASE: bool = os.getenv("USE_SUPABASE", "false").lower() == "true"
+    # Bancos do histórico em ordem de prioridade (mongodb, supabase, sqlite, memory)
+    STORAGE_BACKENDS: str = os.getenv(
+        "STORAGE_BACKENDS", "supabase,mongodb" if USE_SUPABASE else "mongodb,supabase"
+    )
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "history.db")
+    # Intervalo em segundos para verificar os bancos indisponíveis
+    STORAGE_HEALTH_INTERVAL: float = float(os.getenv("STORAGE_HEALTH_INTERVAL", "10"))
 
     # Números autorizados a usar o bot
     AUTHORIZED_NUMBERS: list[str] = (
@@ -1,32 +1,44 @@
 import logging
 
+from app.core.config import Config
+from app.database.memoryStore import MemoryStore
 from app.database.mongoDB import MongoDB
 from app.database.redisQueue import RedisQueue
+from app.database.sqliteStore import SQLiteStore
+from app.database.storageRouter import HistoryStore, StorageRouter
 from app.database.supabaseApp import Supabase
 
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+_BACKENDS = {
+    "mongodb": MongoDB,
+    "supabase": Supabase,
+    "sqlite": lambda: SQLiteStore(Config.SQLITE_PATH),
+    "memory": MemoryStore,
+}
+
+
+def _select_database() -> StorageRouter:
+    """Monta o roteador com os bancos configurados, em ordem de prioridade"""
+    names = [n.strip().lower() for n in Config.STORAGE_BACKENDS.split(",") if n.strip()]
+    unknown = [name for name in names if name not in _BACKENDS]
+    if unknown:
+        raise ValueError(f"Bancos de dados desconhecidos: {', '.join(unknown)}")
 
-def _select_database():
-    """Seleciona o banco de dados baseado na disponibilidade"""
     # Inicia os bancos
-    mongo_db = MongoDB()
-    # Verifica MongoDB primeiro
-    if mongo_db.check_health():
-        logger.info("Usando MongoDB como banco de dados principal")
-        return mongo_db
-
-    supabase_db = Supabase()
-
-    # Se MongoDB falhar, tenta Supabase
-    if supabase_db.check_health():
-        logger.info("MongoDB indisponível, usando Supabase como fallback")
-        return supabase_db
-
-    raise ConnectionError(
-        "Nenhum banco de dados disponível (MongoDB E Supabase offiline)"
-    )
+    backends: list[tuple[str, HistoryStore]] = [
+        (name, _BACKENDS[name]()) for name in names
+    ]
+    router = StorageRouter(backends)
+    if not router.check_health():
+        raise ConnectionError(
+            f"Nenhum banco de dados disponível ({', '.join(names)} offline)"
+        )
+
+    logger.info(f"Usando {router.active} como banco de dados principal")
+    router.start_monitor()
+    return router
 
 
 db_current = _select_database()
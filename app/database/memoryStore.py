@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+import logging
+import threading
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Mensagens mantidas por conversa e validade desde a última escrita
+HISTORY_LIMIT = 100
+CONVERSATION_TTL = timedelta(days=1)
+
+
+@dataclass
+class _Conversation:
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    expires_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    summary: str = ""
+    summary_last_id: str | None = None
+
+
+class MemoryStore:
+    """
+    Histórico em memória, com o mesmo contrato do MongoDB e do Supabase.
+    Não persiste nada: serve para testes, carga local e como último recurso
+    quando todos os bancos estão fora.
+    """
+
+    def __init__(self) -> None:
+        self._conversations: dict[str, _Conversation] = {}
+        self._lock = threading.Lock()
+        self.is_healthy = True
+
+    def check_health(self) -> bool:
+        return self.is_healthy
+
+    def ping(self) -> bool:
+        self.is_healthy = True
+        return True
+
+    def _get(self, phone_number: str) -> _Conversation | None:
+        conversation = self._conversations.get(phone_number)
+        if conversation and conversation.expires_at <= datetime.now(timezone.utc):
+            del self._conversations[phone_number]
+            return None
+        return conversation
+
+    def save(self, phone_number: str, message_data: dict[str, Any]) -> None:
+        """Salva uma mensagem no histórico da conversa com expiração de 1 dia"""
+        self.save_many(phone_number, [message_data])
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        """Salva várias mensagens da conversa"""
+        self.save_bulk({phone_number: messages})
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        """Salva as mensagens de várias conversas"""
+        expires_at = datetime.now(timezone.utc) + CONVERSATION_TTL
+        with self._lock:
+            for phone_number, messages in batches.items():
+                conversation = self._get(phone_number)
+                if conversation is None:
+                    conversation = self._conversations[phone_number] = _Conversation()
+                conversation.messages = (conversation.messages + messages)[
+                    -HISTORY_LIMIT:
+                ]
+                conversation.expires_at = expires_at
+
+    def get_history(self, phone_number: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Recupera as últimas `limit` mensagens da conversa"""
+        with self._lock:
+            conversation = self._get(phone_number)
+            if conversation is None or limit <= 0:
+                return []
+            return list(conversation.messages[-limit:])
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]:
+        """Recupera o resumo das mensagens antigas da conversa"""
+        with self._lock:
+            conversation = self._get(phone_number)
+            if conversation is None:
+                return {"summary": "", "last_id": None}
+            return {
+                "summary": conversation.summary,
+                "last_id": conversation.summary_last_id,
+            }
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None:
+        """Salva o resumo e a última mensagem resumida"""
+        with self._lock:
+            conversation = self._get(phone_number)
+            if conversation is None:
+                conversation = self._conversations[phone_number] = _Conversation(
+                    expires_at=datetime.now(timezone.utc) + CONVERSATION_TTL
+                )
+            conversation.summary = summary
+            conversation.summary_last_id = last_id
@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from app.core.config import Config
 import logging
 from typing import Any
@@ -6,12 +6,34 @@ from datetime import datetime, timedelta, timezone
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Mensagens mantidas por conversa e validade desde a última escrita
+HISTORY_LIMIT = 100
+CONVERSATION_TTL = timedelta(days=1)
+
 
 class MongoDB:
-    def __init__(self) -> None:
+    """
+    Histórico das conversas no MongoDB. No layout padrão cada telefone tem um
+    documento com o array `messages`. Com `bucketed`, as mensagens ficam em
+    buckets de até `bucket_size` mensagens (coleção conversation_buckets) e o
+    documento da conversa guarda só o resumo. Assim cada escrita altera um
+    documento pequeno, a leitura busca só os últimos buckets e a expiração
+    fica com o índice TTL.
+    """
+
+    def __init__(
+        self,
+        bucketed: bool = Config.MONGO_BUCKETED_HISTORY,
+        bucket_size: int = Config.MONGO_BUCKET_SIZE,
+    ) -> None:
         self.client: MongoClient[Any] | None = None
         self.db = None
         self.conversations = None
+        self.buckets = None
+        self.bucketed = bucketed
+        self.bucket_size = bucket_size
+        # Buckets necessários para guardar HISTORY_LIMIT mensagens (+1 parcial)
+        self.keep_buckets = -(-HISTORY_LIMIT // bucket_size) + 1
         self.is_healthy = False
         self._initialize_connection()
 
@@ -25,6 +47,7 @@ class MongoDB:
             self.client.admin.command("ping")
             self.db = self.client[Config.MONGO_INITDB_DATABASE]
             self.conversations = self.db["conversations"]
+            self.buckets = self.db["conversation_buckets"]
             self.is_healthy = True
 
             # Cria índices apenas se a conexão estiver saudável
@@ -38,11 +61,27 @@ class MongoDB:
             if self.client:
                 self.db = self.client[Config.MONGO_INITDB_DATABASE]
                 self.conversations = self.db["conversations"]
+                self.buckets = self.db["conversation_buckets"]
 
     def check_health(self) -> bool:
         """Verifica se o MongoDB está respondendo"""
         return self.is_healthy
 
+    def ping(self) -> bool:
+        """Testa a conexão de novo e atualiza is_healthy"""
+        if self.client is None:
+            self._initialize_connection()
+            return self.is_healthy
+        try:
+            self.client.admin.command("ping")
+        except Exception:
+            self.is_healthy = False
+            return False
+        if not self.is_healthy:
+            self.is_healthy = True
+            self._create_indexes()
+        return True
+
     def _create_indexes(self) -> None:
         """Cria índice para melhor performance nas consultas de expiração"""
         if not self.is_healthy or self.conversations is None:
@@ -55,6 +94,16 @@ class MongoDB:
             # Índice para busca por telefone
             self.conversations.create_index([("phone_number", 1)])
 
+            # TTL: o próprio MongoDB remove as conversas expiradas
+            self.conversations.create_index("expires_at", expireAfterSeconds=0)
+
+            if self.bucketed and self.buckets is not None:
+                # Igualdade, ordenação e intervalo: últimos buckets válidos do telefone
+                self.buckets.create_index(
+                    [("phone_number", 1), ("started_at", -1), ("expires_at", 1)]
+                )
+                self.buckets.create_index("expires_at", expireAfterSeconds=0)
+
             logger.info("Índice do MongoDB criados/verificados com sucesso")
 
         except Exception as e:
@@ -66,47 +115,136 @@ class MongoDB:
         message_data: dict[str, Any],
     ) -> None:
         """Salva uma mensagem no histórico da conversa com expiração de 1 dia"""
+        self.save_many(phone_number, [message_data])
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        """Salva várias mensagens da conversa em um único update"""
+        self.save_bulk({phone_number: messages})
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        """Salva as mensagens de várias conversas em um único bulk_write"""
         if not self.is_healthy or self.conversations is None:
             raise ConnectionError("MongoDB não está disponível")
+        if not batches:
+            return
 
-        db = self.conversations
         try:
+            now = datetime.now(timezone.utc)
             # Data de expiração: 1 dia a partir de agora
-            expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+            expires_at = now + CONVERSATION_TTL
+            phones = list(batches)
+            if self.bucketed and self.buckets is not None:
+                operations = [
+                    self._bucket_append(phone, batches[phone], now, expires_at)
+                    for phone in phones
+                ]
+                result = self.buckets.bulk_write(operations, ordered=False)
+                # Um bucket novo foi aberto: fecha os anteriores e descarta os excedentes
+                for index, bucket_id in result.upserted_ids.items():
+                    self._rotate_buckets(phones[index], bucket_id)
+            else:
+                operations = [
+                    self._document_append(phone, batches[phone], now, expires_at)
+                    for phone in phones
+                ]
+                self.conversations.bulk_write(operations, ordered=False)
 
-            db.update_one(
-                {"phone_number": phone_number},
-                {
-                    "$push": {
-                        "messages": {
-                            "$each": [message_data],
-                            "$slice": -100,  # Mantém as últimas 100 mensagens
-                        }
-                    },
-                    "$setOnInsert": {
-                        "created_at": datetime.now(timezone.utc),
-                    },
-                    "$set": {
-                        "update_at": datetime.now(timezone.utc),
-                        "expires_at": expires_at,  # SEMPRE atuliza a expiração
-                    },
-                },
-                upsert=True,
-            )
-            logger.info(f"Conversa salva para {phone_number} - Expira em {expires_at}")
+            if len(phones) == 1:
+                logger.info(f"Conversa salva para {phones[0]} - Expira em {expires_at}")
+            else:
+                logger.info(f"Histórico de {len(phones)} conversas salvo em lote")
         except Exception as e:
             logger.error(f"Erro ao salvar conversa: %s", e)
             raise e
 
+    @staticmethod
+    def _document_append(
+        phone_number: str,
+        messages: list[dict[str, Any]],
+        now: datetime,
+        expires_at: datetime,
+    ) -> UpdateOne:
+        """Anexa as mensagens ao array da conversa e renova a expiração"""
+        return UpdateOne(
+            {"phone_number": phone_number},
+            {
+                "$push": {
+                    "messages": {
+                        "$each": messages,
+                        "$slice": -HISTORY_LIMIT,  # Mantém as últimas 100 mensagens
+                    }
+                },
+                "$setOnInsert": {
+                    "created_at": now,
+                },
+                "$set": {
+                    "update_at": now,
+                    "expires_at": expires_at,  # SEMPRE atuliza a expiração
+                },
+            },
+            upsert=True,
+        )
+
+    def _bucket_append(
+        self,
+        phone_number: str,
+        messages: list[dict[str, Any]],
+        now: datetime,
+        expires_at: datetime,
+    ) -> UpdateOne:
+        """Anexa ao bucket aberto do telefone; sem espaço, o upsert abre outro"""
+        return UpdateOne(
+            {
+                "phone_number": phone_number,
+                "count": {"$lte": self.bucket_size - len(messages)},
+                "closed": {"$ne": True},
+                "expires_at": {"$gt": now},
+            },
+            {
+                "$push": {"messages": {"$each": messages}},
+                "$inc": {"count": len(messages)},
+                "$setOnInsert": {"started_at": now},
+                "$set": {"updated_at": now, "expires_at": expires_at},
+            },
+            upsert=True,
+        )
+
+    def _rotate_buckets(self, phone_number: str, bucket_id: Any) -> None:
+        """
+        Fecha os buckets anteriores ao recém-aberto (só o último recebe
+        mensagens, mantendo a ordem) e remove os que passaram do necessário
+        para HISTORY_LIMIT mensagens.
+        """
+        assert self.buckets is not None
+        self.buckets.update_many(
+            {
+                "phone_number": phone_number,
+                "_id": {"$ne": bucket_id},
+                "closed": {"$ne": True},
+            },
+            {"$set": {"closed": True}},
+        )
+        old = [
+            doc["_id"]
+            for doc in self.buckets.find({"phone_number": phone_number}, {"_id": 1})
+            .sort("started_at", -1)
+            .skip(self.keep_buckets)
+        ]
+        if old:
+            self.buckets.delete_many({"_id": {"$in": old}})
+
     def get_history(
         self,
         phone_number: str,
         limit: int = 10,
     ) -> list[dict[str, Any]]:
-        """Recupera o histórico de conversa, filtrando mensagens expiradas"""
+        """Recupera as últimas mensagens do histórico da conversa"""
         if not self.is_healthy or self.conversations is None:
             raise ConnectionError("MongoDB não está disponível")
 
+        if self.bucketed:
+            return self._get_bucketed_history(phone_number, limit)
+
         db = self.conversations
         try:
             # Busca a conversa do telefone
@@ -118,20 +256,101 @@ class MongoDB:
             if not result:
                 return []
 
-            # Filtra apenas mensagens não expiradas
-            current_time = datetime.now(timezone.utc)
-            valid_messages = [
-                msg
-                for msg in result.get("messages", [])
-                if msg.get("message_expires_at", current_time + timedelta(days=1))
-                > current_time
-            ]
+            # Conversas expiradas são removidas pelo índice TTL em expires_at
+            messages = result.get("messages", [])
+            logger.info(f"Recuperadas {len(messages)} mensagens para {phone_number}")
+            return messages
 
+        except Exception as e:
+            logger.error(f"Erro ao recuperar histórico: {str(e)}")
+            raise e
+
+    def _get_bucketed_history(
+        self, phone_number: str, limit: int
+    ) -> list[dict[str, Any]]:
+        """Lê só os buckets mais recentes, do mais novo para o mais antigo"""
+        assert self.buckets is not None and self.conversations is not None
+        try:
+            now = datetime.now(timezone.utc)
+            # O índice (phone_number, started_at, expires_at) limita a busca aos
+            # buckets necessários; as mensagens não estão no índice, então a
+            # leitura não é coberta e busca esses documentos
+            cursor = (
+                self.buckets.find(
+                    {"phone_number": phone_number, "expires_at": {"$gt": now}},
+                    {"_id": 0, "messages": 1},
+                )
+                .sort("started_at", -1)
+                .limit(self.keep_buckets + 1)
+            )
+
+            buckets: list[list[dict[str, Any]]] = []
+            total = 0
+            for doc in cursor:
+                buckets.append(doc.get("messages", []))
+                total += len(buckets[-1])
+                if total >= limit:
+                    break
+            messages = [message for bucket in reversed(buckets) for message in bucket]
+
+            if total < limit:
+                # Conversas gravadas no layout antigo antes da troca (expiram pelo TTL)
+                legacy = self.conversations.find_one(
+                    {"phone_number": phone_number, "messages": {"$exists": True}},
+                    {"_id": 0, "messages": {"$slice": total - limit}},
+                )
+                if legacy:
+                    messages = legacy.get("messages", []) + messages
+
+            messages = messages[-limit:] if limit > 0 else []
             logger.info(
-                f"Recuperadas {len(valid_messages)} mensagens válidas para {phone_number}"
+                f"Recuperadas {len(messages)} mensagens válidas para {phone_number}"
             )
-            return valid_messages
+            return messages
 
         except Exception as e:
             logger.error(f"Erro ao recuperar histórico: {str(e)}")
             raise e
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]:
+        """Recupera o resumo das mensagens antigas da conversa"""
+        if not self.is_healthy or self.conversations is None:
+            raise ConnectionError("MongoDB não está disponível")
+
+        try:
+            result = self.conversations.find_one(
+                {"phone_number": phone_number},
+                {"summary": 1, "summary_last_id": 1},
+            )
+            result = result or {}
+            return {
+                "summary": result.get("summary", ""),
+                "last_id": result.get("summary_last_id"),
+            }
+        except Exception as e:
+            logger.error(f"Erro ao recuperar resumo: {str(e)}")
+            raise e
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None:
+        """Salva o resumo e a última mensagem resumida no documento da conversa"""
+        if not self.is_healthy or self.conversations is None:
+            raise ConnectionError("MongoDB não está disponível")
+
+        try:
+            self.conversations.update_one(
+                {"phone_number": phone_number},
+                {
+                    "$set": {
+                        "summary": summary,
+                        "summary_last_id": last_id,
+                        "summary_updated_at": datetime.now(timezone.utc),
+                        # Com buckets o documento da conversa só guarda o resumo
+                        "expires_at": datetime.now(timezone.utc) + CONVERSATION_TTL,
+                    }
+                },
+                upsert=True,
+            )
+            logger.info(f"Resumo da conversa atualizado para {phone_number}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar resumo: {str(e)}")
+            raise e
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+import json
+import logging
+import sqlite3
+import threading
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Mensagens mantidas por conversa e validade desde a última escrita
+HISTORY_LIMIT = 100
+CONVERSATION_TTL = timedelta(days=1)
+
+_SCHEMA = """
+create table if not exists conversations (
+    phone_number text primary key,
+    expires_at real not null,
+    summary text not null default '',
+    summary_last_id text
+);
+create table if not exists messages (
+    seq integer primary key autoincrement,
+    phone_number text not null,
+    data text not null
+);
+create index if not exists messages_phone_seq on messages (phone_number, seq);
+"""
+
+
+class SQLiteStore:
+    """
+    Histórico em SQLite (arquivo ou ":memory:"), com o mesmo contrato do
+    MongoDB e do Supabase. Uma linha por mensagem: a escrita só insere e a
+    leitura usa o índice (phone_number, seq) para pegar as últimas.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.is_healthy = False
+        self._connection: sqlite3.Connection | None = None
+        self._initialize_connection()
+
+    def _initialize_connection(self) -> None:
+        try:
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("pragma journal_mode=wal")
+            connection.execute("pragma synchronous=normal")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self.is_healthy = True
+            logger.info(f"Histórico em SQLite ({self.path})")
+        except sqlite3.Error as e:
+            self.is_healthy = False
+            logger.error(f"Falha ao abrir o SQLite {self.path}: {e}")
+
+    def check_health(self) -> bool:
+        return self.is_healthy
+
+    def ping(self) -> bool:
+        if self._connection is None:
+            self._initialize_connection()
+            return self.is_healthy
+        try:
+            with self._lock:
+                self._connection.execute("select 1")
+            self.is_healthy = True
+        except sqlite3.Error:
+            self.is_healthy = False
+        return self.is_healthy
+
+    def _db(self) -> sqlite3.Connection:
+        if not self.is_healthy or self._connection is None:
+            raise ConnectionError("SQLite não está disponível")
+        return self._connection
+
+    def save(self, phone_number: str, message_data: dict[str, Any]) -> None:
+        """Salva uma mensagem no histórico da conversa com expiração de 1 dia"""
+        self.save_many(phone_number, [message_data])
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        """Salva várias mensagens da conversa em uma transação"""
+        self.save_bulk({phone_number: messages})
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        """Salva as mensagens de várias conversas em uma transação"""
+        db = self._db()
+        now = datetime.now(timezone.utc).timestamp()
+        expires_at = now + CONVERSATION_TTL.total_seconds()
+        with self._lock:
+            db.execute("begin")
+            try:
+                for phone_number, messages in batches.items():
+                    # Conversa expirada recomeça do zero
+                    db.execute(
+                        "delete from messages where phone_number = ? and exists ("
+                        "select 1 from conversations where phone_number = ? "
+                        "and expires_at <= ?)",
+                        (phone_number, phone_number, now),
+                    )
+                    db.execute(
+                        "insert into conversations (phone_number, expires_at) "
+                        "values (?, ?) on conflict (phone_number) do update set "
+                        "summary = case when expires_at <= ? then '' else summary end, "
+                        "summary_last_id = case when expires_at <= ? then null "
+                        "else summary_last_id end, "
+                        "expires_at = excluded.expires_at",
+                        (phone_number, expires_at, now, now),
+                    )
+                    db.executemany(
+                        "insert into messages (phone_number, data) values (?, ?)",
+                        [
+                            (phone_number, json.dumps(message, ensure_ascii=False))
+                            for message in messages
+                        ],
+                    )
+                    # Mantém as últimas HISTORY_LIMIT mensagens
+                    db.execute(
+                        "delete from messages where phone_number = ? and seq <= ("
+                        "select seq from messages where phone_number = ? "
+                        "order by seq desc limit 1 offset ?)",
+                        (phone_number, phone_number, HISTORY_LIMIT),
+                    )
+                db.execute("commit")
+            except Exception:
+                db.execute("rollback")
+                raise
+
+    def get_history(self, phone_number: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Recupera as últimas `limit` mensagens da conversa"""
+        db = self._db()
+        if limit <= 0:
+            # "limit" negativo no SQLite retorna tudo
+            return []
+        with self._lock:
+            rows = db.execute(
+                "select m.data from messages m join conversations c "
+                "on c.phone_number = m.phone_number "
+                "where m.phone_number = ? and c.expires_at > ? "
+                "order by m.seq desc limit ?",
+                (phone_number, datetime.now(timezone.utc).timestamp(), limit),
+            ).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]:
+        """Recupera o resumo das mensagens antigas da conversa"""
+        db = self._db()
+        with self._lock:
+            row = db.execute(
+                "select summary, summary_last_id from conversations "
+                "where phone_number = ? and expires_at > ?",
+                (phone_number, datetime.now(timezone.utc).timestamp()),
+            ).fetchone()
+        if not row:
+            return {"summary": "", "last_id": None}
+        return {"summary": row[0], "last_id": row[1]}
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None:
+        """Salva o resumo e a última mensagem resumida"""
+        db = self._db()
+        expires_at = (datetime.now(timezone.utc) + CONVERSATION_TTL).timestamp()
+        with self._lock:
+            db.execute(
+                "insert into conversations "
+                "(phone_number, expires_at, summary, summary_last_id) "
+                "values (?, ?, ?, ?) on conflict (phone_number) do update set "
+                "summary = excluded.summary, "
+                "summary_last_id = excluded.summary_last_id",
+                (phone_number, expires_at, summary, last_id),
+            )
@@ -0,0 +1,161 @@
+from typing import Any, Callable, Protocol, TypeVar
+import logging
+import threading
+
+from httpx import TransportError
+from pymongo.errors import ConnectionFailure
+
+from app.core.config import Config
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+metrics.describe("storage_failovers_total", "Trocas do banco ativo do histórico")
+metrics.describe("storage_errors_total", "Falhas de conexão com os bancos do histórico")
+
+
+class HistoryStore(Protocol):
+    """Contrato dos bancos do histórico (MongoDB, Supabase, SQLite e memória)"""
+
+    is_healthy: bool
+
+    def check_health(self) -> bool: ...
+
+    def ping(self) -> bool: ...
+
+    def save(self, phone_number: str, message_data: dict[str, Any]) -> None: ...
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None: ...
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None: ...
+
+    def get_history(
+        self, phone_number: str, limit: int = 10
+    ) -> list[dict[str, Any]]: ...
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]: ...
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None: ...
+
+
+def _is_outage(error: BaseException) -> bool:
+    """Falhas de conexão trocam de banco; erros de dados são só repassados"""
+    return isinstance(
+        error, (ConnectionError, TimeoutError, ConnectionFailure, TransportError)
+    )
+
+
+class StorageRouter:
+    """
+    Encaminha as operações para o primeiro banco saudável da lista (em ordem de
+    prioridade). Uma falha de conexão marca o banco como indisponível e repete
+    a operação no próximo; uma thread verifica os bancos indisponíveis a cada
+    `health_interval` segundos e, quando o preferido volta, as operações voltam
+    para ele. O histórico gravado no banco reserva durante a queda não é
+    copiado de volta.
+    """
+
+    def __init__(
+        self,
+        backends: list[tuple[str, HistoryStore]],
+        health_interval: float = Config.STORAGE_HEALTH_INTERVAL,
+    ) -> None:
+        if not backends:
+            raise ValueError("Nenhum banco de dados configurado")
+        self.backends = backends
+        self.health_interval = health_interval
+        self._active: str | None = None
+        self._stop = threading.Event()
+        self._monitor: threading.Thread | None = None
+
+    @property
+    def active(self) -> str | None:
+        """Nome do banco que está recebendo as operações"""
+        for name, backend in self.backends:
+            if backend.is_healthy:
+                return name
+        return None
+
+    def check_health(self) -> bool:
+        return self.active is not None
+
+    def ping(self) -> bool:
+        self._probe()
+        return self.check_health()
+
+    def start_monitor(self) -> None:
+        """Inicia a verificação periódica dos bancos indisponíveis"""
+        if self._monitor is None or not self._monitor.is_alive():
+            self._stop.clear()
+            self._monitor = threading.Thread(
+                target=self._run_monitor, name="storage-health", daemon=True
+            )
+            self._monitor.start()
+
+    def stop_monitor(self) -> None:
+        self._stop.set()
+
+    def _run_monitor(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self._probe()
+            except Exception as e:
+                logger.error(f"Erro ao verificar os bancos de dados: {e}")
+
+    def _probe(self) -> None:
+        for name, backend in self.backends:
+            if not backend.is_healthy and backend.ping():
+                logger.info(f"Banco de dados '{name}' disponível novamente")
+        self._note_active()
+
+    def _note_active(self) -> None:
+        active = self.active
+        if active != self._active:
+            if self._active is not None:
+                logger.warning(f"Histórico trocou de banco: {self._active} -> {active}")
+                metrics.inc(
+                    "storage_failovers_total", source=self._active, target=active
+                )
+            self._active = active
+
+    def _call(self, operation: Callable[[HistoryStore], T]) -> T:
+        last_error: BaseException | None = None
+        for name, backend in self.backends:
+            if not backend.is_healthy:
+                continue
+            try:
+                result = operation(backend)
+            except Exception as e:
+                if not _is_outage(e):
+                    raise
+                logger.error(f"Banco de dados '{name}' indisponível: {e}")
+                metrics.inc("storage_errors_total", backend=name)
+                backend.is_healthy = False
+                last_error = e
+                continue
+            self._note_active()
+            return result
+
+        self._note_active()
+        raise ConnectionError(
+            "Nenhum banco de dados disponível para o histórico"
+        ) from last_error
+
+    def save(self, phone_number: str, message_data: dict[str, Any]) -> None:
+        self._call(lambda db: db.save(phone_number, message_data))
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        self._call(lambda db: db.save_many(phone_number, messages))
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        self._call(lambda db: db.save_bulk(batches))
+
+    def get_history(self, phone_number: str, limit: int = 10) -> list[dict[str, Any]]:
+        return self._call(lambda db: db.get_history(phone_number, limit))
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]:
+        return self._call(lambda db: db.get_summary(phone_number))
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None:
+        self._call(lambda db: db.save_summary(phone_number, summary, last_id))
@@ -7,11 +7,16 @@ from datetime import datetime, timedelta, timezone
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Mensagens mantidas por conversa
+HISTORY_LIMIT = 100
+
 
 class Supabase:
-    def __init__(self) -> None:
+    def __init__(self, atomic_append: bool = Config.SUPABASE_ATOMIC_APPEND) -> None:
         self.client: supabase.Client | None = None
         self.conversations_table = "conversations"
+        # Usa as funções de supabase/migrations (anexa e lê o fim no servidor)
+        self.atomic_append = atomic_append
         self.is_healthy = False
         self._initialize_connection()
 
@@ -38,12 +43,58 @@ class Supabase:
         """Verifica se o Supabase está respondendo"""
         return self.is_healthy
 
+    def ping(self) -> bool:
+        """Testa a conexão de novo e atualiza is_healthy"""
+        if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
+            return False
+        if self.client is None:
+            self._initialize_connection()
+            return self.is_healthy
+        try:
+            self.client.table(self.conversations_table).select("count", count="exact").limit(1).execute()  # type: ignore
+            self.is_healthy = True
+        except Exception:
+            self.is_healthy = False
+        return self.is_healthy
+
     def save(
         self,
         phone_number: str,
         message_data: dict[str, Any],
     ) -> None:
         """Salva uma mensagem no Supabase com expiração de 1 dia"""
+        self.save_many(phone_number, [message_data])
+
+    def save_bulk(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        """Salva as mensagens de várias conversas"""
+        if self.atomic_append:
+            self._append_rpc(batches)
+            return
+        for phone_number, messages in batches.items():
+            self.save_many(phone_number, messages)
+
+    def _append_rpc(self, batches: dict[str, list[dict[str, Any]]]) -> None:
+        """Anexa e corta no servidor, atomicamente e em uma única chamada"""
+        if not self.is_healthy or not self.client:
+            raise ConnectionError("Supabase não está disponível")
+        if not batches:
+            return
+
+        try:
+            self.client.rpc(
+                "append_conversation_messages",
+                {"p_batches": batches, "p_max_messages": HISTORY_LIMIT},
+            ).execute()
+            logger.info(f"Conversa salva no Supabase para {', '.join(batches)}")
+        except Exception as e:
+            logger.error(f"Erro ao salvar conversa no Supabase: {e}")
+            raise e
+
+    def save_many(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        """Salva várias mensagens da conversa em uma única atualização"""
+        if self.atomic_append:
+            self._append_rpc({phone_number: messages})
+            return
         if not self.is_healthy or not self.client:
             raise ConnectionError("Supabase não está disponível")
 
@@ -64,14 +115,13 @@ class Supabase:
             if existing.data:
                 # Atualiza conversa existente
                 conversation = existing.data[0]
-                messages = conversation.get("messages", [])
-                messages.append(message_data)
                 # Mantém apenas as últimas 100 mensagens
-                messages = messages[-100:]
+                history = (conversation.get("messages") or []) + messages
+                history = history[-HISTORY_LIMIT:]
 
                 self.client.table(table).update(
                     {
-                        "messages": messages,
+                        "messages": history,
                         "update_at": datetime.now(timezone.utc).isoformat(),
                         "expires_at": expires_at.isoformat(),
                     }
@@ -81,7 +131,7 @@ class Supabase:
                 self.client.table(table).insert(
                     {
                         "phone_number": phone_number,
-                        "messages": [message_data],
+                        "messages": messages[-HISTORY_LIMIT:],
                         "created_at": datetime.now(timezone.utc).isoformat(),
                         "update_at": datetime.now(timezone.utc).isoformat(),
                         "expires_at": expires_at.isoformat(),
@@ -106,18 +156,26 @@ class Supabase:
         table = self.conversations_table
 
         try:
-            result: Any = (
-                self.client.table(table)
-                .select("*")
-                .eq("phone_number", phone_number)
-                .execute()
-            )
+            if self.atomic_append:
+                # Só o fim do histórico trafega
+                result: Any = self.client.rpc(
+                    "get_conversation_history",
+                    {"p_phone_number": phone_number, "p_limit": limit},
+                ).execute()
+                all_messages = result.data or []
+            else:
+                result = (
+                    self.client.table(table)
+                    .select("*")
+                    .eq("phone_number", phone_number)
+                    .execute()
+                )
 
-            if not result.data:
-                return []
+                if not result.data:
+                    return []
 
-            conversation = result.data[0]
-            all_messages = conversation.get("messages", [])
+                conversation = result.data[0]
+                all_messages = conversation.get("messages", [])
 
             # Filtra mensagens expiradas
             current_time = datetime.now(timezone.utc)
@@ -150,3 +208,44 @@ class Supabase:
         except Exception as e:
             logger.error(f"Erro ao recuperar histórico do Supabase: {e}")
             raise e
+
+    def get_summary(self, phone_number: str) -> dict[str, Any]:
+        """Recupera o resumo das mensagens antigas da conversa"""
+        if not self.is_healthy or not self.client:
+            raise ConnectionError("Supabase não está disponível")
+
+        try:
+            result: Any = (
+                self.client.table(self.conversations_table)
+                .select("summary, summary_last_id")
+                .eq("phone_number", phone_number)
+                .execute()
+            )
+            conversation = result.data[0] if result.data else {}
+            return {
+                "summary": conversation.get("summary") or "",
+                "last_id": conversation.get("summary_last_id"),
+            }
+        except Exception as e:
+            logger.error(f"Erro ao recuperar resumo do Supabase: {e}")
+            raise e
+
+    def save_summary(self, phone_number: str, summary: str, last_id: str) -> None:
+        """Salva o resumo e a última mensagem resumida na conversa"""
+        if not self.is_healthy or not self.client:
+            raise ConnectionError("Supabase não está disponível")
+
+        try:
+            self.client.table(self.conversations_table).update(
+                {
+                    "summary": summary,
+                    "summary_last_id": last_id,
+                    "summary_updated_at": datetime.now(timezone.utc).isoformat(),
+                }
+            ).eq("phone_number", phone_number).execute()
+            logger.info(
+                f"Resumo da conversa atualizado no Supabase para {phone_number}"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao salvar resumo no Supabase: {e}")
+            raise e
@@ -1,15 +1,19 @@
 from Crypto.Cipher import AES
 from Crypto.Cipher._mode_cbc import CbcMode
-from typing import Optional
+from typing import BinaryIO, Iterable, Optional
 import logging
 import hashlib
 import hmac
 import base64
-import requests
+import httpx
+import io
 import os
 import uuid
 
 from app.core.config import Config
+from app.integrations.httpClient import http_client
+from app.utils.documentText import extract_text, fit_text_to_budget
+from app.utils.imageProcessing import downscale_image
 
 appInfo = {
     "image": b"WhatsApp Image Keys",
@@ -34,6 +38,10 @@ extension = {
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Tamanhos fixos do formato de mídia do WhatsApp
+AES_BLOCK_SIZE = 16
+MAC_LENGTH = 10
+
 
 def _HKDF(key: bytes, length: int, appInfo: bytes = b"") -> bytes:
     logger.debug(f"Iniciando HKDF - length: {length}, appInfo: {appInfo}")
@@ -71,6 +79,84 @@ def _AESDecrypt(key: bytes, ciphertext: bytes, iv: Optional[bytes]) -> bytes:
     return result
 
 
+def _fileExtension(mediaType: str) -> str:
+    if "/" in mediaType:
+        return mediaType.split("/")[1]
+    return extension.get(mediaType, "bin")
+
+
+def _decryptStream(
+    chunks: Iterable[bytes], mediaKeyExpanded: bytes, out: BinaryIO
+) -> int:
+    """
+    Descriptografa um fluxo de mídia do WhatsApp em blocos, escrevendo o
+    plaintext em `out` à medida que chega e validando o HMAC final (10 bytes).
+    O uso de memória fica limitado ao tamanho de cada chunk.
+    """
+    iv = mediaKeyExpanded[:16]
+    cipherKey = mediaKeyExpanded[16:48]
+    macKey = mediaKeyExpanded[48:80]
+
+    cipher: CbcMode = AES.new(cipherKey, AES.MODE_CBC, iv)  # type: ignore
+    mac = hmac.new(macKey, iv, hashlib.sha256)
+
+    # Retém sempre o MAC e o último bloco (padding) até o fim do fluxo
+    reserve = MAC_LENGTH + AES_BLOCK_SIZE
+    pending = bytearray()
+    written = 0
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        usable = len(pending) - reserve
+        if usable < AES_BLOCK_SIZE:
+            continue
+        usable -= usable % AES_BLOCK_SIZE
+
+        block = bytes(pending[:usable])
+        del pending[:usable]
+        mac.update(block)
+        written += out.write(cipher.decrypt(block))
+
+    if len(pending) < reserve or (len(pending) - MAC_LENGTH) % AES_BLOCK_SIZE:
+        raise ValueError(
+            f"Tamanho de mídia criptografada inválido (resto: {len(pending)} bytes)"
+        )
+
+    lastBlock = bytes(pending[:-MAC_LENGTH])
+    mac.update(lastBlock)
+    if not hmac.compare_digest(mac.digest()[:MAC_LENGTH], bytes(pending[-MAC_LENGTH:])):
+        raise ValueError("HMAC da mídia inválido")
+
+    written += out.write(_AESUnpad(cipher.decrypt(lastBlock)))
+    logger.debug(f"Descriptografia em streaming concluída - {written} bytes")
+    return written
+
+
+def _decryptToFile(
+    chunks: Iterable[bytes], mediaKey: bytes, mediaType: str, output_path: str
+) -> int:
+    """Descriptografa o fluxo para um arquivo temporário e o renomeia se o HMAC for válido"""
+    mediaKeyExpanded = _HKDF(mediaKey, 112, appInfo[mediaType])
+    partial_path = f"{output_path}.part"
+
+    try:
+        with open(partial_path, "wb") as f:
+            written = _decryptStream(chunks, mediaKeyExpanded, f)
+        os.replace(partial_path, output_path)
+        return written
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def _readChunks(f: BinaryIO, chunk_size: int) -> Iterable[bytes]:
+    while chunk := f.read(chunk_size):
+        yield chunk
+
+
 def decryptByName(
     fileName: bytes, mediaKey: bytes, mediaType: str, output: Optional[bytes] = None
 ) -> bool:
@@ -79,24 +165,18 @@ def decryptByName(
     )
 
     try:
-        mediaKeyExpanded = _HKDF(mediaKey, 112, appInfo[mediaType])
-
-        with open(fileName, "rb") as f:
-            mediaData = f.read()
-        logger.debug(f"Arquivo lido: {len(mediaData)} bytes")
-
-        file = mediaData[:-10]
-        data = _AESDecrypt(mediaKeyExpanded[16:48], file, mediaKeyExpanded[:16])
-
         if output is None:
-            if "/" in mediaType:
-                fileExtension = mediaType.split("/")[1]
-            else:
-                fileExtension = extension[mediaType]
+            fileExtension = _fileExtension(mediaType)
             output = fileName.replace(b".enc", f".{fileExtension}".encode("utf-8"))
 
-        with open(output, "wb") as f:
-            f.write(data)
+        with open(fileName, "rb") as f:
+            written = _decryptToFile(
+                _readChunks(f, Config.DECRYPT_CHUNK_SIZE),
+                mediaKey,
+                mediaType,
+                os.fsdecode(output),
+            )
+        logger.debug(f"Arquivo descriptografado: {written} bytes")
 
         logger.info(f"Descriptografia concluída - arquivo salvo: {output}")
         return True
@@ -114,62 +194,116 @@ def decryptByLink(
     output: Optional[str] = None,
 ) -> str:
     """
-    Descriptografa arquivo do WhatsApp e retorna URL pública via ngrok
+    Descriptografa arquivo do WhatsApp e retorna URL pública via ngrok.
+    O download é processado em streaming, sem carregar o arquivo inteiro em memória.
     """
     logger.info(f"Iniciando descriptografia por link - tipo: {mediaType}")
 
     try:
         logger.debug(f"Fazendo download de: {link}")
-        response = requests.get(link, timeout=30)
-        try:
-            response.raise_for_status()
-        except requests.HTTPError:
-            logger.warning(f"Erro HTTP {response.status_code} ao baixar arquivo")
-            raise requests.HTTPError(
-                f"Erro HTTP {response.status_code} ao baixar arquivo"
-            )
-
-        mediaData = response.content
-        logger.debug(f"Download concluído: {len(mediaData)} bytes")
-
-        mediaKeyExpanded = _HKDF(mediaKey, 112, appInfo[mediaType])
-        file = mediaData[:-10]
-        data = _AESDecrypt(mediaKeyExpanded[16:48], file, mediaKeyExpanded[:16])
-
-        # Determina extensão do arquivo
-        if "/" in mediaType:
-            fileExtension = mediaType.split("/")[1]
-        else:
-            fileExtension = extension.get(mediaType, "bin")
-
-        # Gera nome único para o arquivo
-        if output is None:
-            filename = f"{uuid.uuid4().hex}.{fileExtension}"
-        else:
-            filename = output
+        with http_client.stream("GET", link) as response:
+            if response.is_error:
+                logger.warning(f"Erro HTTP {response.status_code} ao baixar arquivo")
+                response.raise_for_status()
+
+            # Gera nome único para o arquivo
+            if output is None:
+                filename = f"{uuid.uuid4().hex}.{_fileExtension(mediaType)}"
+            else:
+                filename = output
 
-        output_path = os.path.join("static", filename)
+            output_path = os.path.join("static", filename)
 
-        # Garante que a pasta static existe
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # Garante que a pasta static existe
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-        # Salva o arquivo descriptografado
-        with open(output_path, "wb") as f:
-            f.write(data)
-        logger.debug(f"Arquivo salvo: {output_path}")
+            # Baixa, descriptografa e salva o arquivo em uma única passada
+            written = _decryptToFile(
+                response.iter_bytes(chunk_size=Config.DECRYPT_CHUNK_SIZE),
+                mediaKey,
+                mediaType,
+                output_path,
+            )
+        logger.debug(f"Arquivo salvo: {output_path} ({written} bytes)")
 
         # Gera a URL pública usando o ngrok
         public_url = f"{ngrok_url}/static/{filename}"
         logger.info(f"Descriptografia por link concluída - URL: {public_url}")
 
         return public_url
-    except requests.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         raise e
     except Exception as e:
         logger.error(f"Erro na descriptografia por link: {str(e)}")
         raise Exception(f"Erro no decryptByLink: {str(e)}")
 
 
+def decryptToBytes(link: str, mediaKey: bytes, mediaType: str) -> bytes:
+    """
+    Baixa e descriptografa uma mídia do WhatsApp retornando o conteúdo em memória,
+    sem gravar em disco (hand-off direto para a OpenAI)
+    """
+    logger.info(f"Iniciando descriptografia em memória - tipo: {mediaType}")
+
+    try:
+        with http_client.stream("GET", link) as response:
+            if response.is_error:
+                logger.warning(f"Erro HTTP {response.status_code} ao baixar arquivo")
+                response.raise_for_status()
+
+            buffer = io.BytesIO()
+            _decryptStream(
+                response.iter_bytes(chunk_size=Config.DECRYPT_CHUNK_SIZE),
+                _HKDF(mediaKey, 112, appInfo[mediaType]),
+                buffer,
+            )
+
+        logger.info(f"Descriptografia em memória concluída - {buffer.tell()} bytes")
+        return buffer.getvalue()
+    except httpx.HTTPStatusError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Erro na descriptografia em memória: {str(e)}")
+        raise Exception(f"Erro no decryptToBytes: {str(e)}")
+
+
+def decryptAndExtractText(
+    link: str, mediaKey: bytes, mimetype: str, max_tokens: int, chunk_tokens: int
+) -> tuple[str, str]:
+    """
+    Descriptografa um documento e extrai o texto no mesmo worker. Retorna o
+    hash do conteúdo e o texto já limitado ao orçamento; no modo process só
+    esse resultado volta ao processo principal, não o documento.
+    """
+    data = decryptToBytes(link, mediaKey, "document")
+    text = extract_text(data, mimetype)
+    if text:
+        text = fit_text_to_budget(text, max_tokens, chunk_tokens)
+    return hashlib.sha256(data).hexdigest(), text
+
+
+def decryptAndDownscale(
+    link: str, mediaKey: bytes, mediaType: str, max_dimension: int, quality: int
+) -> tuple[str, int, bytes, str, tuple[int, int], tuple[int, int]]:
+    """
+    Descriptografa uma imagem e a reduz no mesmo worker. Retorna o hash e o
+    tamanho do original, a imagem reduzida, seu mimetype e as dimensões antes
+    e depois; só a versão reduzida volta ao processo principal.
+    """
+    data = decryptToBytes(link, mediaKey, mediaType)
+    processed, mimetype, original_size, final_size = downscale_image(
+        data, max_dimension, quality
+    )
+    return (
+        hashlib.sha256(data).hexdigest(),
+        len(data),
+        processed,
+        mimetype,
+        original_size,
+        final_size,
+    )
+
+
 if __name__ == "__main__":
     fileName: bytes = rb"static\file.enc"
     link: str = ""
@@ -1,44 +1,64 @@
-from requests import Response
-import requests
+from httpx import Response
+import httpx
 from urllib.parse import quote as format_url
 from logging import Logger, getLogger
 
 from app.core.config import Config
+from app.integrations.httpClient import http_client
+from app.services.circuitBreaker import CircuitBreaker, CircuitOpenError
 from app.models.whatsappMessage import WhatsappMessage
 
 logger: Logger = getLogger(__name__)
 
 
+def _is_service_failure(error: BaseException) -> bool:
+    """Falhas de rede, 5xx e 429 indicam problema na Evolution (4xx não)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, httpx.TransportError)
+
+
 class EvolutionIntegration:
     def __init__(self):
         self.apikey: str = Config.EVOLUTION_APIKEY
         self.base_url: str = Config.EVOLUTION_SERVER_URL
         self.nameInstance: str = format_url(Config.EVOLUTION_NAME_INSTANCE)
+        self.breaker = CircuitBreaker("evolution", is_failure=_is_service_failure)
 
     def send_message(self, whatsappMessage: WhatsappMessage) -> None:
         """
         Envia uma mensagem via EvolutionAPI.
         """
+        self.send_text(
+            whatsappMessage.to_number, f"{whatsappMessage.message.content[0].text}"
+        )
+
+    def send_text(self, to_number: str, text: str) -> None:
+        """
+        Envia um texto via EvolutionAPI.
+        """
         url: str = f"{self.base_url}/message/sendText/{self.nameInstance}"
         payload: dict[str, str] = {
-            "number": f"{whatsappMessage.to_number}",
-            "text": f"{whatsappMessage.message.content[0].text}",
+            "number": f"{to_number}",
+            "text": text,
         }
         headers: dict[str, str] = {
             "apikey": self.apikey,
             "Content-Type": "application/json",
         }
 
+        def post() -> Response:
+            response: Response = http_client.post(url, json=payload, headers=headers)
+            return response.raise_for_status()
+
         try:
-            response: Response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-        except (requests.HTTPError, requests.RequestException) as e:
+            self.breaker.call(post)
+        except (httpx.HTTPError, CircuitOpenError) as e:
             logger.error(
-                f"Erro ao enviar mensagem para {whatsappMessage.to_number}",
+                f"Erro ao enviar mensagem para {to_number}",
                 exc_info=True,
             )
             raise e
         else:
-            logger.info(
-                f"Mensagem enviada com sucesso para {whatsappMessage.to_number}"
-            )
+            logger.info(f"Mensagem enviada com sucesso para {to_number}")
@@ -0,0 +1,169 @@
+from contextlib import contextmanager
+from typing import Any, Iterator
+import httpx
+import logging
+import os
+import random
+import threading
+import time
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Status que indicam falha transitória do servidor
+RETRY_STATUS: frozenset[int] = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS: frozenset[str] = frozenset(
+    {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+)
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartilhado (CDN do WhatsApp e EvolutionAPI).
+
+    Mantém conexões keep-alive num pool, limita conexões simultâneas por host,
+    aplica timeouts de conexão/leitura e repete falhas transitórias com backoff
+    exponencial e jitter. Requisições não idempotentes (POST) só são repetidas
+    quando a falha garante que nada foi enviado (erro de conexão ou 429).
+    """
+
+    def __init__(
+        self,
+        http2: bool = Config.HTTP_CLIENT_HTTP2,
+        max_connections: int = Config.HTTP_MAX_CONNECTIONS,
+        max_connections_per_host: int = Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+        connect_timeout: float = Config.HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = Config.HTTP_READ_TIMEOUT,
+        max_retries: int = Config.HTTP_MAX_RETRIES,
+        backoff_base: float = Config.HTTP_RETRY_BACKOFF,
+        backoff_max: float = 10.0,
+        verify: Any = True,
+    ) -> None:
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=read_timeout,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verify = verify
+
+        self._client: httpx.Client | None = None
+        self._client_pid: int | None = None
+        self._host_slots: dict[tuple[str, str, int | None], threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        """Cria o cliente sob demanda (e de novo após um fork, sem herdar sockets)"""
+        with self._lock:
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = httpx.Client(
+                    http2=self.http2,
+                    timeout=self.timeout,
+                    verify=self.verify,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                        keepalive_expiry=30.0,
+                    ),
+                )
+                self._client_pid = os.getpid()
+                self._host_slots.clear()
+                logger.info(f"Cliente HTTP compartilhado criado (http2={self.http2})")
+            return self._client
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        """Semáforo que limita as conexões simultâneas para o host da URL"""
+        parsed = httpx.URL(url)
+        key = (parsed.scheme, parsed.host, parsed.port)
+        with self._lock:
+            if key not in self._host_slots:
+                self._host_slots[key] = threading.BoundedSemaphore(
+                    self.max_connections_per_host
+                )
+            return self._host_slots[key]
+
+    def _backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """Backoff exponencial com jitter completo, respeitando Retry-After"""
+        retry_after = response.headers.get("retry-after") if response else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _send(
+        self, method: str, url: str, stream: bool, **kwargs: Any
+    ) -> httpx.Response:
+        method = method.upper()
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            is_last = attempt == self.max_retries
+            try:
+                request = client.build_request(method, url, **kwargs)
+                response = client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # Nada foi enviado: seguro repetir para qualquer método
+                if is_last:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Falha de conexão em {method} {url}: {e} - nova tentativa em {delay:.2f}s"
+                )
+            except httpx.TransportError as e:
+                if is_last or method not in IDEMPOTENT_METHODS:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"Erro de transporte em {method} {url}: {e} - nova tentativa em {delay:.2f}s"
+                )
+            else:
+                retryable = response.status_code in RETRY_STATUS and (
+                    response.status_code == 429 or method in IDEMPOTENT_METHODS
+                )
+                if not retryable or is_last:
+                    return response
+                delay = self._backoff(attempt, response)
+                response.close()
+                logger.warning(
+                    f"HTTP {response.status_code} em {method} {url} - nova tentativa em {delay:.2f}s"
+                )
+            time.sleep(delay)
+
+        raise RuntimeError("Número de tentativas esgotado")  # inalcançável
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Executa uma requisição lendo a resposta completa"""
+        with self._host_slot(url):
+            return self._send(method, url, stream=False, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        """Executa uma requisição cujo corpo é lido sob demanda (downloads grandes)"""
+        with self._host_slot(url):
+            response = self._send(method, url, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Instância global
+http_client = HttpClient()
@@ -1,68 +1,651 @@
-from typing import Any
-from openai import OpenAI
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+import asyncio
+import httpx
 import logging
+import random
+import time
 
 from app.core.config import Config
 from app.models.contentItem import ContentItem
 from app.models.message import Message
 from app.models.whatsappMessage import WhatsappMessage
+from app.utils.metrics import metrics
+from app.utils.textChunker import SentenceChunker
+from app.services.audioSplitter import (
+    AudioSplitter,
+    audio_splitter,
+    stitch_transcripts,
+)
+from app.services.circuitBreaker import CircuitBreaker
+from app.services.modelRouter import ModelRouter, Route, model_router
+from app.services.replyCache import ReplyCache, reply_cache
+from app.services.rateLimiter import (
+    OpenAIRateLimiter,
+    estimate_request_tokens,
+    openai_rate_limiter,
+)
 
 logger: logging.Logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+# Erros transitórios que justificam uma nova tentativa
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+# Quantidade mínima de latências observadas para calcular o p95 do hedge
+HEDGE_MIN_SAMPLES = 20
+
+metrics.describe("openai_hedged_requests_total", "Chamadas que dispararam o fallback")
+metrics.describe("openai_hedge_wins_total", "Chamadas com hedge por modelo vencedor")
+
+SUMMARY_INSTRUCTIONS = (
+    "Você mantém o resumo de uma conversa de WhatsApp entre um cliente e o "
+    "assistente. Reescreva o resumo atual incorporando as novas mensagens. "
+    "Preserve nomes, pedidos, preferências, decisões e pendências; descarte "
+    "cumprimentos e detalhes sem importância. Responda apenas com o resumo, "
+    "em português, em texto corrido."
+)
+
+
+def _is_service_failure(error: BaseException) -> bool:
+    """Só falhas do serviço (não erros da requisição) contam para o circuito"""
+    return isinstance(error, RETRYABLE_ERRORS)
 
 
 class OpenaiIntegration:
     def __init__(self):
         self.client: OpenAI = OpenAI(api_key=Config.OPENAI_API_KEY)
 
+        # Cliente assíncrono e limite de requisições simultâneas, criados por event loop
+        self.max_concurrency: int = Config.OPENAI_MAX_CONCURRENCY
+        self.max_retries: int = Config.OPENAI_MAX_RETRIES
+        self._async_client: AsyncOpenAI | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing: set[asyncio.Task[None]] = set()
+
+        # Limite de RPM/TPM compartilhado entre instâncias (opcional)
+        self.rate_limiter: OpenAIRateLimiter | None = (
+            openai_rate_limiter if Config.OPENAI_RATE_LIMIT_ENABLED else None
+        )
+
+        # Circuitos das respostas (modelo principal e fallback) e das transcrições
+        self.breaker = CircuitBreaker("openai", is_failure=_is_service_failure)
+        self.fallback_breaker = CircuitBreaker(
+            "openai_fallback", is_failure=_is_service_failure
+        )
+        self.transcription_breaker = CircuitBreaker(
+            "openai_transcription", is_failure=_is_service_failure
+        )
+
+        # Áudios longos divididos em trechos transcritos em paralelo (opcional)
+        self.audio_splitter: AudioSplitter | None = (
+            audio_splitter if Config.TRANSCRIBE_LONG_AUDIO else None
+        )
+
+        # Hedge: repete a chamada no modelo de fallback quando passa do p95
+        self.fallback_model: str = Config.OPENAI_FALLBACK_MODEL
+        self._latencies: deque[float] = deque(maxlen=200)
+
+        # Escolha do modelo por batch (opcional)
+        self.model_router: ModelRouter | None = (
+            model_router if Config.MODEL_ROUTING_ENABLED else None
+        )
+
+        # Cache de respostas para perguntas repetidas (opcional)
+        self.reply_cache: ReplyCache | None = (
+            reply_cache if Config.REPLY_CACHE_ENABLED else None
+        )
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Retorna o cliente assíncrono do event loop atual (conexões reaproveitadas)"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._loop is not loop:
+            if self._async_client is not None:
+                self._close_stale_client(self._async_client, self._loop, loop)
+            self._async_client = AsyncOpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                timeout=Config.OPENAI_TIMEOUT,
+                # As novas tentativas são feitas em _call_with_backoff
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    )
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._async_client
+
+    def _close_stale_client(
+        self,
+        client: AsyncOpenAI,
+        old_loop: asyncio.AbstractEventLoop | None,
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        """Fecha o cliente (e o pool httpx) criado para outro event loop"""
+
+        async def close() -> None:
+            try:
+                await client.close()
+            except Exception as e:
+                # O loop antigo pode já ter sido fechado junto com as conexões
+                logger.debug(f"Erro ao fechar cliente OpenAI anterior: {e}")
+
+        if old_loop is not None and old_loop.is_running():
+            # As conexões pertencem ao loop antigo: fecha nele
+            asyncio.run_coroutine_threadsafe(close(), old_loop)
+            return
+        task = loop.create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Usa o retry-after da OpenAI quando presente, senão backoff com jitter"""
+        response: httpx.Response | None = getattr(error, "response", None)
+        if response is not None:
+            retry_after_ms = response.headers.get("retry-after-ms")
+            retry_after = response.headers.get("retry-after")
+            try:
+                if retry_after_ms:
+                    return float(retry_after_ms) / 1000
+                if retry_after:
+                    return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(8.0, 0.5 * 2**attempt))
+
+    async def _call_with_backoff(
+        self,
+        call: Callable[[AsyncOpenAI], Awaitable[T]],
+        tokens: int = 0,
+        use_semaphore: bool = True,
+    ) -> T:
+        """
+        Executa a chamada respeitando o limite de concorrência e repetindo erros
+        transitórios. Com o limitador ativo, cada tentativa aguarda cota de RPM/TPM;
+        a estimativa de tokens de uma tentativa que falhou (ou foi cancelada pelo
+        hedge) é devolvida, já que reconcile só corrige a tentativa que respondeu.
+        Com use_semaphore=False o chamador já detém a vaga (streaming).
+        """
+        client = self._get_async_client()
+        assert self._semaphore is not None
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(tokens)
+            try:
+                try:
+                    if not use_semaphore:
+                        return await call(client)
+                    async with self._semaphore:
+                        return await call(client)
+                except BaseException:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.refund(tokens)
+                    raise
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(
+                    f"Erro transitório da OpenAI ({type(e).__name__}), "
+                    f"nova tentativa em {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+        raise RuntimeError("Número de tentativas esgotado")  # inalcançável
+
+    def _hedge_delay(self) -> float:
+        """Espera antes do fallback: p95 das latências recentes do modelo principal"""
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return Config.OPENAI_HEDGE_DELAY
+        ordered = sorted(self._latencies)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return max(Config.OPENAI_HEDGE_MIN_DELAY, p95)
+
+    async def _create(
+        self,
+        breaker: CircuitBreaker,
+        params: dict[str, Any],
+        tokens: int,
+        use_semaphore: bool = True,
+    ) -> Any:
+        return await breaker.acall(
+            lambda: self._call_with_backoff(
+                lambda client: client.responses.create(**params),
+                tokens=tokens,
+                use_semaphore=use_semaphore,
+            )
+        )
+
+    async def _create_hedged(self, params: dict[str, Any], tokens: int) -> Any:
+        """
+        Chama o modelo principal e, se ele não responder dentro do p95 (ou
+        falhar, ou estiver com o circuito aberto), dispara a mesma requisição no
+        modelo de fallback. Vale a primeira resposta bem-sucedida.
+        """
+        if not self.fallback_model:
+            return await self._create(self.breaker, params, tokens)
+
+        started = time.perf_counter()
+        primary = asyncio.create_task(self._create(self.breaker, params, tokens))
+        tasks: dict[asyncio.Task[Any], str] = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay())
+            if primary in done and primary.exception() is None:
+                self._latencies.append(time.perf_counter() - started)
+                return primary.result()
+
+            logger.warning(
+                f"Modelo principal lento ou indisponível, disparando fallback "
+                f"{self.fallback_model}"
+            )
+            metrics.inc("openai_hedged_requests_total")
+            fallback_params = {**params, "model": self.fallback_model}
+            fallback = asyncio.create_task(
+                self._create(self.fallback_breaker, fallback_params, tokens)
+            )
+            tasks[fallback] = "fallback"
+
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is primary:
+                            self._latencies.append(time.perf_counter() - started)
+                        metrics.inc("openai_hedge_wins_total", winner=tasks[task])
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _route(self, zapMessage: WhatsappMessage) -> Route | None:
+        """Rota de modelo do batch, com o roteamento ativo"""
+        if self.model_router is None:
+            return None
+        return self.model_router.route(zapMessage)
+
+    def _record_route(
+        self, route: Route | None, started: float, response: Any = None
+    ) -> None:
+        if self.model_router is not None and route is not None:
+            self.model_router.record(route, time.perf_counter() - started, response)
+
+    def _request_params(
+        self, zapMessage: WhatsappMessage, route: Route | None = None
+    ) -> dict[str, Any]:
+        """Parâmetros da chamada ao Responses API"""
+        params: dict[str, Any] = {
+            "prompt": {
+                "id": Config.OPENAI_PROMPT_ID,
+                "version": Config.PROMPT_ID_VERSION,
+            },
+            "input": zapMessage.history_to_AI,
+            "text": {"format": {"type": "text"}},
+            "reasoning": {},
+            "max_output_tokens": 512,
+            "store": True,
+        }
+        if zapMessage.previous_response_id:
+            params["previous_response_id"] = zapMessage.previous_response_id
+        if route is not None:
+            # Sobrescreve o modelo definido no prompt
+            if route.model:
+                params["model"] = route.model
+            if route.max_output_tokens:
+                params["max_output_tokens"] = route.max_output_tokens
+        return params
+
+    def _apply_response(self, zapMessage: WhatsappMessage, response: Any) -> None:
+        """Atualiza a mensagem com a resposta da OpenAI"""
+        zapMessage.response_id = getattr(response, "id", None)
+        self._apply_text(zapMessage, response.output[0].content[0].text)
+
+    def _cached_reply(
+        self, zapMessage: WhatsappMessage
+    ) -> tuple[str | None, str | None]:
+        """Retorna (chave do cache, resposta em cache) para a mensagem"""
+        if self.reply_cache is None:
+            return None, None
+        cache_key = self.reply_cache.key_for(zapMessage)
+        if cache_key is None:
+            return None, None
+        return cache_key, self.reply_cache.get(cache_key)
+
+    def _store_reply(
+        self, cache_key: str | None, zapMessage: WhatsappMessage, started: float
+    ) -> None:
+        """Guarda a resposta gerada no cache, quando a pergunta for elegível"""
+        if self.reply_cache is None or cache_key is None:
+            return
+        text = zapMessage.message.content[0].text or ""
+        self.reply_cache.put(cache_key, text, time.perf_counter() - started)
+
+    def _apply_text(self, zapMessage: WhatsappMessage, text: str) -> None:
+        zapMessage.message = Message(
+            role="assistant",
+            content=[ContentItem(type="output_text", text=text)],
+        )
+        logger.info(f"Resposta gerada com sucesso")
+
+    async def acreate_response(self, zapMessage: WhatsappMessage) -> None:
+        """
+        Versão assíncrona de create_response: não bloqueia o event loop, reaproveita
+        conexões e limita o número de chamadas simultâneas à OpenAI.
+        """
+        cache_key, cached = self._cached_reply(zapMessage)
+        if cached is not None:
+            self._apply_text(zapMessage, cached)
+            return
+
+        started = time.perf_counter()
+        try:
+            route = self._route(zapMessage)
+            params = self._request_params(zapMessage, route)
+            estimated_tokens = estimate_request_tokens(
+                params["input"], params["max_output_tokens"]
+            )
+            response: Any = await self._create_hedged(params, estimated_tokens)
+        except Exception as e:
+            logger.error(f"Erro ao criar resposta da OpenAI", exc_info=True)
+            raise e
+        else:
+            self._apply_response(zapMessage, response)
+            self._store_reply(cache_key, zapMessage, started)
+            self._record_route(route, started, response)
+
+            usage = getattr(response, "usage", None)
+            if self.rate_limiter is not None and usage is not None:
+                await self.rate_limiter.reconcile(estimated_tokens, usage.total_tokens)
+
+    async def astream_response(
+        self,
+        zapMessage: WhatsappMessage,
+        on_chunk: Callable[[str], Awaitable[None]],
+        min_chars: int = Config.STREAM_MIN_CHUNK_CHARS,
+        flush_timeout: float = Config.STREAM_FLUSH_TIMEOUT,
+    ) -> None:
+        """
+        Gera a resposta em streaming, entregando frases/parágrafos completos a
+        `on_chunk` à medida que chegam. Um trecho pendente há mais de
+        `flush_timeout` segundos é enviado mesmo abaixo de `min_chars`.
+        Ao final, zapMessage.message recebe o texto completo.
+        """
+        cache_key, cached = self._cached_reply(zapMessage)
+        if cached is not None:
+            await on_chunk(cached)
+            self._apply_text(zapMessage, cached)
+            return
+
+        started = time.perf_counter()
+        try:
+            route = self._route(zapMessage)
+            params = self._request_params(zapMessage, route)
+            estimated_tokens = estimate_request_tokens(
+                params["input"], params["max_output_tokens"]
+            )
+            # A vaga do semáforo vale até o stream terminar, não só até ele abrir
+            self._get_async_client()
+            assert self._semaphore is not None
+            async with self._semaphore:
+                stream: Any = await self._create(
+                    self.breaker,
+                    {**params, "stream": True},
+                    estimated_tokens,
+                    use_semaphore=False,
+                )
+
+                deltas: asyncio.Queue[str | None] = asyncio.Queue()
+                completed: dict[str, Any] = {}
+
+                async def consume() -> None:
+                    try:
+                        async for event in stream:
+                            if event.type == "response.output_text.delta":
+                                await deltas.put(event.delta)
+                            elif event.type == "response.completed":
+                                completed["response"] = event.response
+                            elif event.type in ("response.failed", "error"):
+                                raise RuntimeError(
+                                    f"Streaming da OpenAI falhou: {event}"
+                                )
+                    finally:
+                        await deltas.put(None)
+
+                consumer = asyncio.create_task(consume())
+                chunker = SentenceChunker(min_chars)
+                full_text: list[str] = []
+                sent_chunks = 0
+
+                async def emit(chunk: str) -> None:
+                    nonlocal sent_chunks
+                    if not chunk:
+                        return
+                    await on_chunk(chunk)
+                    sent_chunks += 1
+                    if sent_chunks == 1:
+                        logger.info(
+                            f"Primeiro trecho enviado em {time.perf_counter() - started:.2f}s"
+                        )
+
+                try:
+                    while True:
+                        timeout = None
+                        if chunker.buffered_since is not None:
+                            timeout = (
+                                chunker.buffered_since
+                                + flush_timeout
+                                - time.monotonic()
+                            )
+                            # Prazo vencido: envia o que der sem esperar (wait_for com
+                            # timeout 0 não lê da fila no Python 3.11)
+                            if timeout <= 0:
+                                await emit(chunker.flush_partial())
+                                continue
+                        try:
+                            delta = await asyncio.wait_for(deltas.get(), timeout)
+                        except asyncio.TimeoutError:
+                            await emit(chunker.flush_partial())
+                            continue
+                        if delta is None:
+                            break
+                        full_text.append(delta)
+                        await emit(chunker.feed(delta))
+
+                    await consumer
+                    await emit(chunker.flush())
+                finally:
+                    consumer.cancel()
+        except Exception as e:
+            logger.error(f"Erro no streaming da resposta da OpenAI", exc_info=True)
+            raise e
+        else:
+            zapMessage.response_id = getattr(completed.get("response"), "id", None)
+            self._apply_text(zapMessage, "".join(full_text))
+            self._store_reply(cache_key, zapMessage, started)
+            self._record_route(route, started, completed.get("response"))
+            logger.info(
+                f"Streaming concluído: {sent_chunks} trechos em "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+
+            usage = getattr(completed.get("response"), "usage", None)
+            if self.rate_limiter is not None and usage is not None:
+                await self.rate_limiter.reconcile(estimated_tokens, usage.total_tokens)
+
+    async def asummarize(self, previous_summary: str, transcript: str) -> str:
+        """Atualiza o resumo da conversa com os novos turnos (sem o prompt do bot)"""
+        input_text = (
+            f"Resumo atual:\n{previous_summary or '(vazio)'}\n\n"
+            f"Novas mensagens:\n{transcript}"
+        )
+        try:
+            response: Any = await self._call_with_backoff(
+                lambda client: client.responses.create(
+                    model=Config.SUMMARY_MODEL,
+                    instructions=SUMMARY_INSTRUCTIONS,
+                    input=input_text,
+                    max_output_tokens=Config.SUMMARY_MAX_TOKENS,
+                    store=False,
+                ),
+                tokens=estimate_request_tokens(input_text, Config.SUMMARY_MAX_TOKENS),
+            )
+        except Exception as e:
+            logger.error(f"Erro ao resumir conversa na OpenAI", exc_info=True)
+            raise e
+        return response.output_text
+
     def create_response(self, zapMessage: WhatsappMessage) -> None:
         """
         Cria uma resposta utilizando o modelo da OpenAI.
         Agora suporta múltiplos tipos de conteúdo.
+        Respeita o limitador de RPM/TPM (aguardando de forma bloqueante), mas não
+        dispara o hedge para o modelo de fallback: isso só existe em acreate_response.
         """
+        cache_key, cached = self._cached_reply(zapMessage)
+        if cached is not None:
+            self._apply_text(zapMessage, cached)
+            return
+
+        started = time.perf_counter()
+        route = self._route(zapMessage)
+        params = self._request_params(zapMessage, route)
+        estimated_tokens = estimate_request_tokens(
+            params["input"], params["max_output_tokens"]
+        )
         try:
-            # Prepara o input para a OpenAI baseado no histórico
-            input_data: Any = zapMessage.history_to_AI
-
-            response: Any = self.client.responses.create(
-                prompt={
-                    "id": Config.OPENAI_PROMPT_ID,
-                    "version": Config.PROMPT_ID_VERSION,
-                },
-                input=input_data,
-                text={"format": {"type": "text"}},
-                reasoning={},
-                max_output_tokens=512,
-                store=True,
-            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire_sync(estimated_tokens)
+            try:
+                response: Any = self.breaker.call(
+                    self.client.responses.create, **params
+                )
+            except BaseException:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund_sync(estimated_tokens)
+                raise
         except Exception as e:
             logger.error(f"Erro ao criar resposta da OpenAI", exc_info=True)
             raise e
         else:
-            # Atualiza a mensagem com a resposta da OpenAI
-            zapMessage.message = Message(
-                role="assistant",
-                content=[
-                    ContentItem(
-                        type="output_text", text=response.output[0].content[0].text
-                    )
-                ],
-            )
-            logger.info(f"Resposta gerada com sucesso")
+            self._apply_response(zapMessage, response)
+            self._store_reply(cache_key, zapMessage, started)
+            self._record_route(route, started, response)
 
-    def transcribe_audio(self, audio_url: str) -> str:
+            usage = getattr(response, "usage", None)
+            if self.rate_limiter is not None and usage is not None:
+                self.rate_limiter.reconcile_sync(estimated_tokens, usage.total_tokens)
+
+    def transcribe_audio(self, audio: str | bytes, filename: str = "audio.ogg") -> str:
         """
-        Usa OpenAI para transcrever áudio para texto
+        Usa OpenAI para transcrever áudio para texto.
+        Aceita o caminho do arquivo ou o conteúdo já descriptografado em memória.
         """
-        logger.info(f"Iniciando transcrição do áudio: {audio_url}")
+        if isinstance(audio, bytes):
+            logger.info(
+                f"Iniciando transcrição do áudio em memória: {len(audio)} bytes"
+            )
+        else:
+            logger.info(f"Iniciando transcrição do áudio: {audio}")
         try:
-            with open(audio_url, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
+            if isinstance(audio, bytes):
+                transcript = self.transcription_breaker.call(
+                    self.client.audio.transcriptions.create,
                     model="gpt-4o-mini-transcribe",
-                    file=audio_file,
+                    file=(filename, audio),
                     response_format="text",
                 )
+            else:
+                with open(audio, "rb") as audio_file:
+                    transcript = self.transcription_breaker.call(
+                        self.client.audio.transcriptions.create,
+                        model="gpt-4o-mini-transcribe",
+                        file=audio_file,
+                        response_format="text",
+                    )
             logger.info(f"Transcrição concluída: {len(transcript)} caracteres")
             return transcript
         except Exception as e:
             logger.error(f"Erro na transcrição OpenAI: {str(e)}")
             raise e
+
+    async def atranscribe_audio(
+        self, audio: str | bytes, filename: str = "audio.ogg"
+    ) -> str:
+        """Versão assíncrona de transcribe_audio"""
+        if isinstance(audio, str):
+            logger.info(f"Iniciando transcrição do áudio: {audio}")
+            with open(audio, "rb") as audio_file:
+                audio = audio_file.read()
+        else:
+            logger.info(
+                f"Iniciando transcrição do áudio em memória: {len(audio)} bytes"
+            )
+
+        try:
+            if self.audio_splitter is not None:
+                chunks = await self.audio_splitter.split(audio)
+                if len(chunks) > 1:
+                    transcript = await self._transcribe_chunks(chunks)
+                    logger.info(f"Transcrição concluída: {len(transcript)} caracteres")
+                    return transcript
+
+            transcript: str = await self._transcribe_once(audio, filename)
+            logger.info(f"Transcrição concluída: {len(transcript)} caracteres")
+            return transcript
+        except Exception as e:
+            logger.error(f"Erro na transcrição OpenAI: {str(e)}")
+            raise e
+
+    async def _transcribe_once(self, audio: bytes, filename: str) -> str:
+        return await self.transcription_breaker.acall(
+            lambda: self._call_with_backoff(
+                lambda client: client.audio.transcriptions.create(
+                    model="gpt-4o-mini-transcribe",
+                    file=(filename, audio),
+                    response_format="text",
+                )
+            )
+        )
+
+    async def _transcribe_chunks(self, chunks: list[tuple[bytes, str]]) -> str:
+        """Transcreve os trechos em paralelo (limitado) e junta o texto em ordem"""
+        semaphore = asyncio.Semaphore(Config.TRANSCRIBE_MAX_PARALLEL)
+        started = time.perf_counter()
+
+        async def transcribe(data: bytes, filename: str) -> str:
+            async with semaphore:
+                return await self._transcribe_once(data, filename)
+
+        parts = await asyncio.gather(
+            *(transcribe(data, filename) for data, filename in chunks)
+        )
+        logger.info(
+            f"{len(chunks)} trechos de áudio transcritos em "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return stitch_transcripts(parts)
@@ -1,6 +1,6 @@
 from .message import Message
 from pydantic import BaseModel
-from typing import Any
+from typing import Any, Optional
 import logging
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -11,6 +11,9 @@ class WhatsappMessage(BaseModel):
     message: Message
     history_to_DB: list[dict[str, Any]] = []
     history_to_AI: list[dict[str, Any]] = []
+    # Encadeamento de contexto no servidor da OpenAI
+    previous_response_id: Optional[str] = None
+    response_id: Optional[str] = None
 
     def add_to_history_DB(self) -> None:
         if len(self.history_to_DB) > 6:
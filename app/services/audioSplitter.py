@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import struct
+import tempfile
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Opus sempre usa granule position em amostras de 48 kHz
+OPUS_SAMPLE_RATE = 48000
+OGG_HEADER = struct.Struct("<4sBBqIIIB")
+_SILENCE_START = re.compile(r"silence_start: (-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end: (-?[\d.]+)")
+_WORD = re.compile(r"\w+")
+
+
+def _crc_table() -> list[int]:
+    table: list[int] = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    """CRC-32 do Ogg (polinômio 0x04C11DB7, sem reflexão)"""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def plan_chunks(
+    duration: float, silences: list[float], window: float, overlap: float
+) -> list[tuple[float, float]]:
+    """
+    Divide [0, duration] em trechos de até `window` segundos. O corte vai para o
+    silêncio mais próximo do fim da janela (no último terço dela); sem silêncio,
+    corta no tamanho fixo e o trecho seguinte começa `overlap` segundos antes.
+    """
+    chunks: list[tuple[float, float]] = []
+    start = 0.0
+    # Evita um último trecho muito curto
+    while duration - start > window * 1.25:
+        target = start + window
+        candidates = [s for s in silences if target - window / 3 <= s <= target]
+        if candidates:
+            cut = max(candidates)
+            chunks.append((start, cut))
+            start = cut
+        else:
+            chunks.append((start, target))
+            start = target - overlap
+    chunks.append((start, duration))
+    return chunks
+
+
+def stitch_transcripts(parts: list[str], max_overlap_words: int = 30) -> str:
+    """Junta as transcrições em ordem removendo as palavras repetidas na sobreposição"""
+    text = ""
+    for part in parts:
+        part = part.strip()
+        if not text:
+            text = part
+            continue
+        previous = [w.lower() for w in _WORD.findall(text)[-max_overlap_words:]]
+        words = part.split()
+        normalized = [" ".join(_WORD.findall(w)).lower() for w in words]
+        for size in range(min(len(previous), len(words)), 0, -1):
+            if previous[-size:] == normalized[:size]:
+                words = words[size:]
+                break
+        if words:
+            text = f"{text} {' '.join(words)}"
+    return text
+
+
+class AudioSplitter:
+    """
+    Divide áudios longos em trechos para transcrição em paralelo. Com o ffmpeg
+    instalado, corta nos silêncios e converte cada trecho para FLAC; sem ele,
+    corta áudios Ogg/Opus (notas de voz do WhatsApp) nas fronteiras de página
+    em janelas fixas com sobreposição.
+    """
+
+    def __init__(
+        self,
+        window: float = Config.TRANSCRIBE_CHUNK_SECONDS,
+        overlap: float = Config.TRANSCRIBE_CHUNK_OVERLAP,
+        max_parallel: int = Config.TRANSCRIBE_MAX_PARALLEL,
+    ) -> None:
+        self.window = window
+        self.overlap = overlap
+        self.max_parallel = max_parallel
+        self.ffmpeg: str | None = shutil.which("ffmpeg")
+        self.ffprobe: str | None = shutil.which("ffprobe")
+
+    async def split(self, data: bytes) -> list[tuple[bytes, str]]:
+        """
+        Retorna os trechos como (conteúdo, nome do arquivo). Áudios curtos ou
+        em formato não suportado voltam como um único trecho.
+        """
+        try:
+            if self.ffmpeg and self.ffprobe:
+                chunks = await self._split_ffmpeg(data)
+            elif data[:4] == b"OggS":
+                # Leitura das páginas e CRC em Python puro: fora do event loop
+                ogg_chunks = await asyncio.get_running_loop().run_in_executor(
+                    None, self._split_ogg, data
+                )
+                chunks = [(c, "audio.ogg") for c in ogg_chunks]
+            else:
+                chunks = []
+        except Exception as e:
+            logger.warning(f"Não foi possível dividir o áudio, enviando inteiro: {e}")
+            chunks = []
+        return chunks or [(data, "audio.ogg")]
+
+    async def _run(self, *args: str) -> tuple[bytes, bytes]:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode(errors="replace")[-500:])
+        return stdout, stderr
+
+    async def _split_ffmpeg(self, data: bytes) -> list[tuple[bytes, str]]:
+        assert self.ffmpeg and self.ffprobe
+        with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as source:
+            source.write(data)
+        try:
+            stdout, _ = await self._run(
+                self.ffprobe,
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "csv=p=0",
+                source.name,
+            )
+            duration = float(stdout.strip())
+            if duration <= self.window * 1.25:
+                return []
+
+            _, stderr = await self._run(
+                self.ffmpeg,
+                "-hide_banner",
+                "-nostats",
+                "-i",
+                source.name,
+                "-af",
+                "silencedetect=noise=-35dB:d=0.4",
+                "-f",
+                "null",
+                "-",
+            )
+            log = stderr.decode(errors="replace")
+            silences = [
+                (float(start) + float(end)) / 2
+                for start, end in zip(
+                    _SILENCE_START.findall(log), _SILENCE_END.findall(log)
+                )
+            ]
+
+            plan = plan_chunks(duration, silences, self.window, self.overlap)
+            semaphore = asyncio.Semaphore(self.max_parallel)
+
+            async def extract(start: float, end: float) -> tuple[bytes, bytes]:
+                assert self.ffmpeg
+                async with semaphore:
+                    return await self._run(
+                        self.ffmpeg,
+                        "-v",
+                        "error",
+                        "-ss",
+                        f"{start:.3f}",
+                        "-to",
+                        f"{end:.3f}",
+                        "-i",
+                        source.name,
+                        "-ac",
+                        "1",
+                        "-ar",
+                        "16000",
+                        "-f",
+                        "flac",
+                        "pipe:1",
+                    )
+
+            # Um ffmpeg por trecho, no máximo `max_parallel` ao mesmo tempo
+            segments = await asyncio.gather(
+                *(extract(start, end) for start, end in plan)
+            )
+            logger.info(
+                f"Áudio de {duration:.0f}s dividido em {len(plan)} trechos "
+                f"({len(silences)} silêncios detectados)"
+            )
+            return [
+                (stdout, f"chunk{index}.flac")
+                for index, (stdout, _) in enumerate(segments)
+            ]
+        finally:
+            os.remove(source.name)
+
+    def _split_ogg(self, data: bytes) -> list[bytes]:
+        """Divide um Ogg/Opus nas fronteiras de página, repetindo os cabeçalhos"""
+        pages: list[tuple[int, int, bytes]] = []  # (granule, header_type, página)
+        offset = 0
+        while offset + OGG_HEADER.size <= len(data):
+            fields = OGG_HEADER.unpack_from(data, offset)
+            if fields[0] != b"OggS":
+                raise ValueError("Página Ogg inválida")
+            segments = fields[7]
+            table_end = offset + OGG_HEADER.size + segments
+            size = table_end - offset + sum(data[table_end - segments : table_end])
+            pages.append((fields[3], fields[2], data[offset : offset + size]))
+            offset += size
+
+        if not pages or pages[0][2][28:36] != b"OpusHead":
+            return []
+
+        # Cabeçalhos (OpusHead e OpusTags) vêm antes do primeiro granule de áudio
+        headers = 0
+        while headers < len(pages) and pages[headers][0] == 0:
+            headers += 1
+        audio = pages[headers:]
+        if not audio:
+            return []
+
+        first_granule = audio[0][0]
+        duration = (audio[-1][0] - first_granule) / OPUS_SAMPLE_RATE
+        if duration <= self.window * 1.25:
+            return []
+
+        def page_time(index: int) -> float:
+            return (audio[index][0] - first_granule) / OPUS_SAMPLE_RATE
+
+        chunks: list[bytes] = []
+        for start, end in plan_chunks(duration, [], self.window, self.overlap):
+            # Só começa em páginas que não continuam um pacote anterior
+            first = next(
+                i
+                for i in range(len(audio))
+                if page_time(i) >= start or i == len(audio) - 1
+            )
+            while first > 0 and audio[first][1] & 0x01:
+                first -= 1
+            last = next(
+                (i for i in range(first, len(audio)) if page_time(i) >= end),
+                len(audio) - 1,
+            )
+            chunks.append(
+                self._rebuild_ogg(
+                    [p for _, _, p in pages[:headers]]
+                    + [p for _, _, p in audio[first : last + 1]]
+                )
+            )
+
+        logger.info(f"Áudio Ogg de {duration:.0f}s dividido em {len(chunks)} trechos")
+        return chunks
+
+    @staticmethod
+    def _rebuild_ogg(pages: list[bytes]) -> bytes:
+        """Renumera as páginas, marca o fim do stream e recalcula os CRCs"""
+        output = bytearray()
+        for sequence, page in enumerate(pages):
+            page = bytearray(page)
+            header_type = page[5] & ~0x04
+            if sequence == len(pages) - 1:
+                header_type |= 0x04
+            page[5] = header_type
+            struct.pack_into("<I", page, 18, sequence)
+            struct.pack_into("<I", page, 22, 0)
+            struct.pack_into("<I", page, 22, _ogg_crc(bytes(page)))
+            output += page
+        return bytes(output)
+
+
+# Instância global
+audio_splitter = AudioSplitter()
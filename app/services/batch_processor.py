@@ -6,6 +6,12 @@ from typing import Dict, Any
 
 from app.core.config import Config
 from .messageProcessor import MessageProcessor
+from .decryptExecutor import decrypt_executor
+from .fileJanitor import file_janitor
+from .conversationSummarizer import conversation_summarizer
+from .deliveryQueue import delivery_queue
+from .outbox import outbox
+from .historyWriter import history_writer
 from app.database import redis_queue
 
 logger = logging.getLogger(__name__)
@@ -21,6 +27,15 @@ class GlobalBatchProcessor:
 
     async def start_monitoring(self):
         """Inicia o monitoramento contínuo dos batches"""
+        file_janitor.start()
+        if Config.OUTBOX_ENABLED:
+            outbox.start()
+            if Config.OPENAI_STREAMING:
+                # Os trechos já são enviados durante a geração: não há resposta a enfileirar
+                logger.warning(
+                    "OUTBOX_ENABLED ignorado com OPENAI_STREAMING=true: "
+                    "as respostas em streaming não passam pelo outbox"
+                )
         self._batch_monitor_task = asyncio.create_task(self._monitor_batches())
 
     async def add_message(self, phone_number: str, message_data: dict[str, Any]):
@@ -106,12 +121,16 @@ class GlobalBatchProcessor:
                             # Remove a chave e processa o batch
                             phone_number = key.decode().split(":")[1]
 
+                            # Mantém a ordem: um batch por telefone de cada vez
+                            if phone_number in self.processing_tasks:
+                                continue
+
                             removed = await asyncio.get_event_loop().run_in_executor(
                                 None, lambda: redis_queue.redis.delete(key)
                             )
 
                             if removed:
-                                await self._process_scheduled_batch(phone_number)
+                                self._start_batch_task(phone_number)
 
                     except Exception as e:
                         logger.error(f"Erro ao processar batch key {key}: {e}")
@@ -124,6 +143,12 @@ class GlobalBatchProcessor:
                 logger.error(f"Erro no monitor de batches: {e}")
                 await asyncio.sleep(1)
 
+    def _start_batch_task(self, phone_number: str) -> None:
+        """Processa o batch em uma task própria para não bloquear as demais conversas"""
+        task = asyncio.create_task(self._process_scheduled_batch(phone_number))
+        self.processing_tasks[phone_number] = task
+        task.add_done_callback(lambda _: self.processing_tasks.pop(phone_number, None))
+
     async def _process_scheduled_batch(self, phone_number: str):
         """Processa um batch agendado"""
         try:
@@ -156,4 +181,20 @@ class GlobalBatchProcessor:
                 await self._batch_monitor_task
             except asyncio.CancelledError:
                 pass
+
+        # Aguarda os batches em andamento terminarem
+        if self.processing_tasks:
+            logger.info(
+                f"Aguardando {len(self.processing_tasks)} batches em processamento"
+            )
+            await asyncio.gather(
+                *self.processing_tasks.values(), return_exceptions=True
+            )
+
+        await conversation_summarizer.shutdown()
+        await outbox.stop()
+        await history_writer.shutdown()
+        await delivery_queue.shutdown()
+        decrypt_executor.shutdown()
+        file_janitor.stop()
         logger.info("Monitor de batches parado")
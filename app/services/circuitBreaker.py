@@ -0,0 +1,126 @@
+from typing import Awaitable, Callable, Literal, TypeVar
+import logging
+import threading
+import time
+
+from app.core.config import Config
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+metrics.describe(
+    "circuit_breaker_transitions_total", "Mudanças de estado dos circuit breakers"
+)
+metrics.describe(
+    "circuit_breaker_rejections_total", "Chamadas recusadas com o circuito aberto"
+)
+
+
+class CircuitOpenError(Exception):
+    """O serviço está com o circuito aberto e a chamada foi recusada sem tentar"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com meia-abertura: após `failure_threshold` falhas seguidas
+    o circuito abre e recusa chamadas por `reset_timeout` segundos. Depois disso
+    deixa passar até `half_open_max` chamadas de teste; um sucesso fecha o
+    circuito e uma falha o abre de novo.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = Config.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = Config.CIRCUIT_RESET_TIMEOUT,
+        half_open_max: int = 1,
+        is_failure: Callable[[BaseException], bool] = lambda e: True,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.is_failure = is_failure
+        self.state: CircuitState = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuito '{self.name}': {self.state} -> {state}")
+        self.state = state
+        metrics.inc("circuit_breaker_transitions_total", name=self.name, state=state)
+
+    def allow(self) -> bool:
+        """Indica se a chamada pode ser feita (reserva uma sonda na meia-abertura)"""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._transition("half_open")
+                self._probes = 0
+            if self.state == "half_open":
+                if self._probes >= self.half_open_max:
+                    return False
+                self._probes += 1
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+    def _release_probe(self) -> None:
+        """Devolve a sonda quando a chamada terminou sem dizer nada sobre o serviço"""
+        with self._lock:
+            if self.state == "half_open" and self._probes > 0:
+                self._probes -= 1
+
+    def _check(self) -> None:
+        if not self.allow():
+            metrics.inc("circuit_breaker_rejections_total", name=self.name)
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto")
+
+    def _settle(self, error: BaseException | None) -> None:
+        if error is None:
+            self.record_success()
+        elif isinstance(error, Exception) and self.is_failure(error):
+            self.record_failure()
+        else:
+            # Erros do cliente e cancelamentos não indicam falha do serviço
+            self._release_probe()
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Executa uma chamada síncrona protegida pelo circuito"""
+        self._check()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._settle(e)
+            raise
+        self._settle(None)
+        return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Executa uma chamada assíncrona protegida pelo circuito"""
+        self._check()
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._settle(e)
+            raise
+        self._settle(None)
+        return result
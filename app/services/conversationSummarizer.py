@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Any
+
+from app.core.config import Config
+from app.database import db_current
+from app.integrations import clientAI
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Como as mídias aparecem no texto enviado ao resumidor
+MEDIA_LABELS: dict[str, str] = {
+    "input_audio": "[áudio]",
+    "input_image": "[imagem]",
+    "input_file": "[arquivo]",
+}
+
+
+class ConversationSummarizer:
+    """
+    Resume em segundo plano as mensagens que saem da janela recente da conversa.
+    O resumo fica no documento da conversa junto com o id da última mensagem
+    resumida, e cada rodada só envia à OpenAI as mensagens que envelheceram
+    desde a anterior.
+    """
+
+    def __init__(
+        self,
+        keep_messages: int = Config.SUMMARY_KEEP_MESSAGES,
+        min_batch: int = Config.SUMMARY_MIN_BATCH,
+    ) -> None:
+        self.keep_messages = keep_messages
+        self.min_batch = min_batch
+        self._tasks: dict[str, asyncio.Task[Any]] = {}
+
+    @staticmethod
+    def unsummarized(
+        messages: list[dict[str, Any]], last_id: str | None
+    ) -> list[dict[str, Any]]:
+        """Mensagens posteriores à última resumida"""
+        if last_id:
+            for index in range(len(messages) - 1, -1, -1):
+                if messages[index].get("id") == last_id:
+                    return messages[index + 1 :]
+        # Sem resumo ou a última resumida já saiu do histórico: todas são novas
+        return messages
+
+    async def apply(
+        self, phone_number: str, messages: list[dict[str, Any]]
+    ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+        """Troca as mensagens já resumidas pelo resumo da conversa"""
+        loop = asyncio.get_running_loop()
+        try:
+            state = await loop.run_in_executor(
+                None, db_current.get_summary, phone_number
+            )
+        except Exception as e:
+            logger.warning(f"Resumo indisponível para {phone_number}: {e}")
+            return messages, None
+
+        if not state["summary"]:
+            return messages, None
+
+        summary_message = {
+            "role": "developer",
+            "content": f"Resumo da conversa anterior com o cliente:\n{state['summary']}",
+        }
+        return self.unsummarized(messages, state["last_id"]), summary_message
+
+    def schedule(self, phone_number: str) -> None:
+        """Agenda a atualização do resumo sem atrasar a resposta"""
+        if phone_number in self._tasks:
+            return
+        task = asyncio.create_task(self.summarize(phone_number))
+        self._tasks[phone_number] = task
+        task.add_done_callback(lambda _: self._tasks.pop(phone_number, None))
+
+    async def summarize(self, phone_number: str) -> bool:
+        """Incorpora ao resumo as mensagens que saíram da janela recente"""
+        # Chamadas ao banco são síncronas: rodam fora do event loop
+        loop = asyncio.get_running_loop()
+        try:
+            state = await loop.run_in_executor(
+                None, db_current.get_summary, phone_number
+            )
+            messages = await loop.run_in_executor(
+                None,
+                lambda: db_current.get_history(
+                    phone_number, limit=Config.HISTORY_MAX_MESSAGES
+                ),
+            )
+
+            pending = self.unsummarized(messages, state["last_id"])
+            aged = pending[: -self.keep_messages] if self.keep_messages else pending
+            if len(aged) < self.min_batch:
+                return False
+
+            # Mensagens antigas sem id não podem marcar o ponto do resumo
+            last_id = next((m["id"] for m in reversed(aged) if m.get("id")), None)
+            if last_id is None:
+                return False
+
+            summary = await clientAI.asummarize(state["summary"], self._render(aged))
+            await loop.run_in_executor(
+                None, db_current.save_summary, phone_number, summary, last_id
+            )
+            logger.info(
+                f"Resumo de {phone_number} atualizado com {len(aged)} mensagens"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao resumir conversa de {phone_number}: {e}")
+            return False
+
+    def _render(self, messages: list[dict[str, Any]]) -> str:
+        """Converte as mensagens em texto simples para o resumidor"""
+        lines: list[str] = []
+        for message in messages:
+            speaker = "Assistente" if message.get("role") == "assistant" else "Cliente"
+            parts: list[str] = []
+            for item in message.get("content", []):
+                if item.get("text"):
+                    parts.append(item["text"])
+                elif item.get("type") in MEDIA_LABELS:
+                    label = MEDIA_LABELS[item["type"]]
+                    caption = item.get("caption")
+                    parts.append(f"{label} {caption}" if caption else label)
+            if parts:
+                lines.append(f"{speaker}: {' '.join(parts)}")
+        return "\n".join(lines)
+
+    async def shutdown(self) -> None:
+        """Aguarda os resumos em andamento"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+# Instância global
+conversation_summarizer = ConversationSummarizer()
@@ -0,0 +1,147 @@
+from typing import Any, Literal
+import json
+import logging
+import time
+import uuid
+
+from app.database import redis_queue
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# "process": falhou antes de salvar a mensagem do usuário no histórico
+# "openai": a mensagem do usuário já está no histórico; falhou ao gerar/enviar
+# "delivered": a resposta já foi enviada; falta só gravar `records` no histórico
+BatchStage = Literal["process", "openai", "delivered"]
+
+metrics.describe("dead_letter_batches_total", "Batches que falharam e foram guardados")
+metrics.describe("dead_letter_replays_total", "Batches reprocessados do dead-letter")
+
+
+class BatchError(Exception):
+    """
+    Falha de um batch, com a etapa em que parou, as mensagens brutas e, na
+    etapa "delivered", os registros do histórico da resposta já enviada
+    """
+
+    def __init__(
+        self,
+        stage: BatchStage,
+        raw_messages: list[dict[str, Any]],
+        error: BaseException,
+        records: list[dict[str, Any]] | None = None,
+    ) -> None:
+        super().__init__(f"Batch falhou na etapa '{stage}': {error}")
+        self.stage: BatchStage = stage
+        self.raw_messages = raw_messages
+        self.error = error
+        self.records = records or []
+
+
+class DeadLetterStore:
+    """
+    Guarda no Redis os batches que falharam, com o erro, a etapa e as mensagens
+    brutas (que já foram removidas da fila por get_pending_messages), para que
+    possam ser reprocessados depois com replay.py.
+    """
+
+    def __init__(self, prefix: str = "dead_batches") -> None:
+        self.index_key = prefix
+        self.entry_prefix = f"{prefix}:entry:"
+
+    @property
+    def redis(self):
+        return redis_queue.redis
+
+    def _entry_key(self, entry_id: str) -> str:
+        return f"{self.entry_prefix}{entry_id}"
+
+    def add(self, phone_number: str, failure: BatchError) -> str | None:
+        """Registra o batch que falhou; nunca levanta exceção"""
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(
+                self._entry_key(entry_id),
+                mapping={
+                    "phone_number": phone_number,
+                    "stage": failure.stage,
+                    "error": f"{type(failure.error).__name__}: {failure.error}"[:1000],
+                    "raw_messages": json.dumps(
+                        failure.raw_messages, ensure_ascii=False
+                    ),
+                    "records": json.dumps(failure.records, ensure_ascii=False),
+                    "attempts": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            )
+            pipe.zadd(self.index_key, {entry_id: now})
+            pipe.execute()
+        except Exception as e:
+            # Último recurso: as mensagens ficam no log para recuperação manual
+            logger.critical(
+                f"Falha ao guardar batch de {phone_number} no dead-letter ({e}): "
+                f"{json.dumps(failure.raw_messages, ensure_ascii=False)}"
+            )
+            return None
+
+        metrics.inc("dead_letter_batches_total", stage=failure.stage)
+        logger.error(
+            f"Batch de {phone_number} guardado no dead-letter {entry_id} "
+            f"(etapa {failure.stage})"
+        )
+        return entry_id
+
+    def get(self, entry_id: str) -> dict[str, Any] | None:
+        raw = self.redis.hgetall(self._entry_key(entry_id))
+        if not raw:
+            return None
+        entry: dict[str, Any] = {k.decode(): v.decode() for k, v in raw.items()}  # type: ignore
+        entry["id"] = entry_id
+        entry["raw_messages"] = json.loads(entry["raw_messages"])
+        entry["records"] = json.loads(entry.get("records", "[]"))
+        entry["attempts"] = int(entry["attempts"])
+        return entry
+
+    def list(
+        self, phone_number: str | None = None, stage: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Entradas do dead-letter, da mais antiga para a mais recente"""
+        entries: list[dict[str, Any]] = []
+        for raw_id in self.redis.zrange(self.index_key, 0, -1):
+            entry_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            entry = self.get(entry_id)
+            if entry is None:
+                self.redis.zrem(self.index_key, entry_id)
+                continue
+            if phone_number and entry["phone_number"] != phone_number:
+                continue
+            if stage and entry["stage"] != stage:
+                continue
+            entries.append(entry)
+        return entries
+
+    def mark_failed(self, entry_id: str, failure: BatchError) -> None:
+        """Atualiza a entrada após um replay que falhou de novo"""
+        self.redis.hset(
+            self._entry_key(entry_id),
+            mapping={
+                "stage": failure.stage,
+                "error": f"{type(failure.error).__name__}: {failure.error}"[:1000],
+                "records": json.dumps(failure.records, ensure_ascii=False),
+                "updated_at": time.time(),
+            },
+        )
+        self.redis.hincrby(self._entry_key(entry_id), "attempts", 1)
+
+    def remove(self, entry_id: str) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrem(self.index_key, entry_id)
+        pipe.delete(self._entry_key(entry_id))
+        pipe.execute()
+
+
+# Instância global
+dead_letters = DeadLetterStore()
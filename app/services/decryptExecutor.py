@@ -0,0 +1,109 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable, Literal
+import logging
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+EXECUTOR_MODES = Literal["inline", "thread", "process"]
+
+
+class DecryptExecutor:
+    """
+    Executa jobs de descriptografia de mídia fora do event loop.
+
+    - inline: executa na thread chamadora (comportamento original)
+    - thread: pool de threads; AES e HMAC liberam o GIL em blocos grandes
+    - process: pool de processos, para usar todos os núcleos
+
+    Os jobs de `run` recebem apenas links/caminhos e chaves e devolvem só um
+    resultado pequeno: o caminho/URL do arquivo gravado em disco, o texto
+    extraído de um documento ou a imagem já reduzida. Jobs que devolvem a
+    mídia inteira (hand-off em memória, áudio para transcrição) usam
+    `run_local`, que no modo process roda em threads do processo principal,
+    então o conteúdo da mídia nunca é serializado entre processos.
+    """
+
+    def __init__(
+        self,
+        mode: str = Config.DECRYPT_EXECUTOR_MODE,
+        max_workers: int = Config.DECRYPT_WORKERS,
+    ) -> None:
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Modo de execução de descriptografia inválido: {mode}")
+
+        self.mode: EXECUTOR_MODES = mode  # type: ignore[assignment]
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Executor | None = None
+        self._local_executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        """Cria o pool sob demanda"""
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    # spawn evita herdar locks de threads do processo principal
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="decrypt",
+                    )
+                logger.info(
+                    f"Pool de descriptografia iniciado - modo: {self.mode}, "
+                    f"workers: {self.max_workers}"
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Executa `fn` no modo configurado sem bloquear o event loop"""
+        if self.mode == "inline":
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(fn, *args, **kwargs)
+        )
+
+    async def run_local(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa `fn` sem bloquear o event loop e sem sair do processo: para jobs
+        que devolvem a mídia inteira. No modo process usa um pool de threads.
+        """
+        if self.mode != "process":
+            return await self.run(fn, *args, **kwargs)
+
+        with self._lock:
+            if self._local_executor is None:
+                self._local_executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="decrypt-local",
+                )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._local_executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        """Finaliza o pool aguardando os jobs em andamento"""
+        with self._lock:
+            if self._local_executor is not None:
+                self._local_executor.shutdown(wait=True)
+                self._local_executor = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                logger.info("Pool de descriptografia finalizado")
+
+
+# Instância global
+decrypt_executor = DecryptExecutor()
@@ -0,0 +1,191 @@
+from dataclasses import dataclass, field
+from typing import Any
+import asyncio
+import logging
+import time
+
+from app.core.config import Config
+from app.integrations import clientEvolution
+from app.utils.metrics import metrics
+from app.utils.textChunker import split_text
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+metrics.describe("delivery_sent_total", "Mensagens entregues à Evolution")
+metrics.describe("delivery_failed_total", "Mensagens que falharam na entrega")
+metrics.describe(
+    "delivery_latency_seconds", "Tempo entre enfileirar e entregar cada mensagem"
+)
+
+
+class PartialDeliveryError(Exception):
+    """O envio falhou depois que parte das partes do texto já foi entregue"""
+
+    def __init__(
+        self, delivered: list[str], remaining: list[str], error: Exception
+    ) -> None:
+        super().__init__(
+            f"{len(delivered)} de {len(delivered) + len(remaining)} partes "
+            f"entregues: {error}"
+        )
+        self.delivered = delivered
+        self.remaining = remaining
+        self.error = error
+
+
+class _AsyncTokenBucket:
+    """Token bucket para o event loop: aguarda (sem falhar) até haver cota"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        # Reserva o token sem await (atômico no event loop) e espera fora da
+        # seção crítica: cada destinatário aguarda só a sua vez, sem fila única
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            # Devolve a reserva de quem desistiu
+            self._tokens += 1
+            raise
+
+
+@dataclass
+class _Delivery:
+    to_number: str
+    parts: list[str]
+    future: asyncio.Future[None]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class DeliveryQueue:
+    """
+    Fila de envio para a Evolution. Cada destinatário tem sua fila FIFO e um
+    worker próprio (envios em paralelo entre destinatários, em ordem para o
+    mesmo número), respeitando um limite global de mensagens por segundo e um
+    intervalo mínimo entre mensagens para o mesmo número. Textos longos são
+    divididos em partes.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = Config.DELIVERY_GLOBAL_RATE,
+        global_burst: int = Config.DELIVERY_GLOBAL_BURST,
+        per_number_interval: float = Config.DELIVERY_PER_NUMBER_INTERVAL,
+        max_chars: int = Config.DELIVERY_MAX_CHARS,
+    ) -> None:
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.per_number_interval = per_number_interval
+        self.max_chars = max_chars
+        self._queues: dict[str, asyncio.Queue[_Delivery]] = {}
+        self._workers: dict[str, asyncio.Task[Any]] = {}
+        self._last_sent: dict[str, float] = {}
+        self._bucket: _AsyncTokenBucket | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_bucket(self) -> _AsyncTokenBucket:
+        """Recria o estado assíncrono se o event loop mudou"""
+        loop = asyncio.get_running_loop()
+        if self._bucket is None or self._loop is not loop:
+            self._bucket = _AsyncTokenBucket(self.global_rate, self.global_burst)
+            self._queues.clear()
+            self._workers.clear()
+            self._loop = loop
+        return self._bucket
+
+    async def send(self, to_number: str, text: str) -> None:
+        """
+        Enfileira o texto e aguarda a entrega de todas as suas partes. Se o
+        envio falhar depois da primeira parte, levanta PartialDeliveryError com
+        as partes entregues e as que faltam.
+        """
+        self._get_bucket()
+        delivery = _Delivery(
+            to_number,
+            split_text(text, self.max_chars),
+            asyncio.get_running_loop().create_future(),
+        )
+        if not delivery.parts:
+            return
+
+        queue = self._queues.setdefault(to_number, asyncio.Queue())
+        queue.put_nowait(delivery)
+        if to_number not in self._workers:
+            self._workers[to_number] = asyncio.create_task(self._worker(to_number))
+        await delivery.future
+
+    async def _worker(self, to_number: str) -> None:
+        """Entrega as mensagens de um número em ordem e encerra quando a fila esvazia"""
+        queue = self._queues[to_number]
+        try:
+            while not queue.empty():
+                delivery = queue.get_nowait()
+                sent = 0
+                try:
+                    for part in delivery.parts:
+                        await self._send_part(to_number, part)
+                        sent += 1
+                except Exception as e:
+                    metrics.inc("delivery_failed_total")
+                    error: Exception = e
+                    if sent:
+                        # Quem reenviar deve mandar só as partes que faltam
+                        error = PartialDeliveryError(
+                            delivery.parts[:sent], delivery.parts[sent:], e
+                        )
+                    if not delivery.future.done():
+                        delivery.future.set_exception(error)
+                else:
+                    metrics.observe(
+                        "delivery_latency_seconds",
+                        time.perf_counter() - delivery.enqueued_at,
+                    )
+                    if not delivery.future.done():
+                        delivery.future.set_result(None)
+        finally:
+            self._workers.pop(to_number, None)
+            if queue.empty():
+                self._queues.pop(to_number, None)
+
+    async def _send_part(self, to_number: str, text: str) -> None:
+        # Intervalo mínimo entre mensagens para o mesmo número
+        last_sent = self._last_sent.get(to_number)
+        if last_sent is not None:
+            wait = last_sent + self.per_number_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        await self._get_bucket().acquire()
+        await asyncio.get_running_loop().run_in_executor(
+            None, clientEvolution.send_text, to_number, text
+        )
+        self._last_sent[to_number] = time.monotonic()
+        metrics.inc("delivery_sent_total")
+
+        # Evita crescer indefinidamente com números que não falam mais
+        if len(self._last_sent) > 10000:
+            cutoff = time.monotonic() - self.per_number_interval
+            self._last_sent = {
+                number: sent
+                for number, sent in self._last_sent.items()
+                if sent > cutoff
+            }
+
+    async def shutdown(self) -> None:
+        """Aguarda as entregas pendentes"""
+        if self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+
+# Instância global
+delivery_queue = DeliveryQueue()
@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import logging
+
+from app.core.config import Config
+from app.database import redis_queue
+from app.integrations.decrypt import decryptAndExtractText
+from app.services.decryptExecutor import decrypt_executor
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class DocumentExtractor:
+    """
+    Extrai o texto dos documentos uma única vez e guarda no Redis pelo hash do
+    conteúdo. Um segundo índice pela media_key evita baixar e descriptografar
+    de novo o mesmo anexo a cada turno em que ele continua no histórico.
+    """
+
+    def __init__(
+        self,
+        ttl: int = Config.DOCUMENT_CACHE_TTL,
+        max_tokens: int = Config.DOCUMENT_MAX_TOKENS,
+        chunk_tokens: int = Config.DOCUMENT_CHUNK_TOKENS,
+    ) -> None:
+        self.ttl = ttl
+        # Acima do limite por mensagem o texto estouraria o orçamento do histórico
+        self.max_tokens = min(max_tokens, Config.HISTORY_ITEM_MAX_TOKENS)
+        self.chunk_tokens = chunk_tokens
+
+    def _media_key(self, media_key: str) -> str:
+        return f"doc_text:media:{hashlib.sha256(media_key.encode()).hexdigest()}"
+
+    def _content_key(self, content_hash: str) -> str:
+        return f"doc_text:{content_hash}"
+
+    def _get(self, key: str) -> str | None:
+        try:
+            value = redis_queue.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache de documentos: {e}")
+            return None
+        return value.decode() if isinstance(value, bytes) else value  # type: ignore
+
+    def _save(self, media_key: str, content_hash: str, text: str) -> None:
+        try:
+            pipe = redis_queue.redis.pipeline()
+            pipe.set(self._content_key(content_hash), text, ex=self.ttl)
+            pipe.set(self._media_key(media_key), content_hash, ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao salvar cache de documentos: {e}")
+
+    async def get_text(self, media_key: str, link: str, mimetype: str) -> str:
+        """
+        Texto do documento já limitado ao orçamento de tokens, ou "" quando não
+        há texto extraível (formato não suportado ou PDF escaneado).
+        O documento só é baixado quando ainda não está no cache.
+        """
+        content_hash = self._get(self._media_key(media_key))
+        if content_hash:
+            cached = self._get(self._content_key(content_hash))
+            if cached is not None:
+                return cached
+
+        # Download, extração e corte rodam no mesmo job do pool: só o texto volta
+        content_hash, text = await decrypt_executor.run(
+            decryptAndExtractText,
+            link,
+            base64.b64decode(media_key),
+            mimetype,
+            self.max_tokens,
+            self.chunk_tokens,
+        )
+        logger.info(f"Documento {content_hash[:12]} extraído: {len(text)} caracteres")
+
+        self._save(media_key, content_hash, text)
+        return text
+
+
+# Instância global
+document_extractor = DocumentExtractor()
@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Arquivos gerados por decryptByLink: <uuid hex>.<ext> (e .part durante a escrita)
+TEMP_FILE_PATTERN = re.compile(r"^[0-9a-f]{32}\.\w+(\.part)?$")
+
+
+@dataclass
+class _TempFile:
+    deadline: float
+    size: int
+    leases: int = 0
+
+
+class FileJanitor:
+    """
+    Remove os arquivos temporários de mídia com uma única thread.
+
+    Cada arquivo registrado recebe um prazo (heap de deadlines) e pode ter
+    leases: enquanto houver lease (ex.: a OpenAI ainda pode buscar a URL) o
+    arquivo não é removido, mesmo vencido. Uma cota de disco remove
+    antecipadamente os arquivos mais antigos sem lease, e na inicialização os
+    órfãos deixados por uma queda anterior são apagados.
+    """
+
+    def __init__(
+        self,
+        directory: str = "static",
+        ttl: float = Config.TEMP_FILE_TTL,
+        quota_bytes: int = Config.TEMP_FILES_MAX_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+
+        self._files: dict[str, _TempFile] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._total_bytes = 0
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Remove órfãos e inicia a thread de limpeza"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="file-janitor", daemon=True
+            )
+        self.sweep_orphans()
+        self._thread.start()
+        logger.info("Limpeza de arquivos temporários iniciada")
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        logger.info("Limpeza de arquivos temporários parada")
+
+    def sweep_orphans(self) -> int:
+        """Remove arquivos temporários não registrados mais antigos que o TTL"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        removed = 0
+        limit = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            if not (entry.is_file() and TEMP_FILE_PATTERN.match(entry.name)):
+                continue
+            with self._condition:
+                if entry.path in self._files:
+                    continue
+            try:
+                if entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Erro ao remover arquivo órfão {entry.path}: {e}")
+
+        if removed:
+            logger.info(f"{removed} arquivos temporários órfãos removidos")
+        return removed
+
+    def register(
+        self, path: str, lease: bool = False, ttl: float | None = None
+    ) -> None:
+        """Agenda a remoção do arquivo; com `lease=True` ele fica retido até `release`"""
+        path = os.path.normpath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        deadline = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._condition:
+            if path not in self._files:
+                self._files[path] = _TempFile(deadline, size)
+                self._total_bytes += size
+            else:
+                self._files[path].deadline = max(self._files[path].deadline, deadline)
+            if lease:
+                self._files[path].leases += 1
+            heapq.heappush(self._heap, (deadline, next(self._counter), path))
+            self._enforce_quota()
+            self._condition.notify()
+
+    def acquire(self, path: str) -> bool:
+        """Adiciona um lease a um arquivo registrado"""
+        with self._condition:
+            temp_file = self._files.get(os.path.normpath(path))
+            if temp_file is None:
+                return False
+            temp_file.leases += 1
+            return True
+
+    def release(self, path: str) -> None:
+        """Libera um lease; se o prazo já venceu o arquivo é removido na hora"""
+        path = os.path.normpath(path)
+        with self._condition:
+            temp_file = self._files.get(path)
+            if temp_file is None or temp_file.leases == 0:
+                return
+            temp_file.leases -= 1
+            if temp_file.leases == 0 and temp_file.deadline <= time.monotonic():
+                self._delete(path)
+
+    def _delete(self, path: str) -> None:
+        """Remove o arquivo (chamado com o lock adquirido)"""
+        temp_file = self._files.pop(path, None)
+        if temp_file is not None:
+            self._total_bytes -= temp_file.size
+        try:
+            os.remove(path)
+            logger.info(f"Arquivo temporário removido: {path}")
+        except FileNotFoundError:
+            logger.warning(f"Arquivo temporário não encontrado: {path}")
+        except OSError as e:
+            logger.error(f"Erro ao remover arquivo temporário {path}: {e}")
+
+    def _enforce_quota(self) -> None:
+        """Remove os arquivos mais antigos sem lease enquanto a cota estiver excedida"""
+        if self._total_bytes <= self.quota_bytes:
+            return
+        for path in sorted(self._files, key=lambda p: self._files[p].deadline):
+            if self._total_bytes <= self.quota_bytes:
+                break
+            if self._files[path].leases == 0:
+                logger.warning(
+                    f"Cota de arquivos temporários excedida, removendo {path}"
+                )
+                self._delete(path)
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._stopping:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _, path = heapq.heappop(self._heap)
+                    temp_file = self._files.get(path)
+                    # Entradas antigas do heap (prazo estendido) são ignoradas
+                    if temp_file is None or temp_file.deadline > deadline:
+                        continue
+                    if temp_file.leases == 0:
+                        self._delete(path)
+
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._condition.wait(timeout)
+
+
+# Instância global
+file_janitor = FileJanitor()
@@ -0,0 +1,105 @@
+from typing import Any
+import asyncio
+import logging
+import time
+
+from app.core.config import Config
+from app.database import db_current
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+metrics.describe("history_flushes_total", "Escritas em lote do histórico no banco")
+metrics.describe("history_flush_conversations", "Conversas por escrita em lote")
+metrics.describe("history_flush_seconds", "Duração das escritas em lote")
+
+
+class HistoryWriter:
+    """
+    Escrita do histórico com group commit. As mensagens de várias conversas que
+    chegam dentro de `flush_interval` viram uma única escrita em lote
+    (db_current.save_bulk). `write` só retorna depois que o lote foi gravado:
+    nada que foi confirmado ao chamador se perde, o custo é esperar até
+    `flush_interval` a mais. Desativado, grava direto com save_many.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = Config.HISTORY_WRITE_BEHIND,
+        flush_interval: float = Config.HISTORY_FLUSH_INTERVAL,
+        max_batch: int = Config.HISTORY_FLUSH_MAX_BATCH,
+    ) -> None:
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending: dict[str, list[dict[str, Any]]] = {}
+        self._waiters: list[asyncio.Future[None]] = []
+        self._timer: asyncio.Task[None] | None = None
+        self._flushes: set[asyncio.Task[None]] = set()
+        self._lock: asyncio.Lock | None = None
+
+    async def write(self, phone_number: str, messages: list[dict[str, Any]]) -> None:
+        """Grava as mensagens no histórico (na ordem) e espera a confirmação"""
+        if not self.enabled:
+            db_current.save_many(phone_number, messages)
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[None] = loop.create_future()
+        self._pending.setdefault(phone_number, []).extend(messages)
+        self._waiters.append(waiter)
+
+        if len(self._pending) >= self.max_batch:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        await waiter
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Grava tudo o que está pendente em uma única escrita em lote"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Um lote por vez: mantém a ordem das mensagens de uma mesma conversa
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, waiters = self._pending, self._waiters
+            self._pending, self._waiters = {}, []
+
+            started = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, db_current.save_bulk, batch
+                )
+            except Exception as e:
+                logger.error(f"Erro ao gravar {len(batch)} conversas em lote: {e}")
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                return
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            metrics.inc("history_flushes_total")
+            metrics.observe("history_flush_conversations", len(batch))
+            metrics.observe("history_flush_seconds", time.perf_counter() - started)
+
+    async def shutdown(self) -> None:
+        """Grava o que ainda está pendente"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+
+# Instância global
+history_writer = HistoryWriter()
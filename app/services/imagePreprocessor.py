@@ -0,0 +1,120 @@
+import base64
+import hashlib
+import logging
+import time
+
+from app.core.config import Config
+from app.database import redis_queue
+from app.integrations.decrypt import decryptAndDownscale
+from app.services.decryptExecutor import decrypt_executor
+from app.utils.imageProcessing import estimate_image_tokens
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+metrics.describe("image_bytes_before_total", "Bytes das imagens descriptografadas")
+metrics.describe("image_bytes_after_total", "Bytes das imagens enviadas à OpenAI")
+metrics.describe("image_tokens_before_total", "Tokens estimados das imagens originais")
+metrics.describe("image_tokens_after_total", "Tokens estimados das imagens reduzidas")
+metrics.describe("image_preprocess_seconds", "Tempo de download + redução por imagem")
+metrics.describe("image_cache_hits_total", "Imagens reduzidas servidas pelo cache")
+
+
+class ImagePreprocessor:
+    """
+    Reduz, remove metadados e recomprime as imagens antes de entregá-las à
+    OpenAI. O resultado fica no Redis pelo hash do conteúdo, com um índice
+    pela media_key para não baixar a mesma imagem a cada turno.
+    """
+
+    def __init__(
+        self,
+        max_dimension: int = Config.IMAGE_MAX_DIMENSION,
+        quality: int = Config.IMAGE_JPEG_QUALITY,
+        ttl: int = Config.IMAGE_CACHE_TTL,
+    ) -> None:
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.ttl = ttl
+
+    def _media_key(self, media_key: str) -> str:
+        return f"img:media:{hashlib.sha256(media_key.encode()).hexdigest()}"
+
+    def _content_key(self, content_hash: str) -> str:
+        return f"img:{content_hash}:{self.max_dimension}:{self.quality}"
+
+    def _load_cached(self, key: str) -> tuple[bytes, str] | None:
+        try:
+            cached = redis_queue.redis.hmget(key, "data", "mimetype")
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache de imagens: {e}")
+            return None
+        if not cached or cached[0] is None:  # type: ignore[index]
+            return None
+        data, mimetype = cached  # type: ignore[misc]
+        return data, mimetype.decode()
+
+    def _save(
+        self, media_key: str, content_key: str, data: bytes, mimetype: str
+    ) -> None:
+        try:
+            pipe = redis_queue.redis.pipeline()
+            pipe.hset(content_key, mapping={"data": data, "mimetype": mimetype})
+            pipe.expire(content_key, self.ttl)
+            pipe.set(self._media_key(media_key), content_key, ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao salvar cache de imagens: {e}")
+
+    async def process(
+        self, media_key: str, link: str, media_type: str
+    ) -> tuple[bytes, str]:
+        """Imagem reduzida e seu mimetype; o download só acontece fora do cache"""
+        started = time.perf_counter()
+        try:
+            content_key = redis_queue.redis.get(self._media_key(media_key))
+        except Exception:
+            content_key = None
+        if content_key:
+            cached = self._load_cached(content_key.decode())  # type: ignore[union-attr]
+            if cached is not None:
+                metrics.inc("image_cache_hits_total")
+                return cached
+
+        # Download e redução no mesmo job do pool: só a versão reduzida volta
+        (
+            content_hash,
+            original_bytes,
+            processed,
+            mimetype,
+            original_size,
+            final_size,
+        ) = await decrypt_executor.run(
+            decryptAndDownscale,
+            link,
+            base64.b64decode(media_key),
+            media_type,
+            self.max_dimension,
+            self.quality,
+        )
+        content_key = self._content_key(content_hash)
+        self._save(media_key, content_key, processed, mimetype)
+
+        elapsed = time.perf_counter() - started
+        tokens_before = estimate_image_tokens(*original_size)
+        tokens_after = estimate_image_tokens(*final_size)
+        metrics.inc("image_bytes_before_total", original_bytes)
+        metrics.inc("image_bytes_after_total", len(processed))
+        metrics.inc("image_tokens_before_total", tokens_before)
+        metrics.inc("image_tokens_after_total", tokens_after)
+        metrics.observe("image_preprocess_seconds", elapsed)
+        logger.info(
+            f"Imagem {original_size[0]}x{original_size[1]} ({original_bytes} bytes, "
+            f"~{tokens_before} tokens) -> {final_size[0]}x{final_size[1]} "
+            f"({len(processed)} bytes, ~{tokens_after} tokens) em {elapsed:.2f}s"
+        )
+        return processed, mimetype
+
+
+# Instância global
+image_preprocessor = ImagePreprocessor()
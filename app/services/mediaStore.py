@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+import uuid
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Blob:
+    data: bytes
+    mimetype: str
+    expires_at: float
+
+
+class MediaStore:
+    """
+    Armazena mídias descriptografadas em memória e gera URLs assinadas com
+    expiração para a OpenAI buscá-las, sem passar pelo disco nem pela pasta static/.
+    """
+
+    def __init__(
+        self,
+        ttl: int = Config.MEDIA_URL_TTL,
+        max_bytes: int = Config.MEDIA_STORE_MAX_BYTES,
+        secret: str = Config.MEDIA_URL_SECRET,
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Sem segredo configurado as URLs só valem para este processo
+        self._secret: bytes = secret.encode() if secret else os.urandom(32)
+        self._blobs: OrderedDict[str, _Blob] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _sign(self, blob_id: str, expires: int) -> str:
+        return hmac.new(
+            self._secret, f"{blob_id}:{expires}".encode(), hashlib.sha256
+        ).hexdigest()
+
+    def _remove(self, blob_id: str) -> None:
+        blob = self._blobs.pop(blob_id, None)
+        if blob is not None:
+            self._total_bytes -= len(blob.data)
+
+    def _purge(self, now: float) -> None:
+        """Remove mídias expiradas e, se necessário, as mais antigas até caber na cota"""
+        for blob_id in [b for b, blob in self._blobs.items() if blob.expires_at <= now]:
+            self._remove(blob_id)
+        while self._blobs and self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._blobs))
+            logger.warning(
+                f"Cota do armazenamento de mídias excedida, removendo {oldest}"
+            )
+            self._remove(oldest)
+
+    def put(self, data: bytes, mimetype: str, base_url: str = Config.NGROK_URL) -> str:
+        """Armazena a mídia e retorna uma URL pública assinada e temporária"""
+        now = time.time()
+        blob_id = uuid.uuid4().hex
+        expires = int(now + self.ttl)
+
+        with self._lock:
+            self._blobs[blob_id] = _Blob(data, mimetype, expires)
+            self._total_bytes += len(data)
+            self._purge(now)
+
+        logger.info(f"Mídia armazenada em memória: {blob_id} ({len(data)} bytes)")
+        return f"{base_url}/media/{blob_id}?expires={expires}&sig={self._sign(blob_id, expires)}"
+
+    def get(self, blob_id: str, expires: str, signature: str) -> _Blob | None:
+        """Retorna a mídia se a assinatura for válida e o link não tiver expirado"""
+        try:
+            expires_at = int(expires)
+        except (TypeError, ValueError):
+            return None
+
+        if not hmac.compare_digest(self._sign(blob_id, expires_at), signature or ""):
+            logger.warning(f"Assinatura inválida para mídia {blob_id}")
+            return None
+
+        now = time.time()
+        if expires_at <= now:
+            return None
+
+        with self._lock:
+            self._purge(now)
+            return self._blobs.get(blob_id)
+
+
+# Instância global
+media_store = MediaStore()
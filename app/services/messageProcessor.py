@@ -1,30 +1,63 @@
+import asyncio
 import logging
 from typing import Any, Literal
-from app.integrations.decrypt import decryptByLink
+from app.core.config import Config
+from app.integrations.decrypt import decryptByLink, decryptToBytes
 from app.models.contentItem import ContentItem
 from app.models.message import Message
 from app.models.whatsappMessage import WhatsappMessage
 from app.database import db_current, redis_queue
 from app.integrations import clientAI, clientEvolution
+from app.services.deadLetters import BatchError, BatchStage, dead_letters
+from app.services.decryptExecutor import decrypt_executor
+from app.services.deliveryQueue import PartialDeliveryError, delivery_queue
+from app.services.outbox import outbox
+from app.services.documentExtractor import document_extractor
+from app.services.imagePreprocessor import image_preprocessor
+from app.services.fileJanitor import file_janitor
+from app.services.historyWriter import history_writer
+from app.services.mediaStore import media_store
+from app.services.conversationSummarizer import conversation_summarizer
+from app.services.responseChain import response_chain
+from app.utils.imageProcessing import pillow_available
+from app.utils.tokenCounter import count_message_tokens, fit_history_to_budget
+from openai import BadRequestError, NotFoundError
 import base64
+import mimetypes
 import os
+import uuid
 
 logger: logging.Logger = logging.getLogger(__name__)
 ACCEPTABLE_TYPES_MESSAGE = Literal[
     "conversation", "audioMessage", "imageMessage", "documentMessage"
 ]
+DEFAULT_MIMETYPES: dict[str, str] = {
+    "input_audio": "audio/ogg",
+    "input_image": "image/jpeg",
+    "input_file": "application/octet-stream",
+}
 
 
 class MessageProcessor:
+    """
+    Processa os batches de mensagens. Não guarda estado por batch, então uma
+    única instância atende várias conversas simultâneas.
+    """
+
     def __init__(self) -> None:
-        self.message: Message
-        self.zap_message: WhatsappMessage
+        self._preprocess_images: bool = Config.IMAGE_PREPROCESS_ENABLED
+        if self._preprocess_images and not pillow_available():
+            logger.warning("Pillow não instalado, imagens seguem no tamanho original")
+            self._preprocess_images = False
 
     async def process_phone_messages(self, phone_number: str):
         """Processa TODAS as mensagens pendentes de um telefone"""
         try:
-            raw_messages: list[dict[str, Any]] = redis_queue.get_pending_messages(
-                phone_number
+            # Redis e banco são síncronos: rodam fora do event loop, que atende
+            # os batches de vários telefones ao mesmo tempo
+            loop = asyncio.get_running_loop()
+            raw_messages: list[dict[str, Any]] = await loop.run_in_executor(
+                None, redis_queue.get_pending_messages, phone_number
             )
 
             logger.info(
@@ -35,6 +68,36 @@ class MessageProcessor:
                 logger.info(f"Nenhuma mensagem pendente para {phone_number}")
                 return
 
+            await self.process_raw_messages(phone_number, raw_messages)
+
+        except BatchError as e:
+            # As mensagens já saíram da fila: guarda o batch para reprocessar
+            dead_letters.add(phone_number, e)
+            logger.error(
+                f"Erro ao processar mensagens em lote para {phone_number}: {str(e)}",
+                exc_info=e.error,
+            )
+            raise e.error
+        except Exception as e:
+            logger.error(
+                f"Erro ao processar mensagens em lote para {phone_number}: {str(e)}",
+                exc_info=True,
+            )
+            raise e
+
+    async def process_raw_messages(
+        self,
+        phone_number: str,
+        raw_messages: list[dict[str, Any]],
+        stage: BatchStage = "process",
+    ) -> None:
+        """
+        Processa um batch de mensagens brutas do webhook. Com stage "openai" a
+        mensagem do usuário já está no histórico e só a resposta é gerada de
+        novo (replay do dead-letter). Falhas saem como BatchError; depois que a
+        resposta foi enviada, com a etapa "delivered".
+        """
+        try:
             logger.info(
                 f"Processando {len(raw_messages)} mensagens em lote para {phone_number}"
             )
@@ -54,23 +117,42 @@ class MessageProcessor:
                 return
 
             # Cria a mensagem com todos os conteúdos (ainda criptografados)
-            self.message = Message(role="user", content=all_content_items)
+            message = Message(role="user", content=all_content_items)
 
-            # Salva no MongoDB APENAS com dados criptografados
-            db_current.save(
-                phone_number=phone_number,
-                message_data=self.message.model_dump(exclude_none=True, mode="json"),
-            )
+            user_record: dict[str, Any] | None = None
+            if stage == "process":
+                if Config.HISTORY_WRITE_BEHIND:
+                    # Gravada junto com a resposta, em uma única escrita
+                    user_record = self._history_record(message)
+                else:
+                    # Salva no MongoDB APENAS com dados criptografados
+                    await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        db_current.save,
+                        phone_number,
+                        self._history_record(message),
+                    )
+                    stage = "openai"
 
             # Processa o lote completo com OpenAI (aqui sim descriptografa)
-            await self._process_with_openai(phone_number)
+            await self._process_with_openai(phone_number, message, user_record)
 
+        except BatchError as e:
+            raise BatchError(e.stage, raw_messages, e.error, e.records) from e.error
         except Exception as e:
-            logger.error(
-                f"Erro ao processar mensagens em lote para {phone_number}: {str(e)}",
-                exc_info=True,
-            )
-            raise e
+            raise BatchError(stage, raw_messages, e) from e
+
+    async def save_delivered_reply(
+        self,
+        phone_number: str,
+        raw_messages: list[dict[str, Any]],
+        records: list[dict[str, Any]],
+    ) -> None:
+        """Replay da etapa "delivered": grava o histórico sem gerar nem reenviar"""
+        try:
+            await history_writer.write(phone_number, records)
+        except Exception as e:
+            raise BatchError("delivered", raw_messages, e, records) from e
 
     async def _process_single_message(
         self, raw_message: dict[str, Any]
@@ -166,50 +248,126 @@ class MessageProcessor:
 
         return content_items
 
-    async def _process_with_openai(self, phone_number: str):
-        """Processa o histórico completo com a OpenAI (descriptografa apenas aqui)"""
+    async def _process_with_openai(
+        self,
+        phone_number: str,
+        message: Message,
+        user_record: dict[str, Any] | None = None,
+    ):
+        """
+        Processa o histórico completo com a OpenAI (descriptografa apenas aqui).
+        `user_record` é a mensagem do usuário ainda não salva, gravada junto
+        com a resposta.
+        """
         try:
-            # Carrega histórico completo do MongoDB
-            historical_messages: list[dict[str, Any]] = db_current.get_history(
-                phone_number, limit=50
-            )
-
-            # Prepara TODAS as mensagens para OpenAI (descriptografando mídias)
-            all_messages_for_ai: list[dict[str, Any]] = []
-
-            for hist_msg in historical_messages:
-                try:
-                    # Prepara cada mensagem histórica para OpenAI
-                    prepared_msg = await self._prepare_historical_message_for_openai(
-                        hist_msg
-                    )
-                    if prepared_msg:
-                        all_messages_for_ai.append(prepared_msg)
-                except Exception as e:
-                    logger.warning(f"Erro ao preparar mensagem histórica: {e}")
-                    continue
-
             # Cria a mensagem do WhatsApp
-            self.zap_message = WhatsappMessage(
-                to_number=phone_number, message=self.message
-            )
+            zap_message = WhatsappMessage(to_number=phone_number, message=message)
 
-            # Define o histórico completo para a AI (com mídias descriptografadas)
-            self.zap_message.history_to_AI = all_messages_for_ai
+            # Arquivos temporários retidos até a OpenAI terminar de usá-los
+            leased_files: list[str] = []
+            # Trechos já enviados no streaming
+            sent_chunks: list[str] = []
+            try:
+                previous_response_id = (
+                    response_chain.get(phone_number)
+                    if Config.OPENAI_INCREMENTAL_CONTEXT
+                    else None
+                )
+                if previous_response_id:
+                    # Envia só o batch novo: o restante do contexto está na OpenAI
+                    zap_message.previous_response_id = previous_response_id
+                    zap_message.history_to_AI = await self._prepare_messages_for_openai(
+                        [message.model_dump(exclude_none=True, mode="json")],
+                        leased_files,
+                    )
+                else:
+                    # Define o histórico completo para a AI (com mídias descriptografadas)
+                    zap_message.history_to_AI = await self._build_history_for_openai(
+                        phone_number, leased_files, user_record
+                    )
 
-            logger.info(f"Enviando {len(all_messages_for_ai)} mensagens para OpenAI")
+                logger.info(
+                    f"Enviando {len(zap_message.history_to_AI)} mensagens para OpenAI"
+                )
 
-            # Gera resposta da OpenAI
-            clientAI.create_response(self.zap_message)
+                # Gera resposta da OpenAI
+                try:
+                    await self._generate_reply(zap_message, sent_chunks)
+                except (BadRequestError, NotFoundError) as e:
+                    if not previous_response_id or "previous_response" not in str(e):
+                        raise
+                    # Cadeia expirada no servidor: volta ao histórico completo
+                    logger.warning(
+                        f"Contexto da OpenAI indisponível para {phone_number}, "
+                        "reconstruindo histórico completo"
+                    )
+                    response_chain.clear(phone_number)
+                    zap_message.previous_response_id = None
+                    zap_message.history_to_AI = await self._build_history_for_openai(
+                        phone_number, leased_files, user_record
+                    )
+                    await self._generate_reply(zap_message, sent_chunks)
+            except Exception as e:
+                if not sent_chunks:
+                    raise
+                # O usuário já recebeu parte da resposta: o replay só grava o que
+                # foi enviado, sem gerar e enviar de novo
+                raise BatchError(
+                    "delivered",
+                    [],
+                    e,
+                    self._partial_reply_records(" ".join(sent_chunks), user_record),
+                ) from e
+            finally:
+                # Libera também quando a montagem do histórico falha no meio
+                for file_path in leased_files:
+                    file_janitor.release(file_path)
+
+            if Config.OPENAI_INCREMENTAL_CONTEXT and zap_message.response_id:
+                response_chain.save(phone_number, zap_message.response_id)
+
+            records = [self._history_record(zap_message.message)]
+            if user_record:
+                records.insert(0, user_record)
+            if Config.OUTBOX_ENABLED and not Config.OPENAI_STREAMING:
+                # Grava antes de enviar; o dispatcher entrega e salva no histórico
+                outbox.enqueue(
+                    phone_number, zap_message.message.content[0].text or "", records
+                )
+            else:
+                # Envia resposta via Evolution
+                if not Config.OPENAI_STREAMING:
+                    if Config.DELIVERY_QUEUE_ENABLED:
+                        try:
+                            await delivery_queue.send(
+                                phone_number, zap_message.message.content[0].text or ""
+                            )
+                        except PartialDeliveryError as e:
+                            # Só parte da resposta chegou: grava o que foi enviado
+                            raise BatchError(
+                                "delivered",
+                                [],
+                                e,
+                                self._partial_reply_records(
+                                    "\n\n".join(e.delivered), user_record
+                                ),
+                            ) from e
+                    else:
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, clientEvolution.send_message, zap_message
+                        )
 
-            # Envia resposta via Evolution
-            clientEvolution.send_message(self.zap_message)
+                # Salva a resposta da assistant no MongoDB (apenas texto)
+                try:
+                    await history_writer.write(phone_number, records)
+                except Exception as e:
+                    # Resposta já entregue: o replay só grava o histórico (com a
+                    # mensagem do usuário, no modo de escrita coalescida)
+                    raise BatchError("delivered", [], e, records) from e
 
-            # Salva a resposta da assistant no MongoDB (apenas texto)
-            db_current.save(
-                phone_number,
-                self.zap_message.message.model_dump(exclude_none=True, mode="json"),
-            )
+            # Resume em segundo plano as mensagens que saíram da janela recente
+            if Config.SUMMARY_ENABLED:
+                conversation_summarizer.schedule(phone_number)
 
             logger.info(f"Processamento OpenAI concluído para {phone_number}")
 
@@ -217,8 +375,125 @@ class MessageProcessor:
             logger.error(f"Erro no _process_with_openai: {str(e)}", exc_info=True)
             raise e
 
+    def _history_record(self, message: Message) -> dict[str, Any]:
+        """Mensagem no formato do banco, com a contagem de tokens já calculada"""
+        record = message.model_dump(exclude_none=True, mode="json")
+        record.setdefault("id", uuid.uuid4().hex)
+        record["token_count"] = count_message_tokens(record)
+        return record
+
+    def _partial_reply_records(
+        self, text: str, user_record: dict[str, Any] | None
+    ) -> list[dict[str, Any]]:
+        """Registros do histórico para uma resposta entregue só em parte"""
+        partial = Message(
+            role="assistant", content=[ContentItem(type="output_text", text=text)]
+        )
+        records = [self._history_record(partial)]
+        if user_record:
+            # Escrita coalescida: a mensagem do usuário também não foi salva
+            records.insert(0, user_record)
+        return records
+
+    async def _build_history_for_openai(
+        self,
+        phone_number: str,
+        leased_files: list[str],
+        user_record: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Carrega o histórico do banco e o prepara para a OpenAI"""
+        # Carrega histórico do MongoDB (fora do event loop)
+        loop = asyncio.get_running_loop()
+        historical_messages: list[dict[str, Any]] = await loop.run_in_executor(
+            None,
+            lambda: db_current.get_history(
+                phone_number, limit=Config.HISTORY_MAX_MESSAGES
+            ),
+        )
+        if user_record:
+            # Mensagem atual ainda não foi gravada (escrita coalescida)
+            historical_messages.append(user_record)
+
+        # Mensagens já resumidas são substituídas pelo resumo da conversa
+        summary_message: dict[str, Any] | None = None
+        if Config.SUMMARY_ENABLED:
+            historical_messages, summary_message = await conversation_summarizer.apply(
+                phone_number, historical_messages
+            )
+
+        # Mantém só as mensagens mais recentes que cabem no orçamento de tokens
+        budget = Config.HISTORY_TOKEN_BUDGET
+        if summary_message:
+            budget -= count_message_tokens(summary_message)
+        historical_messages = fit_history_to_budget(historical_messages, budget)
+        if summary_message:
+            historical_messages.insert(0, summary_message)
+        return await self._prepare_messages_for_openai(
+            historical_messages, leased_files
+        )
+
+    async def _prepare_messages_for_openai(
+        self, messages: list[dict[str, Any]], leased_files: list[str]
+    ) -> list[dict[str, Any]]:
+        """Prepara as mensagens para a OpenAI (descriptografando mídias)"""
+        all_messages_for_ai: list[dict[str, Any]] = []
+
+        # Prepara as mensagens em paralelo para aproveitar o pool de descriptografia
+        prepared_results = await asyncio.gather(
+            *(
+                self._prepare_historical_message_for_openai(hist_msg, leased_files)
+                for hist_msg in messages
+            ),
+            return_exceptions=True,
+        )
+
+        for prepared_msg in prepared_results:
+            if isinstance(prepared_msg, BaseException):
+                logger.warning(f"Erro ao preparar mensagem histórica: {prepared_msg}")
+                continue
+            if prepared_msg:
+                all_messages_for_ai.append(prepared_msg)
+
+        return all_messages_for_ai
+
+    async def _generate_reply(
+        self, zap_message: WhatsappMessage, sent_chunks: list[str] | None = None
+    ) -> None:
+        """
+        Gera a resposta da OpenAI no modo configurado. No streaming, os trechos
+        confirmados pela Evolution são acrescentados a `sent_chunks`.
+        """
+        if Config.OPENAI_STREAMING:
+
+            async def send_chunk(text: str) -> None:
+                try:
+                    await self._send_text(zap_message.to_number, text)
+                except PartialDeliveryError as e:
+                    # Trecho dividido em partes: conta as que chegaram
+                    if sent_chunks is not None:
+                        sent_chunks.append("\n\n".join(e.delivered))
+                    raise
+                if sent_chunks is not None:
+                    sent_chunks.append(text)
+
+            # Envia cada trecho via Evolution à medida que é gerado
+            await clientAI.astream_response(zap_message, on_chunk=send_chunk)
+        elif Config.OPENAI_ASYNC:
+            await clientAI.acreate_response(zap_message)
+        else:
+            clientAI.create_response(zap_message)
+
+    async def _send_text(self, phone_number: str, text: str) -> None:
+        """Envia um texto via Evolution sem bloquear o event loop"""
+        if Config.DELIVERY_QUEUE_ENABLED:
+            await delivery_queue.send(phone_number, text)
+            return
+        await asyncio.get_event_loop().run_in_executor(
+            None, clientEvolution.send_text, phone_number, text
+        )
+
     async def _prepare_historical_message_for_openai(
-        self, historical_msg: dict[str, Any]
+        self, historical_msg: dict[str, Any], leased_files: list[str]
     ) -> dict[str, Any]:
         """Prepara uma mensagem histórica do MongoDB para a OpenAI"""
         try:
@@ -227,28 +502,16 @@ class MessageProcessor:
 
             # Se a mensagem tem conteúdo, prepara cada item
             if "content" in prepared_msg and isinstance(prepared_msg["content"], list):
-                prepared_content: list[dict[str, Any]] = []
-                for content_item in prepared_msg["content"]:
-                    # Se for mídia do MongoDB, descriptografa temporariamente
-                    if content_item.get("type") in [
-                        "input_audio",
-                        "input_image",
-                        "input_file",
-                    ]:
-                        if content_item.get("url") and content_item.get("media_key"):
-                            # Descriptografa para OpenAI
-                            openai_item = await self._decrypt_single_media_for_openai(
-                                content_item
-                            )
-                            if openai_item:
-                                prepared_content.append(openai_item)
-                        else:
-                            logger.warning("Item de mídia sem URL ou media_key")
-                    else:
-                        # Texto usa diretamente
-                        prepared_content.append(content_item)
-
-                prepared_msg["content"] = prepared_content
+                # Prepara os itens em paralelo mantendo a ordem original
+                prepared_content = await asyncio.gather(
+                    *(
+                        self._prepare_content_item_for_openai(
+                            content_item, leased_files
+                        )
+                        for content_item in prepared_msg["content"]
+                    )
+                )
+                prepared_msg["content"] = [item for item in prepared_content if item]
 
             return prepared_msg
 
@@ -256,8 +519,23 @@ class MessageProcessor:
             logger.error(f"Erro ao preparar mensagem histórica: {e}")
             return historical_msg  # Retorna original em caso de erro
 
+    async def _prepare_content_item_for_openai(
+        self, content_item: dict[str, Any], leased_files: list[str]
+    ) -> dict[str, Any] | None:
+        """Prepara um item de conteúdo, descriptografando mídias temporariamente"""
+        if content_item.get("type") not in ["input_audio", "input_image", "input_file"]:
+            # Texto usa diretamente
+            return content_item
+
+        if not (content_item.get("url") and content_item.get("media_key")):
+            logger.warning("Item de mídia sem URL ou media_key")
+            return None
+
+        # Se for mídia do MongoDB, descriptografa para OpenAI
+        return await self._decrypt_single_media_for_openai(content_item, leased_files)
+
     async def _decrypt_single_media_for_openai(
-        self, media_item: dict[str, Any]
+        self, media_item: dict[str, Any], leased_files: list[str]
     ) -> dict[str, Any]:
         """Descriptografa um único item de mídia para OpenAI"""
         try:
@@ -272,21 +550,44 @@ class MessageProcessor:
                 logger.warning(f"Tipo de mídia não mapeado: {media_item['type']}")
                 return media_item
 
-            public_url = decryptByLink(
+            # Documentos com texto vão como input_text (extraído uma vez e cacheado)
+            if (
+                media_item["type"] == "input_file"
+                and Config.DOCUMENT_EXTRACTION_ENABLED
+            ):
+                document_item = await self._extract_document_text(media_item)
+                if document_item is not None:
+                    return document_item
+
+            # Imagens reduzidas e recomprimidas antes de irem para a OpenAI
+            if media_item["type"] == "input_image" and self._preprocess_images:
+                return await self._prepare_image(media_item, media_type, leased_files)
+
+            if Config.MEDIA_HANDOFF_MODE == "memory":
+                return await self._handoff_media_in_memory(media_item, media_type)
+
+            public_url: str = await decrypt_executor.run(
+                decryptByLink,
                 link=media_item["url"],
                 mediaKey=base64.b64decode(media_item["media_key"]),
                 mediaType=media_type,
             )
 
             # Agenda limpeza
-            self._schedule_file_cleanup(public_url)
+            file_path = f"./static/{public_url.split('/')[-1]}"
 
             # Retorna item com URL pública temporária
             if media_item["type"] == "input_audio":
-                file_path = f"./static/{public_url.split('/')[-1]}"
-                text_of_audio = clientAI.transcribe_audio(file_path)
+                file_janitor.register(file_path, lease=True)
+                try:
+                    text_of_audio = await self._transcribe_audio(file_path)
+                finally:
+                    file_janitor.release(file_path)
                 openai_item = {"type": "input_text", "text": text_of_audio}
             else:
+                # Retido até a OpenAI terminar de buscar a URL
+                file_janitor.register(file_path, lease=True)
+                leased_files.append(file_path)
                 openai_item: dict[str, Any] = {
                     "type": media_item["type"],
                     (
@@ -302,27 +603,100 @@ class MessageProcessor:
             logger.error(f"Erro ao descriptografar mídia para OpenAI: {e}")
             return media_item  # Retorna original em caso de erro
 
-    def _schedule_file_cleanup(self, file_path_network: str):
-        """Agenda limpeza do arquivo temporário após processamento"""
-        import threading
-        import time
-
-        def cleanup():
-            # Aguarda um tempo razoável para o processamento da OpenAI
-            time.sleep(10)  # 10 segundos deve ser suficiente
-            file_path = "./static/" + file_path_network.split("/")[-1]
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Arquivo temporário removido: {file_path}")
-                else:
-                    logger.warning(f"Arquivo temporário não encontrado: {file_path}")
-            except Exception as e:
-                logger.error(f"Erro ao remover arquivo temporário {file_path}: {e}")
+    async def _extract_document_text(
+        self, media_item: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        """Texto do documento para a OpenAI, ou None para enviar o arquivo"""
+        try:
+            text = await document_extractor.get_text(
+                media_item["media_key"],
+                media_item["url"],
+                media_item.get("mimetype") or "",
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao extrair texto do documento: {e}")
+            return None
+
+        if not text:
+            return None
+        return {"type": "input_text", "text": f"Conteúdo do documento:\n{text}"}
+
+    async def _transcribe_audio(
+        self, audio: str | bytes, filename: str = "audio.ogg"
+    ) -> str:
+        """Transcreve o áudio com o cliente assíncrono quando habilitado"""
+        if Config.OPENAI_ASYNC:
+            return await clientAI.atranscribe_audio(audio, filename=filename)
+        return clientAI.transcribe_audio(audio, filename=filename)
+
+    async def _handoff_media_in_memory(
+        self, media_item: dict[str, Any], media_type: str
+    ) -> dict[str, Any]:
+        """
+        Entrega a mídia descriptografada sem passar pelo disco: inline (base64)
+        até MEDIA_INLINE_MAX_BYTES, ou por URL assinada do armazenamento em memória
+        """
+        # A mídia inteira fica neste processo: nunca passa pelo pool de processos
+        data: bytes = await decrypt_executor.run_local(
+            decryptToBytes,
+            link=media_item["url"],
+            mediaKey=base64.b64decode(media_item["media_key"]),
+            mediaType=media_type,
+        )
+        mimetype = (
+            media_item.get("mimetype") or DEFAULT_MIMETYPES[media_item["type"]]
+        ).split(";")[0]
+        filename = f"media{mimetypes.guess_extension(mimetype) or '.bin'}"
+
+        if media_item["type"] == "input_audio":
+            text_of_audio = await self._transcribe_audio(data, filename=filename)
+            return {"type": "input_text", "text": text_of_audio}
+
+        return self._handoff_bytes(media_item["type"], data, mimetype, filename)
+
+    def _handoff_bytes(
+        self, item_type: str, data: bytes, mimetype: str, filename: str
+    ) -> dict[str, Any]:
+        """Item da OpenAI com a mídia inline (base64) ou por URL assinada em memória"""
+        if len(data) <= Config.MEDIA_INLINE_MAX_BYTES:
+            data_url = f"data:{mimetype};base64,{base64.b64encode(data).decode()}"
+            logger.info(f"Mídia enviada inline para OpenAI: {len(data)} bytes")
+            if item_type == "input_image":
+                return {"type": "input_image", "image_url": data_url}
+            return {"type": "input_file", "filename": filename, "file_data": data_url}
+
+        signed_url = media_store.put(data, mimetype)
+        return {
+            "type": item_type,
+            ("image_url" if item_type == "input_image" else "file_url"): signed_url,
+        }
+
+    async def _prepare_image(
+        self, media_item: dict[str, Any], media_type: str, leased_files: list[str]
+    ) -> dict[str, Any]:
+        """Reduz a imagem (com cache) e a entrega no modo configurado"""
+        data, mimetype = await image_preprocessor.process(
+            media_item["media_key"], media_item["url"], media_type
+        )
+        extension = mimetypes.guess_extension(mimetype) or ".jpg"
+
+        if Config.MEDIA_HANDOFF_MODE == "memory":
+            return self._handoff_bytes(
+                "input_image", data, mimetype, f"image{extension}"
+            )
 
-        # Executa a limpeza em thread separada
-        cleanup_thread = threading.Thread(target=cleanup, daemon=True)
-        cleanup_thread.start()
+        # Modo url: grava a versão reduzida em static/, retida até a OpenAI buscar
+        filename = f"{uuid.uuid4().hex}{extension}"
+        file_path = os.path.join("static", filename)
+        os.makedirs("static", exist_ok=True)
+        with open(file_path, "wb") as image_file:
+            image_file.write(data)
+        file_janitor.register(file_path, lease=True)
+        leased_files.append(file_path)
+        return {
+            "type": "input_image",
+            "image_url": f"{Config.NGROK_URL}/static/{filename}",
+        }
 
 
 # Instância global
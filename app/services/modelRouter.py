@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from typing import Any
+import json
+import logging
+
+from app.core.config import Config
+from app.models.whatsappMessage import WhatsappMessage
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = ("input_image", "input_file", "input_audio")
+
+metrics.describe("model_route_requests_total", "Respostas geradas por rota de modelo")
+metrics.describe("model_route_latency_seconds", "Latência das respostas por rota")
+metrics.describe("model_route_input_tokens_total", "Tokens de entrada por rota")
+metrics.describe("model_route_output_tokens_total", "Tokens de saída por rota")
+metrics.describe("model_route_cost_usd_total", "Custo estimado em dólares por rota")
+
+
+@dataclass
+class BatchFeatures:
+    """Características baratas de calcular usadas para escolher o modelo"""
+
+    text_chars: int
+    media_types: set[str]
+    history_size: int | None  # None quando o contexto está no servidor da OpenAI
+
+
+@dataclass
+class Route:
+    """
+    Regra de roteamento. Todas as condições informadas precisam ser atendidas.
+    `media`: "none" (só texto), "any" (alguma mídia) ou lista de tipos aceitos.
+    `model` vazio usa o modelo configurado no prompt.
+    """
+
+    name: str
+    model: str | None = None
+    min_chars: int | None = None
+    max_chars: int | None = None
+    max_history: int | None = None
+    media: str | list[str] | None = None
+    max_output_tokens: int | None = None
+
+    def matches(self, features: BatchFeatures) -> bool:
+        if self.min_chars is not None and features.text_chars < self.min_chars:
+            return False
+        if self.max_chars is not None and features.text_chars > self.max_chars:
+            return False
+        if self.max_history is not None and (
+            features.history_size is None or features.history_size > self.max_history
+        ):
+            return False
+        if self.media == "none" and features.media_types:
+            return False
+        if self.media == "any" and not features.media_types:
+            return False
+        if isinstance(self.media, list) and not features.media_types & set(self.media):
+            return False
+        return True
+
+
+def _default_routes() -> list[Route]:
+    """Turnos triviais no modelo rápido e multimodais/longos no modelo forte"""
+    return [
+        Route(
+            name="fast",
+            model=Config.OPENAI_FAST_MODEL,
+            max_chars=200,
+            max_history=30,
+            media="none",
+        ),
+        Route(
+            name="heavy",
+            model=Config.OPENAI_STRONG_MODEL,
+            media=["input_image", "input_file"],
+        ),
+        Route(name="heavy", model=Config.OPENAI_STRONG_MODEL, min_chars=2000),
+    ]
+
+
+def _load_routes(raw: str) -> list[Route]:
+    if not raw:
+        return _default_routes()
+    try:
+        return [Route(**rule) for rule in json.loads(raw)]
+    except (TypeError, ValueError) as e:
+        logger.error(f"MODEL_ROUTES inválido, usando rotas padrão: {e}")
+        return _default_routes()
+
+
+def _load_prices(raw: str) -> dict[str, tuple[float, float]]:
+    """Preço por 1M de tokens (entrada, saída) de cada modelo"""
+    if not raw:
+        return {}
+    try:
+        return {
+            model: (float(p[0]), float(p[1])) for model, p in json.loads(raw).items()
+        }
+    except (TypeError, ValueError, IndexError) as e:
+        logger.error(f"MODEL_PRICES inválido, custo não será estimado: {e}")
+        return {}
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada batch pelas regras configuradas (primeira que
+    casar) e registra latência, tokens e custo por rota.
+    """
+
+    def __init__(
+        self,
+        routes: str = Config.MODEL_ROUTES,
+        prices: str = Config.MODEL_PRICES,
+    ) -> None:
+        self.routes: list[Route] = _load_routes(routes)
+        self.prices = _load_prices(prices)
+        self.default_route = Route(name="default")
+
+    @staticmethod
+    def features(zapMessage: WhatsappMessage) -> BatchFeatures:
+        """Extrai as características do batch atual (última mensagem do histórico)"""
+        history = zapMessage.history_to_AI
+        last: dict[str, Any] = history[-1] if history else {}
+        content = last.get("content", "")
+
+        text_chars = 0
+        media_types: set[str] = set()
+        if isinstance(content, str):
+            text_chars = len(content)
+        else:
+            for item in content:
+                if item.get("type") in MEDIA_TYPES:
+                    media_types.add(item["type"])
+                elif item.get("text"):
+                    text_chars += len(item["text"])
+
+        history_size = None if zapMessage.previous_response_id else len(history)
+        return BatchFeatures(text_chars, media_types, history_size)
+
+    def route(self, zapMessage: WhatsappMessage) -> Route:
+        """Primeira rota cujas condições o batch atende"""
+        features = self.features(zapMessage)
+        for route in self.routes:
+            if route.matches(features):
+                break
+        else:
+            route = self.default_route
+        logger.info(
+            f"Rota '{route.name}' ({route.model or 'modelo do prompt'}) para batch "
+            f"com {features.text_chars} caracteres e mídias {sorted(features.media_types)}"
+        )
+        return route
+
+    def record(self, route: Route, latency: float, response: Any = None) -> None:
+        """Registra latência, tokens e custo estimado da resposta"""
+        model = getattr(response, "model", None) or route.model or "prompt"
+        labels = {"route": route.name, "model": model}
+        metrics.inc("model_route_requests_total", **labels)
+        metrics.observe("model_route_latency_seconds", latency, **labels)
+
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        output_tokens = getattr(usage, "output_tokens", 0) or 0
+        metrics.inc("model_route_input_tokens_total", input_tokens, **labels)
+        metrics.inc("model_route_output_tokens_total", output_tokens, **labels)
+
+        price = self.prices.get(model) or self.prices.get(route.model or "")
+        if price:
+            cost = (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+            metrics.inc("model_route_cost_usd_total", cost, **labels)
+
+
+# Instância global
+model_router = ModelRouter()
@@ -0,0 +1,285 @@
+from typing import Any
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+from app.core.config import Config
+from app.database import redis_queue
+from app.integrations import clientEvolution
+from app.services.deadLetters import BatchError, dead_letters
+from app.services.deliveryQueue import PartialDeliveryError, delivery_queue
+from app.services.historyWriter import history_writer
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Reserva as entradas vencidas por `lease` segundos para que só uma instância as envie
+_CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, id in ipairs(ids) do
+    redis.call('ZADD', KEYS[1], ARGV[2], id)
+end
+return ids
+"""
+
+metrics.describe("outbox_delivered_total", "Respostas do outbox entregues")
+metrics.describe("outbox_retries_total", "Tentativas de entrega reagendadas")
+metrics.describe("outbox_dead_letters_total", "Respostas que esgotaram as tentativas")
+metrics.describe(
+    "outbox_delivery_delay_seconds", "Tempo entre gerar a resposta e entregá-la"
+)
+
+
+class Outbox:
+    """
+    Outbox transacional no Redis para as respostas geradas. A resposta é gravada
+    antes do envio e um dispatcher em segundo plano tenta entregá-la com backoff
+    exponencial; ela só entra no histórico depois que a Evolution confirma o
+    envio. Após `max_attempts` falhas vai para o dead-letter (outbox:dead),
+    onde fica por `dead_ttl` segundos. Se o histórico falhar depois da entrega,
+    os registros vão para o dead-letter dos batches na etapa "delivered".
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = Config.OUTBOX_MAX_ATTEMPTS,
+        backoff_base: float = Config.OUTBOX_BACKOFF_BASE,
+        backoff_max: float = Config.OUTBOX_BACKOFF_MAX,
+        poll_interval: float = Config.OUTBOX_POLL_INTERVAL,
+        lease: float = Config.OUTBOX_LEASE,
+        dead_ttl: int = Config.OUTBOX_DEAD_TTL,
+        batch_size: int = 50,
+        prefix: str = "outbox",
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.dead_ttl = dead_ttl
+        self.batch_size = batch_size
+        self.pending_key = f"{prefix}:pending"
+        self.dead_key = f"{prefix}:dead"
+        self.entry_prefix = f"{prefix}:entry:"
+        self._claim: Any = None
+        self._task: asyncio.Task[Any] | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+
+    @property
+    def redis(self):
+        return redis_queue.redis
+
+    def _entry_key(self, entry_id: str) -> str:
+        return f"{self.entry_prefix}{entry_id}"
+
+    def enqueue(
+        self, phone_number: str, text: str, records: list[dict[str, Any]]
+    ) -> str:
+        """Grava a resposta para entrega (com os registros que irão para o histórico)"""
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(
+            self._entry_key(entry_id),
+            mapping={
+                "phone_number": phone_number,
+                "text": text,
+                "records": json.dumps(records, ensure_ascii=False),
+                "attempts": 0,
+                "created_at": now,
+                "status": "pending",
+            },
+        )
+        pipe.zadd(self.pending_key, {entry_id: now})
+        pipe.execute()
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Resposta {entry_id} gravada no outbox para {phone_number}")
+        return entry_id
+
+    def start(self) -> None:
+        """Inicia o dispatcher no event loop atual"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Termina a rodada em andamento e para o dispatcher"""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            try:
+                await self.dispatch_due()
+            except Exception as e:
+                logger.error(f"Erro no dispatcher do outbox: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _claim_due(self) -> list[str]:
+        if self._claim is None:
+            self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+        now = time.time()
+        ids = self._claim(
+            keys=[self.pending_key], args=[now, now + self.lease, self.batch_size]
+        )
+        return [i.decode() if isinstance(i, bytes) else i for i in ids]
+
+    def _load(self, entry_id: str, index_key: str) -> dict[str, str] | None:
+        raw = self.redis.hgetall(self._entry_key(entry_id))
+        if not raw:
+            # Entrada removida ou expirada: limpa a referência órfã no índice
+            self.redis.zrem(index_key, entry_id)
+            return None
+        return {k.decode(): v.decode() for k, v in raw.items()}  # type: ignore
+
+    async def dispatch_due(self) -> int:
+        """Entrega as respostas vencidas; em ordem para o mesmo número"""
+        entries: dict[str, list[tuple[str, dict[str, str]]]] = {}
+        for entry_id in self._claim_due():
+            entry = self._load(entry_id, self.pending_key)
+            if entry is not None:
+                entries.setdefault(entry["phone_number"], []).append((entry_id, entry))
+
+        results = await asyncio.gather(
+            *(
+                self._dispatch_phone(
+                    sorted(items, key=lambda i: float(i[1]["created_at"]))
+                )
+                for items in entries.values()
+            )
+        )
+        return sum(results)
+
+    async def _dispatch_phone(self, items: list[tuple[str, dict[str, str]]]) -> int:
+        delivered = 0
+        for index, (entry_id, entry) in enumerate(items):
+            try:
+                await self._deliver(entry["phone_number"], entry["text"])
+            except Exception as e:
+                if isinstance(e, PartialDeliveryError):
+                    # Parte do texto já chegou: as próximas tentativas enviam só o resto
+                    entry["text"] = "\n\n".join(e.remaining)
+                    self.redis.hset(self._entry_key(entry_id), "text", entry["text"])
+                retry_at = self._fail(entry_id, entry, e)
+                # As próximas do mesmo número esperam a anterior para manter a ordem
+                for later_id, _ in items[index + 1 :]:
+                    self.redis.zadd(self.pending_key, {later_id: retry_at})
+                return delivered
+
+            await self._complete(entry_id, entry)
+            delivered += 1
+        return delivered
+
+    async def _deliver(self, phone_number: str, text: str) -> None:
+        if Config.DELIVERY_QUEUE_ENABLED:
+            await delivery_queue.send(phone_number, text)
+        else:
+            await asyncio.get_running_loop().run_in_executor(
+                None, clientEvolution.send_text, phone_number, text
+            )
+
+    async def _complete(self, entry_id: str, entry: dict[str, str]) -> None:
+        """Entrega confirmada: salva no histórico e remove do outbox"""
+        records = json.loads(entry["records"])
+        try:
+            await history_writer.write(entry["phone_number"], records)
+        except Exception as e:
+            # A mensagem já foi entregue: não reenviar, só gravar o histórico no replay
+            logger.error(
+                f"Resposta {entry_id} entregue mas não salva no histórico: {e}"
+            )
+            dead_letters.add(
+                entry["phone_number"], BatchError("delivered", [], e, records)
+            )
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrem(self.pending_key, entry_id)
+        pipe.delete(self._entry_key(entry_id))
+        pipe.execute()
+
+        metrics.inc("outbox_delivered_total")
+        metrics.observe(
+            "outbox_delivery_delay_seconds", time.time() - float(entry["created_at"])
+        )
+        logger.info(f"Resposta {entry_id} entregue para {entry['phone_number']}")
+
+    def _fail(self, entry_id: str, entry: dict[str, str], error: Exception) -> float:
+        """Reagenda com backoff exponencial ou move para o dead-letter"""
+        attempts = int(entry["attempts"]) + 1
+        key = self._entry_key(entry_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={"attempts": attempts, "last_error": str(error)[:500]})
+
+        if attempts >= self.max_attempts:
+            now = time.time()
+            pipe.hset(key, "status", "dead")
+            pipe.expire(key, self.dead_ttl)
+            pipe.zrem(self.pending_key, entry_id)
+            pipe.zadd(self.dead_key, {entry_id: now})
+            # Referências cujas entradas já expiraram
+            pipe.zremrangebyscore(self.dead_key, "-inf", now - self.dead_ttl)
+            pipe.execute()
+            metrics.inc("outbox_dead_letters_total")
+            logger.error(
+                f"Resposta {entry_id} para {entry['phone_number']} movida para o "
+                f"dead-letter após {attempts} tentativas: {error}"
+            )
+            return time.time()
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        retry_at = time.time() + random.uniform(delay / 2, delay)
+        pipe.zadd(self.pending_key, {entry_id: retry_at})
+        pipe.execute()
+        metrics.inc("outbox_retries_total")
+        logger.warning(
+            f"Falha ao entregar {entry_id} (tentativa {attempts}), "
+            f"nova tentativa em {retry_at - time.time():.1f}s: {error}"
+        )
+        return retry_at
+
+    def dead_letters(self) -> list[dict[str, str]]:
+        """Respostas no dead-letter, da mais antiga para a mais recente"""
+        ids = [
+            i.decode() if isinstance(i, bytes) else i
+            for i in self.redis.zrange(self.dead_key, 0, -1)
+        ]
+        return [
+            dict(entry, id=entry_id)
+            for entry_id in ids
+            if (entry := self._load(entry_id, self.dead_key))
+        ]
+
+    def requeue_dead(self, entry_id: str) -> bool:
+        """Devolve uma resposta do dead-letter para a fila de entrega"""
+        key = self._entry_key(entry_id)
+        if not self.redis.exists(key):
+            return False
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={"attempts": 0, "status": "pending"})
+        pipe.persist(key)
+        pipe.zrem(self.dead_key, entry_id)
+        pipe.zadd(self.pending_key, {entry_id: time.time()})
+        pipe.execute()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+
+# Instância global
+outbox = Outbox()
@@ -0,0 +1,222 @@
+from redis import Redis
+from typing import Any
+import asyncio
+import json
+import logging
+import random
+import time
+
+from app.core.config import Config
+from app.utils.tokenCounter import CHARS_PER_TOKEN, MEDIA_TOKEN_ESTIMATE
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Token bucket duplo (requisições e tokens por minuto) atualizado atomicamente.
+# Usa o relógio do Redis para que todas as instâncias enxerguem o mesmo tempo.
+# Retorna 0 quando a cota foi reservada ou quantos ms aguardar antes de tentar de novo.
+_ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local need = math.min(tonumber(ARGV[3]), tpm)
+
+local function refill(key, capacity)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60000)
+end
+
+local requests = refill(KEYS[1], rpm)
+local tokens = refill(KEYS[2], tpm)
+
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * 60000 / rpm)
+end
+if tokens < need then
+    wait = math.max(wait, (need - tokens) * 60000 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - need
+end
+
+redis.call('HSET', KEYS[1], 'tokens', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+# Corrige o bucket de tokens com o uso real (pode ficar negativo após uma estimativa baixa)
+_RECONCILE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tpm = tonumber(ARGV[1])
+local delta = tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or tpm
+local ts = tonumber(state[2]) or now
+tokens = math.min(tpm, tokens + math.max(0, now - ts) * tpm / 60000) - delta
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return tostring(tokens)
+"""
+
+
+def estimate_request_tokens(input_data: Any, max_output_tokens: int = 0) -> int:
+    """Estima os tokens de uma requisição a partir do tamanho do input"""
+    if isinstance(input_data, str):
+        return len(input_data) // CHARS_PER_TOKEN + max_output_tokens
+
+    text_chars = 0
+    media_items = 0
+    for message in input_data or []:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            text_chars += len(content)
+            continue
+        for item in content:
+            if item.get("text"):
+                text_chars += len(item["text"])
+            elif item.get("type") in ("input_image", "input_file"):
+                media_items += 1
+            else:
+                text_chars += len(json.dumps(item, ensure_ascii=False))
+
+    return (
+        text_chars // CHARS_PER_TOKEN
+        + media_items * MEDIA_TOKEN_ESTIMATE
+        + max_output_tokens
+    )
+
+
+class RateLimitTimeout(Exception):
+    """A cota da OpenAI não ficou disponível dentro do tempo máximo de espera"""
+
+
+class OpenAIRateLimiter:
+    """
+    Limitador de requisições e tokens por minuto da OpenAI compartilhado por
+    todas as instâncias via Redis. As chamadas aguardam na fila (sem falhar)
+    até haver cota, cobrando uma estimativa antes e corrigindo pelo uso real.
+    """
+
+    def __init__(
+        self,
+        rpm: int = Config.OPENAI_RPM,
+        tpm: int = Config.OPENAI_TPM,
+        max_wait: float = Config.OPENAI_RATE_LIMIT_MAX_WAIT,
+        redis: Redis | None = None,
+        prefix: str = "openai_rate",
+    ) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.requests_key = f"{prefix}:requests"
+        self.tokens_key = f"{prefix}:tokens"
+        self._redis = redis
+
+    @property
+    def redis(self) -> Redis:
+        if self._redis is None:
+            self._redis = Redis.from_url(  # type: ignore[arg-type]
+                Config.REDIS_URL,
+                socket_connect_timeout=5,
+                socket_timeout=5,
+                retry_on_timeout=True,
+            )
+        return self._redis
+
+    def _try_acquire(self, tokens: int) -> int:
+        wait_ms: Any = self.redis.eval(
+            _ACQUIRE_SCRIPT,
+            2,
+            self.requests_key,
+            self.tokens_key,
+            self.rpm,
+            self.tpm,
+            tokens,
+        )
+        return int(wait_ms)
+
+    def _next_wait(self, tokens: int, start: float) -> float | None:
+        """
+        Tenta reservar a cota: None quando reservou, senão os segundos a aguardar
+        (com jitter) antes da próxima tentativa
+        """
+        wait_ms = self._try_acquire(tokens)
+        waited = time.monotonic() - start
+        if wait_ms == 0:
+            if waited > 0.5:
+                logger.info(f"Cota da OpenAI liberada após {waited:.2f}s de espera")
+            return None
+
+        if waited + wait_ms / 1000 > self.max_wait:
+            raise RateLimitTimeout(
+                f"Cota da OpenAI indisponível após {waited:.1f}s "
+                f"(próxima janela em {wait_ms} ms)"
+            )
+        # Jitter evita que todas as instâncias acordem ao mesmo tempo
+        return wait_ms / 1000 * random.uniform(1.0, 1.2)
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Aguarda até haver cota para uma requisição com `tokens` estimados"""
+        loop = asyncio.get_event_loop()
+        start = time.monotonic()
+
+        while True:
+            delay = await loop.run_in_executor(None, self._next_wait, tokens, start)
+            if delay is None:
+                return time.monotonic() - start
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 0) -> float:
+        """Versão bloqueante de acquire, para o caminho síncrono (OPENAI_ASYNC=false)"""
+        start = time.monotonic()
+
+        while True:
+            delay = self._next_wait(tokens, start)
+            if delay is None:
+                return time.monotonic() - start
+            time.sleep(delay)
+
+    def reconcile_sync(self, estimated: int, actual: int) -> None:
+        """Corrige o bucket de tokens com o uso real informado pela OpenAI"""
+        delta = actual - estimated
+        if delta == 0:
+            return
+        try:
+            self.redis.eval(_RECONCILE_SCRIPT, 1, self.tokens_key, self.tpm, delta)
+        except Exception as e:
+            # A resposta já foi gerada: falhar aqui só afeta a precisão do bucket
+            logger.warning(f"Erro ao corrigir o bucket de tokens: {e}")
+            return
+        logger.debug(
+            f"Bucket de tokens corrigido em {-delta} (estimado {estimated}, real {actual})"
+        )
+
+    def refund_sync(self, tokens: int) -> None:
+        """Devolve a estimativa de uma tentativa que não gerou uso na OpenAI"""
+        if tokens:
+            self.reconcile_sync(tokens, 0)
+
+    async def reconcile(self, estimated: int, actual: int) -> None:
+        """Versão assíncrona de reconcile_sync (o Redis roda fora do event loop)"""
+        if actual == estimated:
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.reconcile_sync, estimated, actual)
+
+    async def refund(self, tokens: int) -> None:
+        """Devolve a estimativa de uma tentativa que não gerou uso na OpenAI"""
+        if tokens:
+            await self.reconcile(tokens, 0)
+
+
+# Instância global
+openai_rate_limiter = OpenAIRateLimiter()
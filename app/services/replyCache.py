@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from app.core.config import Config
+from app.models.whatsappMessage import WhatsappMessage
+from app.utils.metrics import metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+metrics.describe("reply_cache_hits_total", "Respostas servidas pelo cache")
+metrics.describe(
+    "reply_cache_misses_total", "Perguntas elegíveis sem resposta no cache"
+)
+metrics.describe(
+    "reply_cache_latency_saved_seconds_total",
+    "Tempo de geração evitado pelas respostas em cache",
+)
+metrics.describe("reply_cache_invalidations_total", "Limpezas do cache de respostas")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos, pontuação ou espaços repetidos"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+@dataclass
+class _Entry:
+    text: str
+    expires_at: float
+    latency: float
+
+
+class ReplyCache:
+    """
+    Cache LRU com TTL de respostas para perguntas repetidas (horários, preços,
+    endereços). Só vale para conversas curtas o bastante para que a resposta
+    não dependa do contexto. A chave inclui o prompt e sua versão, e o cache
+    é esvaziado quando PROMPT_ID_VERSION muda.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = Config.REPLY_CACHE_MAX_ENTRIES,
+        ttl: int = Config.REPLY_CACHE_TTL,
+        max_history: int = Config.REPLY_CACHE_MAX_HISTORY,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_history = max_history
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._prompt = self._current_prompt()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_prompt() -> str:
+        return f"{Config.OPENAI_PROMPT_ID}:{Config.PROMPT_ID_VERSION}"
+
+    def _check_prompt(self) -> None:
+        """Esvazia o cache se o prompt mudou desde as respostas guardadas"""
+        prompt = self._current_prompt()
+        if prompt != self._prompt:
+            logger.info("Versão do prompt mudou, invalidando cache de respostas")
+            self._entries.clear()
+            self._prompt = prompt
+            metrics.inc("reply_cache_invalidations_total")
+
+    def key_for(self, zapMessage: WhatsappMessage) -> str | None:
+        """Chave da pergunta ou None se a conversa não permite usar o cache"""
+        history = zapMessage.history_to_AI
+        if zapMessage.previous_response_id or not history:
+            return None
+        if len(history) > self.max_history:
+            return None
+
+        last: dict[str, Any] = history[-1]
+        if last.get("role") != "user":
+            return None
+
+        content = last.get("content")
+        if isinstance(content, str):
+            text = content
+        elif content and all(item.get("type") == "input_text" for item in content):
+            text = " ".join(item.get("text", "") for item in content)
+        else:
+            # Mídias tornam a pergunta única
+            return None
+
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        return hashlib.sha256(
+            f"{self._current_prompt()}\n{normalized}".encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Resposta em cache para a chave, registrando acerto ou falha"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_prompt()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                metrics.inc("reply_cache_misses_total")
+                return None
+            self._entries.move_to_end(key)
+
+        metrics.inc("reply_cache_hits_total")
+        metrics.inc("reply_cache_latency_saved_seconds_total", entry.latency)
+        logger.info("Resposta servida pelo cache")
+        return entry.text
+
+    def put(self, key: str, text: str, latency: float) -> None:
+        """Guarda a resposta e o tempo que ela levou para ser gerada"""
+        with self._lock:
+            self._check_prompt()
+            self._entries[key] = _Entry(text, time.monotonic() + self.ttl, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Remove todas as respostas guardadas"""
+        with self._lock:
+            self._entries.clear()
+        metrics.inc("reply_cache_invalidations_total")
+        logger.info("Cache de respostas invalidado")
+
+
+# Instância global
+reply_cache = ReplyCache()
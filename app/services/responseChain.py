@@ -0,0 +1,70 @@
+import json
+import logging
+
+from app.core.config import Config
+from app.database import redis_queue
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class ResponseChain:
+    """
+    Guarda no Redis o último response.id da OpenAI de cada telefone, junto do
+    prompt usado, para encadear os turnos com previous_response_id em vez de
+    reenviar o histórico completo.
+    """
+
+    def __init__(self, ttl: int = Config.OPENAI_RESPONSE_CHAIN_TTL) -> None:
+        self.ttl = ttl
+
+    def _key(self, phone_number: str) -> str:
+        return f"openai_response:{phone_number}"
+
+    def get(self, phone_number: str) -> str | None:
+        """Retorna o último response.id se ele foi gerado com o prompt atual"""
+        try:
+            raw = redis_queue.redis.get(self._key(phone_number))
+            if not raw:
+                return None
+            state = json.loads(raw)  # type: ignore[arg-type]
+        except Exception as e:
+            logger.warning(f"Erro ao ler contexto da OpenAI para {phone_number}: {e}")
+            return None
+
+        if (
+            state.get("prompt_id") != Config.OPENAI_PROMPT_ID
+            or state.get("prompt_version") != Config.PROMPT_ID_VERSION
+        ):
+            logger.info(
+                f"Versão do prompt mudou, descartando contexto de {phone_number}"
+            )
+            self.clear(phone_number)
+            return None
+        return state.get("response_id")
+
+    def save(self, phone_number: str, response_id: str) -> None:
+        state = {
+            "response_id": response_id,
+            "prompt_id": Config.OPENAI_PROMPT_ID,
+            "prompt_version": Config.PROMPT_ID_VERSION,
+        }
+        try:
+            redis_queue.redis.set(
+                self._key(phone_number), json.dumps(state), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(
+                f"Erro ao salvar contexto da OpenAI para {phone_number}: {e}"
+            )
+
+    def clear(self, phone_number: str) -> None:
+        try:
+            redis_queue.redis.delete(self._key(phone_number))
+        except Exception as e:
+            logger.warning(
+                f"Erro ao limpar contexto da OpenAI para {phone_number}: {e}"
+            )
+
+
+# Instância global
+response_chain = ResponseChain()
@@ -0,0 +1,130 @@
+from html.parser import HTMLParser
+import html
+import io
+import logging
+import re
+import zipfile
+
+from app.utils.tokenCounter import count_text_tokens, split_text
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Menos texto que isso indica PDF escaneado (imagem) ou documento vazio
+MIN_EXTRACTED_CHARS = 50
+# Limite do XML descompactado de um DOCX (protege contra zip bomb)
+MAX_DOCX_XML_BYTES = 20 * 1024 * 1024
+TEXT_MIMETYPES = ("application/json", "application/xml", "application/csv")
+DOCX_MIMETYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+_DOCX_PARAGRAPH = re.compile(r"</w:p>")
+_XML_TAG = re.compile(r"<[^>]+>")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+class _HTMLText(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag) -> None:
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data) -> None:
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _extract_pdf(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.info("pypdf não instalado, PDF será enviado como arquivo")
+        return ""
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _extract_docx(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        if archive.getinfo("word/document.xml").file_size > MAX_DOCX_XML_BYTES:
+            raise ValueError("word/document.xml maior que o limite")
+        # O tamanho declarado pode ser falso: a leitura também é limitada
+        with archive.open("word/document.xml") as document:
+            content = document.read(MAX_DOCX_XML_BYTES + 1)
+    if len(content) > MAX_DOCX_XML_BYTES:
+        raise ValueError("word/document.xml maior que o limite")
+    xml = content.decode("utf-8", errors="replace")
+    return html.unescape(_XML_TAG.sub("", _DOCX_PARAGRAPH.sub("\n", xml)))
+
+
+def _extract_html(data: bytes) -> str:
+    parser = _HTMLText()
+    parser.feed(data.decode("utf-8", errors="replace"))
+    return "".join(parser.parts)
+
+
+def extract_text(data: bytes, mimetype: str) -> str:
+    """
+    Extrai o texto de PDF, DOCX, HTML e formatos de texto. Retorna "" para
+    formatos não suportados ou documentos sem texto (ex.: PDF escaneado).
+    Função de módulo para poder rodar no pool de processos.
+    """
+    mimetype = (mimetype or "").split(";")[0].strip().lower()
+    try:
+        if mimetype == "application/pdf" or data[:5] == b"%PDF-":
+            text = _extract_pdf(data)
+        elif mimetype == DOCX_MIMETYPE:
+            text = _extract_docx(data)
+        elif mimetype == "text/html":
+            text = _extract_html(data)
+        elif mimetype.startswith("text/") or mimetype in TEXT_MIMETYPES:
+            text = data.decode("utf-8", errors="replace")
+        else:
+            return ""
+    except Exception as e:
+        logger.warning(f"Falha ao extrair texto do documento ({mimetype}): {e}")
+        return ""
+
+    text = _BLANK_LINES.sub("\n\n", text).strip()
+    return text if len(text) >= MIN_EXTRACTED_CHARS else ""
+
+
+def fit_text_to_budget(text: str, max_tokens: int, chunk_tokens: int) -> str:
+    """Agrupa as linhas em trechos de até chunk_tokens e mantém os que cabem no orçamento"""
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in text.splitlines():
+        tokens = count_text_tokens(line)
+        # Linhas longas (JSON minificado, HTML em uma linha) viram vários trechos
+        pieces = split_text(line, chunk_tokens) if tokens > chunk_tokens else [line]
+        for piece in pieces:
+            if len(pieces) > 1:
+                tokens = count_text_tokens(piece)
+            if current and current_tokens + tokens > chunk_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+
+    kept: list[str] = []
+    used = 0
+    for chunk in chunks:
+        tokens = count_text_tokens(chunk)
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(chunk)
+        used += tokens
+
+    if len(kept) < len(chunks):
+        kept.append(f"[... documento truncado: {len(kept)} de {len(chunks)} trechos]")
+    return "\n\n".join(kept)
@@ -0,0 +1,68 @@
+import io
+import logging
+import math
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+try:  # Pillow é opcional: sem ele as imagens seguem no tamanho original
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - dependência opcional
+    Image = None
+    ImageOps = None
+
+
+def pillow_available() -> bool:
+    return Image is not None
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Tokens de uma imagem em detalhe alto no modelo da OpenAI: cabe em 2048x2048,
+    o lado menor vai a 768 e cada bloco de 512x512 custa 170 (+85 fixos).
+    """
+    if not width or not height:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def downscale_image(
+    data: bytes, max_dimension: int, quality: int
+) -> tuple[bytes, str, tuple[int, int], tuple[int, int]]:
+    """
+    Reduz a imagem para caber em max_dimension, aplica a orientação do EXIF,
+    remove os metadados e recomprime (JPEG, ou PNG quando há transparência).
+    Retorna (bytes, mimetype, tamanho original, tamanho final); se o resultado
+    não ficar menor, devolve os bytes originais.
+    Função de módulo para poder rodar no pool de processos.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow não instalado")
+
+    with Image.open(io.BytesIO(data)) as image:
+        original_format = (image.format or "JPEG").upper()
+        original_size = image.size
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        output = io.BytesIO()
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        if has_alpha:
+            image.save(output, format="PNG", optimize=True)
+            mimetype = "image/png"
+        else:
+            image.convert("RGB").save(
+                output, format="JPEG", quality=quality, optimize=True
+            )
+            mimetype = "image/jpeg"
+        final_size = image.size
+
+    processed = output.getvalue()
+    if len(processed) >= len(data) and final_size == original_size:
+        return data, f"image/{original_format.lower()}", original_size, original_size
+    return processed, mimetype, original_size, final_size
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from typing import Literal
+import threading
+
+MetricKind = Literal["counter", "summary"]
+LabelSet = tuple[tuple[str, str], ...]
+
+
+class Metrics:
+    """
+    Contadores e somatórios em memória do processo, exportados no formato
+    texto do Prometheus pela rota /metrics.
+    """
+
+    def __init__(self) -> None:
+        self._values: dict[str, dict[LabelSet, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._kinds: dict[str, MetricKind] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: dict[str, str]) -> LabelSet:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Registra a descrição exibida na exportação"""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, /, **labels: str) -> None:
+        """Incrementa um contador"""
+        with self._lock:
+            self._kinds.setdefault(name, "counter")
+            self._values[name][self._labels(labels)] += value
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        """Registra uma observação (soma e quantidade, ex.: latências)"""
+        key = self._labels(labels)
+        with self._lock:
+            self._kinds.setdefault(name, "summary")
+            self._values[f"{name}_sum"][key] += value
+            self._values[f"{name}_count"][key] += 1
+
+    def get(self, name: str, /, **labels: str) -> float:
+        """Valor atual de um contador (ou de um _sum/_count)"""
+        with self._lock:
+            return self._values.get(name, {}).get(self._labels(labels), 0.0)
+
+    def render(self) -> str:
+        """Exporta todas as métricas no formato texto do Prometheus"""
+        lines: list[str] = []
+        with self._lock:
+            for name, kind in sorted(self._kinds.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                series = (
+                    [name] if kind == "counter" else [f"{name}_sum", f"{name}_count"]
+                )
+                for series_name in series:
+                    for labels, value in sorted(self._values[series_name].items()):
+                        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                        if label_text:
+                            label_text = "{" + label_text + "}"
+                        lines.append(f"{series_name}{label_text} {value:.15g}")
+        return "\n".join(lines) + "\n"
+
+
+# Instância global
+metrics = Metrics()
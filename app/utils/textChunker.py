@@ -0,0 +1,81 @@
+import re
+import time
+
+# Fim de frase seguido de espaço, ou quebra de parágrafo
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…:;])\s+|\n\s*\n")
+
+
+class SentenceChunker:
+    """
+    Agrupa os deltas de texto de uma resposta em streaming em trechos completos
+    (frases ou parágrafos) de pelo menos `min_chars`, para envio incremental.
+    """
+
+    def __init__(self, min_chars: int = 80) -> None:
+        self.min_chars = min_chars
+        self.buffer = ""
+        self.buffered_since: float | None = None
+
+    def _cut(self, position: int, end: int) -> str:
+        chunk, self.buffer = self.buffer[:position].strip(), self.buffer[end:]
+        self.buffered_since = time.monotonic() if self.buffer.strip() else None
+        return chunk
+
+    def feed(self, delta: str) -> str:
+        """Adiciona um delta e retorna o trecho pronto para envio ("" se nenhum)"""
+        if not delta:
+            return ""
+        if self.buffered_since is None:
+            self.buffered_since = time.monotonic()
+        self.buffer += delta
+
+        # Corta no último limite de frase, se ele deixar um trecho de tamanho mínimo
+        matches = list(SENTENCE_BOUNDARY.finditer(self.buffer))
+        if matches and matches[-1].start() >= self.min_chars:
+            return self._cut(matches[-1].start(), matches[-1].end())
+        return ""
+
+    def flush_partial(self) -> str:
+        """
+        Usado no timeout de flush: envia até o último limite de frase, mesmo que
+        menor que o mínimo, ou até a última palavra completa se o buffer já for grande.
+        Se não houver o que enviar, o prazo do flush recomeça a contar
+        """
+        matches = list(SENTENCE_BOUNDARY.finditer(self.buffer))
+        if matches:
+            return self._cut(matches[-1].start(), matches[-1].end())
+        if len(self.buffer) >= self.min_chars:
+            last_space = self.buffer.rstrip().rfind(" ")
+            if last_space > 0:
+                return self._cut(last_space, last_space + 1)
+        if self.buffered_since is not None:
+            self.buffered_since = time.monotonic()
+        return ""
+
+    def flush(self) -> str:
+        """Retorna todo o texto restante (fim do stream)"""
+        return self._cut(len(self.buffer), len(self.buffer))
+
+
+def split_text(text: str, max_chars: int) -> list[str]:
+    """
+    Divide um texto longo em partes de até `max_chars`, cortando de preferência
+    entre parágrafos, depois entre frases e por último entre palavras.
+    """
+    text = text.strip()
+    parts: list[str] = []
+    while len(text) > max_chars:
+        window = text[: max_chars + 1]
+        cut = window.rfind("\n\n")
+        if cut <= 0:
+            boundaries = [m.start() for m in SENTENCE_BOUNDARY.finditer(window)]
+            cut = boundaries[-1] if boundaries and boundaries[-1] > 0 else -1
+        if cut <= 0:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = max_chars
+        parts.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        parts.append(text)
+    return parts
@@ -0,0 +1,128 @@
+from typing import Any
+import logging
+
+from app.core.config import Config
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+try:  # Contagem exata quando o tiktoken estiver instalado
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - dependência opcional
+    _encoding = None
+
+# Aproximação usada sem tokenizer ou para mídias (conteúdo só é conhecido ao descriptografar)
+CHARS_PER_TOKEN = 4
+MEDIA_TOKEN_ESTIMATE = 1000
+# Documentos com texto extraído entram no histórico com até este número de tokens
+DOCUMENT_TOKEN_ESTIMATE = (
+    max(
+        MEDIA_TOKEN_ESTIMATE,
+        min(Config.DOCUMENT_MAX_TOKENS, Config.HISTORY_ITEM_MAX_TOKENS),
+    )
+    if Config.DOCUMENT_EXTRACTION_ENABLED
+    else MEDIA_TOKEN_ESTIMATE
+)
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "\n[...]\n"
+
+
+def count_text_tokens(text: str) -> int:
+    """Conta os tokens de um texto"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_message_tokens(message: dict[str, Any]) -> int:
+    """Conta os tokens de uma mensagem do histórico (mídias por estimativa)"""
+    total = MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return total + count_text_tokens(content)
+
+    for item in content:
+        if item.get("text"):
+            total += count_text_tokens(item["text"])
+        elif item.get("type") == "input_file":
+            total += DOCUMENT_TOKEN_ESTIMATE
+        elif item.get("type") in ("input_audio", "input_image"):
+            total += MEDIA_TOKEN_ESTIMATE
+    return total
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Corta um texto longo mantendo o início e o fim"""
+    if count_text_tokens(text) <= max_tokens:
+        return text
+
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        half = max_tokens // 2
+        return (
+            _encoding.decode(tokens[:half])
+            + TRUNCATION_MARKER
+            + _encoding.decode(tokens[-half:])
+        )
+
+    half = max_tokens * CHARS_PER_TOKEN // 2
+    return text[:half] + TRUNCATION_MARKER + text[-half:]
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """Divide um texto em partes de até max_tokens, sem descartar conteúdo"""
+    if _encoding is not None:
+        tokens = _encoding.encode(text, disallowed_special=())
+        return [
+            _encoding.decode(tokens[start : start + max_tokens])
+            for start in range(0, len(tokens), max_tokens)
+        ] or [text]
+
+    size = max_tokens * CHARS_PER_TOKEN
+    return [text[start : start + size] for start in range(0, len(text), size)] or [text]
+
+
+def fit_history_to_budget(
+    messages: list[dict[str, Any]],
+    budget: int = Config.HISTORY_TOKEN_BUDGET,
+    item_max_tokens: int = Config.HISTORY_ITEM_MAX_TOKENS,
+) -> list[dict[str, Any]]:
+    """
+    Seleciona as mensagens mais recentes que cabem no orçamento de tokens.
+    Textos acima de item_max_tokens são cortados; a mensagem mais recente
+    sempre entra. Usa o token_count salvo com a mensagem quando existir.
+    """
+    selected: list[dict[str, Any]] = []
+    used = 0
+
+    for message in reversed(messages):
+        message = dict(message)
+        # Campos internos do banco não vão para a OpenAI
+        message.pop("id", None)
+        tokens = message.pop("token_count", None)
+        if tokens is None:
+            tokens = count_message_tokens(message)
+
+        if tokens > item_max_tokens and isinstance(message.get("content"), list):
+            message["content"] = [
+                (
+                    {**item, "text": truncate_text(item["text"], item_max_tokens)}
+                    if item.get("text")
+                    else item
+                )
+                for item in message["content"]
+            ]
+            tokens = count_message_tokens(message)
+
+        if selected and used + tokens > budget:
+            break
+        selected.append(message)
+        used += tokens
+
+    selected.reverse()
+    logger.info(
+        f"Histórico montado com {len(selected)}/{len(messages)} mensagens "
+        f"(~{used} tokens de {budget})"
+    )
+    return selected
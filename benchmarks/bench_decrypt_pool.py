@@ -0,0 +1,83 @@
+"""
+Mede a vazão da descriptografia de vários arquivos simultâneos em cada modo
+do DecryptExecutor (inline, thread e process) variando o número de workers.
+
+Uso:
+    python -m benchmarks.bench_decrypt_pool [--files 16] [--size-mb 20]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.integrations.decrypt import decryptByName
+from app.services.decryptExecutor import DecryptExecutor
+from benchmarks.fixtures import MB, write_encrypted
+
+MEDIA_KEY = bytes(range(32))
+MEDIA_TYPE = "document"
+
+
+async def _run_workload(executor: DecryptExecutor, files: list[str]) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            executor.run(
+                decryptByName,
+                src.encode(),
+                MEDIA_KEY,
+                MEDIA_TYPE,
+                f"{src}.out".encode(),
+            )
+            for src in files
+        )
+    )
+    elapsed = time.perf_counter() - start
+    if not all(results):
+        raise RuntimeError("Falha na descriptografia de algum arquivo")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--size-mb", type=float, default=20)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    size = int(args.size_mb * MB)
+    total_mb = args.files * size / MB
+
+    print(f"{args.files} arquivos de {args.size_mb} MB, {cpus} CPUs")
+    print(f"{'modo':>8} | {'workers':>7} | {'tempo (s)':>9} | {'MB/s':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [
+            write_encrypted(
+                os.path.join(tmp, f"media{i}.enc"), size, MEDIA_KEY, MEDIA_TYPE
+            )
+            for i in range(args.files)
+        ]
+
+        runs = [("inline", 1)]
+        runs += [(mode, n) for mode in ("thread", "process") for n in worker_counts]
+        for mode, workers in runs:
+            executor = DecryptExecutor(mode=mode, max_workers=workers)
+            try:
+                if mode == "process":
+                    # Aquece o pool para não medir a criação dos processos
+                    asyncio.run(_run_workload(executor, files[:workers]))
+                elapsed = asyncio.run(_run_workload(executor, files))
+            finally:
+                executor.shutdown()
+            print(
+                f"{mode:>8} | {workers:>7} | {elapsed:>9.3f} | "
+                f"{total_mb / elapsed:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compara a descriptografia em memória (caminho antigo) com a descriptografia em
+streaming de decryptByName, de 1 KB a 200 MB.
+
+Uso:
+    python -m benchmarks.bench_decrypt_stream [--sizes 1KB,1MB,200MB]
+
+Para cada tamanho são reportados o tempo, a vazão e o pico de memória alocada
+(tracemalloc) de cada caminho.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from app.integrations.decrypt import _AESDecrypt, _HKDF, appInfo, decryptByName
+from benchmarks.fixtures import KB, MB, write_encrypted
+
+DEFAULT_SIZES = "1KB,64KB,1MB,10MB,50MB,100MB,200MB"
+MEDIA_KEY = bytes(range(32))
+MEDIA_TYPE = "document"
+
+
+def _parse_size(value: str) -> int:
+    value = value.strip().upper()
+    for suffix, factor in (("MB", MB), ("KB", KB)):
+        if value.endswith(suffix):
+            return int(float(value[: -len(suffix)]) * factor)
+    return int(value)
+
+
+def _in_memory(src: str, dst: str) -> None:
+    """Reproduz o caminho antigo: lê tudo, descriptografa de uma vez e escreve"""
+    mediaKeyExpanded = _HKDF(MEDIA_KEY, 112, appInfo[MEDIA_TYPE])
+    with open(src, "rb") as f:
+        mediaData = f.read()
+    data = _AESDecrypt(mediaKeyExpanded[16:48], mediaData[:-10], mediaKeyExpanded[:16])
+    with open(dst, "wb") as f:
+        f.write(data)
+
+
+def _streaming(src: str, dst: str) -> None:
+    if not decryptByName(src.encode(), MEDIA_KEY, MEDIA_TYPE, dst.encode()):
+        raise RuntimeError("decryptByName falhou")
+
+
+def _measure(fn: Callable[[str, str], None], src: str, dst: str) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(src, dst)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    print(
+        f"{'tamanho':>10} | {'caminho':>10} | {'tempo (s)':>9} | "
+        f"{'MB/s':>8} | {'pico (MB)':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (_parse_size(s) for s in args.sizes.split(",")):
+            src = write_encrypted(
+                os.path.join(tmp, "media.enc"), size, MEDIA_KEY, MEDIA_TYPE
+            )
+            for name, fn in (("memória", _in_memory), ("streaming", _streaming)):
+                dst = os.path.join(tmp, f"media.{name}")
+                elapsed, peak = _measure(fn, src, dst)
+                print(
+                    f"{size:>10} | {name:>10} | {elapsed:>9.4f} | "
+                    f"{size / MB / elapsed:>8.1f} | {peak / MB:>9.2f}"
+                )
+                os.remove(dst)
+
+
+if __name__ == "__main__":
+    main()
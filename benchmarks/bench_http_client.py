@@ -0,0 +1,71 @@
+"""
+Mede o custo por requisição de abrir uma conexão TLS nova a cada chamada
+(caminho antigo com requests.get) contra o cliente HTTP compartilhado com
+keep-alive, usando um servidor HTTPS local como substituto da CDN.
+
+Uso:
+    python -m benchmarks.bench_http_client [--requests 200] [--size-kb 16]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable
+
+import requests
+
+from app.integrations.httpClient import HttpClient
+from benchmarks.fixtures import KB
+from benchmarks.http_server import make_self_signed_cert, serve_directory
+
+
+def _measure(fn: Callable[[], None], count: int) -> list[float]:
+    fn()  # aquecimento
+    samples: list[float] = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "media.bin"), "wb") as f:
+            f.write(os.urandom(args.size_kb * KB))
+        certfile = make_self_signed_cert(tmp)
+
+        with serve_directory(tmp, certfile=certfile) as base_url:
+            url = f"{base_url}/media.bin"
+            pooled = HttpClient(verify=certfile)
+
+            def new_connection() -> None:
+                requests.get(url, timeout=30, verify=certfile).raise_for_status()
+
+            def shared_client() -> None:
+                pooled.get(url).raise_for_status()
+
+            print(f"{args.requests} GETs de {args.size_kb} KB via HTTPS local")
+            print(f"{'caminho':>22} | {'média (ms)':>10} | {'p50':>7} | {'p99':>7}")
+            for name, fn in (
+                ("requests.get (nova)", new_connection),
+                ("HttpClient (pool)", shared_client),
+            ):
+                samples = sorted(_measure(fn, args.requests))
+                p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+                print(
+                    f"{name:>22} | {statistics.fmean(samples) * 1000:>10.2f} | "
+                    f"{statistics.median(samples) * 1000:>7.2f} | {p99 * 1000:>7.2f}"
+                )
+            pooled.close()
+
+
+if __name__ == "__main__":
+    main()
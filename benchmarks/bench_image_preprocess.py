@@ -0,0 +1,71 @@
+"""
+Compara imagens no tamanho original com a versão reduzida e recomprimida de
+downscale_image, usando fotos sintéticas em resoluções típicas de celular.
+
+Uso:
+    python -m benchmarks.bench_image_preprocess [--max-dimension 1536] [--mbps 20]
+
+Para cada resolução são reportados bytes, tokens estimados de imagem, tempo de
+processamento e o tempo de transferência estimado para a banda informada
+(upload da mídia até a OpenAI), antes e depois. Requer Pillow.
+"""
+
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from app.utils.imageProcessing import downscale_image, estimate_image_tokens
+from benchmarks.fixtures import MB
+
+RESOLUTIONS = ((1600, 1200), (3024, 4032), (4000, 3000), (4624, 3472))
+
+
+def _synthetic_photo(width: int, height: int) -> bytes:
+    """Gradiente com ruído (comprime como uma foto) e EXIF com orientação"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge(
+        "RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT))
+    )
+    exif = Image.Exif()
+    exif[0x0112] = 1  # orientação
+    exif[0x010F] = "Fabricante" * 20
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-dimension", type=int, default=1536)
+    parser.add_argument("--quality", type=int, default=82)
+    parser.add_argument("--mbps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    bytes_per_second = args.mbps * 1_000_000 / 8
+    print(
+        f"{'resolução':>10} | {'MB antes':>8} | {'MB depois':>9} | "
+        f"{'tokens antes':>12} | {'tokens depois':>13} | {'proc (s)':>8} | "
+        f"{'envio antes (s)':>15} | {'envio depois (s)':>16}"
+    )
+    for width, height in RESOLUTIONS:
+        original = _synthetic_photo(width, height)
+        start = time.perf_counter()
+        processed, _, _, final_size = downscale_image(
+            original, args.max_dimension, args.quality
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{width}x{height:<5} | {len(original) / MB:>8.2f} | "
+            f"{len(processed) / MB:>9.2f} | "
+            f"{estimate_image_tokens(width, height):>12} | "
+            f"{estimate_image_tokens(*final_size):>13} | {elapsed:>8.3f} | "
+            f"{len(original) / bytes_per_second:>15.2f} | "
+            f"{elapsed + len(processed) / bytes_per_second:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Compara o histórico em um documento por conversa (array `messages` com $slice)
+com o layout em buckets, em um mongod local com muitas conversas.
+
+Para cada layout: popula as conversas direto no formato do layout (a maioria
+curta e `--hot` delas já com 100 mensagens), mede turnos de escrita (usuário +
+assistente) e leituras do histórico nas conversas longas, os bytes gravados
+em disco pelo WiredTiger durante as escritas e o tamanho das coleções.
+
+Uso (requer um mongod local; apaga os bancos bench_history_*):
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_mongo_buckets \\
+        [--conversations 1000000] [--messages 10] [--hot 1000] [--turns 5000]
+
+Sem mongod, --estimate calcula só o tamanho BSON do documento que cada layout
+reescreve por turno numa conversa longa (o WiredTiger grava o documento
+inteiro a cada update, então é o piso dos bytes gravados por turno):
+    STORAGE_BACKENDS=memory python -m benchmarks.bench_mongo_buckets --estimate
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from bson import encode
+
+from app.core.config import Config
+from app.database.mongoDB import HISTORY_LIMIT, MongoDB
+
+INSERT_BATCH = 10000
+
+
+def _message(role: str, index: int) -> dict[str, Any]:
+    text = f"Mensagem {index}: " + "texto de exemplo da conversa " * 8
+    return {
+        "role": role,
+        "content": [
+            {
+                "type": "input_text" if role == "user" else "output_text",
+                "text": text,
+            }
+        ],
+        "id": uuid.uuid4().hex,
+        "token_count": len(text) // 4,
+    }
+
+
+def _history(size: int) -> list[dict[str, Any]]:
+    return [_message("user" if i % 2 == 0 else "assistant", i) for i in range(size)]
+
+
+def _seed(db: MongoDB, conversations: int, messages: int, hot: int) -> None:
+    """Insere as conversas já no formato final (sem passar pelo save)"""
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=1)
+    target = db.buckets if db.bucketed else db.conversations
+    assert target is not None
+    docs: list[dict[str, Any]] = []
+
+    for index in range(conversations):
+        phone = f"55{index:011d}"
+        history = _history(HISTORY_LIMIT if index < hot else messages)
+        if db.bucketed:
+            for start in range(0, len(history), db.bucket_size):
+                chunk = history[start : start + db.bucket_size]
+                docs.append(
+                    {
+                        "phone_number": phone,
+                        "messages": chunk,
+                        "count": len(chunk),
+                        "closed": start + db.bucket_size < len(history),
+                        "started_at": now + timedelta(microseconds=start),
+                        "updated_at": now,
+                        "expires_at": expires_at,
+                    }
+                )
+        else:
+            docs.append(
+                {
+                    "phone_number": phone,
+                    "messages": history,
+                    "created_at": now,
+                    "update_at": now,
+                    "expires_at": expires_at,
+                }
+            )
+        if len(docs) >= INSERT_BATCH:
+            target.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        target.insert_many(docs, ordered=False)
+
+
+def _estimate(bucket_size: int) -> dict[str, float]:
+    """BSON médio do documento reescrito por turno (usuário + assistente)"""
+    now = datetime.now(timezone.utc)
+    history = _history(HISTORY_LIMIT)
+    document = {
+        "phone_number": "5500000000000",
+        "messages": history,
+        "created_at": now,
+        "update_at": now,
+        "expires_at": now,
+    }
+    # O bucket aberto recebe o turno com 2, 4, ... bucket_size mensagens
+    buckets = [
+        len(
+            encode(
+                {
+                    "phone_number": "5500000000000",
+                    "messages": history[:count],
+                    "count": count,
+                    "closed": False,
+                    "started_at": now,
+                    "updated_at": now,
+                    "expires_at": now,
+                }
+            )
+        )
+        for count in range(2, bucket_size + 1, 2)
+    ]
+    return {
+        "documento": len(encode(document)),
+        "buckets": sum(buckets) / len(buckets),
+    }
+
+
+def _bytes_written(db: MongoDB) -> int:
+    assert db.client is not None
+    # Força um checkpoint para que as escritas pendentes cheguem ao disco
+    db.client.admin.command("fsync")
+    status = db.client.admin.command("serverStatus")
+    return status["wiredTiger"]["block-manager"]["bytes written"]
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def _run(bucketed: bool, args: argparse.Namespace) -> dict[str, Any]:
+    Config.MONGO_INITDB_DATABASE = f"bench_history_{'bucket' if bucketed else 'doc'}"
+    db = MongoDB(bucketed=bucketed, bucket_size=args.bucket_size)
+    if db.client is None or db.db is None or not db.is_healthy:
+        raise SystemExit(
+            f"mongod indisponível em {Config.MONGODB_URI} (use --estimate sem servidor)"
+        )
+    db.client.drop_database(Config.MONGO_INITDB_DATABASE)
+    db._create_indexes()
+
+    started = time.perf_counter()
+    _seed(db, args.conversations, args.messages, args.hot)
+    seed_time = time.perf_counter() - started
+
+    hot_phones = [f"55{i:011d}" for i in range(args.hot)]
+    before = _bytes_written(db)
+    writes: list[float] = []
+    for turn in range(args.turns):
+        phone = random.choice(hot_phones)
+        pair = [_message("user", turn), _message("assistant", turn)]
+        started = time.perf_counter()
+        db.save_many(phone, pair)
+        writes.append(time.perf_counter() - started)
+    written = _bytes_written(db) - before
+
+    reads: list[float] = []
+    for _ in range(args.turns):
+        phone = random.choice(hot_phones)
+        started = time.perf_counter()
+        history = db.get_history(phone, limit=args.limit)
+        reads.append(time.perf_counter() - started)
+        assert len(history) == args.limit
+
+    collection = "conversation_buckets" if bucketed else "conversations"
+    stats = db.db.command("collStats", collection)
+    return {
+        "seed": seed_time,
+        "write": _percentiles(writes),
+        "read": _percentiles(reads),
+        "bytes_per_turn": written / args.turns,
+        "size": stats["size"],
+        "storage": stats["storageSize"] + stats["totalIndexSize"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--hot", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--bucket-size", type=int, default=Config.MONGO_BUCKET_SIZE)
+    parser.add_argument(
+        "--estimate", action="store_true", help="Só o tamanho BSON, sem mongod"
+    )
+    args = parser.parse_args()
+
+    if args.estimate:
+        print(
+            f"Documento reescrito por turno numa conversa com {HISTORY_LIMIT} "
+            f"mensagens (buckets de {args.bucket_size})"
+        )
+        for layout, size in _estimate(args.bucket_size).items():
+            print(f"{layout:>9} | {size / 1024:6.1f} KB")
+        return
+
+    print(
+        f"{args.conversations} conversas ({args.hot} com {HISTORY_LIMIT} mensagens), "
+        f"{args.turns} turnos, histórico de {args.limit} mensagens"
+    )
+    print(
+        f"{'layout':>9} | {'carga':>7} | {'escrita p50/p95 (ms)':>21} | "
+        f"{'leitura p50/p95 (ms)':>21} | {'KB/turno':>8} | {'dados':>8} | {'disco':>8}"
+    )
+    for bucketed in (False, True):
+        result = _run(bucketed, args)
+        write, read = result["write"], result["read"]
+        print(
+            f"{'buckets' if bucketed else 'documento':>9} | {result['seed']:6.0f}s | "
+            f"{write[0] * 1000:9.2f} / {write[1] * 1000:9.2f} | "
+            f"{read[0] * 1000:9.2f} / {read[1] * 1000:9.2f} | "
+            f"{result['bytes_per_turn'] / 1024:8.1f} | "
+            f"{result['size'] / 2**20:6.0f}MB | {result['storage'] / 2**20:6.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Simula uma rajada de conversas contra um modelo falso com limite de
+requisições/tokens por minuto, com e sem o limitador distribuído (Redis).
+
+Sem o limitador as chamadas excedentes recebem 429 e, esgotadas as novas
+tentativas, o batch é perdido; com ele as chamadas aguardam na fila.
+
+Uso (requer o Redis de REDIS_URL):
+    python -m benchmarks.bench_rate_limiter [--conversations 60] [--rpm 30]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from app.integrations.openaiIntegration import OpenaiIntegration
+from app.models.contentItem import ContentItem
+from app.models.message import Message
+from app.models.whatsappMessage import WhatsappMessage
+from app.services.rateLimiter import OpenAIRateLimiter
+from benchmarks.fake_openai import FakeModelServer, serve_fake_model
+
+
+def _zap_message(turns: int) -> WhatsappMessage:
+    message = Message(role="user", content=[ContentItem(type="input_text", text="oi")])
+    zap_message = WhatsappMessage(to_number="5511999999999", message=message)
+    zap_message.history_to_AI = [
+        {
+            "role": "user",
+            "content": [{"type": "input_text", "text": "Qual o horário? " * 20}],
+        }
+        for _ in range(turns)
+    ]
+    return zap_message
+
+
+async def _run(client: OpenaiIntegration, conversations: int, turns: int) -> dict:
+    latencies: list[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await client.acreate_response(_zap_message(turns))
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(conversations)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "failures": failures,
+        "elapsed": elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=60)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--rpm", type=int, default=30)
+    parser.add_argument("--tpm", type=int, default=200000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(
+        f"{args.conversations} conversas, limite {args.rpm} RPM / {args.tpm} TPM, "
+        f"latência do modelo {args.latency}s"
+    )
+    print(
+        f"{'modo':>12} | {'ok':>4} | {'falhas':>6} | {'429s':>5} | "
+        f"{'total (s)':>9} | {'p50 (s)':>7} | {'p95 (s)':>7}"
+    )
+
+    for mode in ("sem limite", "token bucket"):
+        model = FakeModelServer(rpm=args.rpm, tpm=args.tpm, latency=args.latency)
+        with serve_fake_model(model) as base_url:
+            os.environ["OPENAI_BASE_URL"] = base_url
+            client = OpenaiIntegration()
+            client.max_concurrency = args.conversations
+            client.rate_limiter = None
+            if mode == "token bucket":
+                client.rate_limiter = OpenAIRateLimiter(
+                    rpm=args.rpm,
+                    tpm=args.tpm,
+                    prefix=f"bench_openai_rate:{uuid.uuid4().hex}",
+                )
+            result = asyncio.run(_run(client, args.conversations, args.turns))
+
+        print(
+            f"{mode:>12} | {result['ok']:>4} | {result['failures']:>6} | "
+            f"{model.stats.rate_limited:>5} | {result['elapsed']:>9.2f} | "
+            f"{result['p50']:>7.2f} | {result['p95']:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
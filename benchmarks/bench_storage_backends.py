@@ -0,0 +1,76 @@
+"""
+Mede o custo dos bancos embutidos do histórico (memória, SQLite em memória e
+em arquivo) com o mesmo padrão de uso do pipeline: turnos de usuário +
+assistente e leitura do histórico antes de cada resposta. Serve de base para
+isolar o overhead do pipeline da latência do banco (STORAGE_BACKENDS=memory).
+
+Uso:
+    python -m benchmarks.bench_storage_backends [--conversations 1000] [--turns 20000]
+"""
+
+from typing import Any, Callable
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from app.database.memoryStore import MemoryStore
+from app.database.sqliteStore import SQLiteStore
+
+
+def _message(role: str, index: int) -> dict[str, Any]:
+    return {
+        "role": role,
+        "content": [{"type": "input_text", "text": f"Mensagem {index} " * 20}],
+        "id": uuid.uuid4().hex,
+    }
+
+
+def _run(store: Any, conversations: int, turns: int, limit: int) -> dict[str, float]:
+    phones = [f"55{index:011d}" for index in range(conversations)]
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for turn in range(turns):
+        phone = random.choice(phones)
+        turn_started = time.perf_counter()
+        store.get_history(phone, limit=limit)
+        store.save_many(phone, [_message("user", turn), _message("assistant", turn)])
+        latencies.append(time.perf_counter() - turn_started)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "turns_per_second": turns / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    backends: list[tuple[str, Callable[[], Any]]] = [
+        ("memória", MemoryStore),
+        ("sqlite :memory:", lambda: SQLiteStore(":memory:")),
+        ("sqlite arquivo", lambda: SQLiteStore(os.path.join(directory, "h.db"))),
+    ]
+
+    print(f"{args.conversations} conversas, {args.turns} turnos (leitura + escrita)")
+    print(f"{'banco':>16} | {'turnos/s':>9} | {'p50 (ms)':>8} | {'p95 (ms)':>8}")
+    for name, factory in backends:
+        result = _run(factory(), args.conversations, args.turns, args.limit)
+        print(
+            f"{name:>16} | {result['turns_per_second']:9.0f} | "
+            f"{result['p50'] * 1000:8.3f} | {result['p95'] * 1000:8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compara o tempo até a primeira mensagem no WhatsApp com e sem streaming,
+usando um modelo falso que gera um token a cada `--token-delay` segundos e
+um substituto local da EvolutionAPI que registra o horário de cada envio.
+
+Uso:
+    python -m benchmarks.bench_streaming [--token-delay 0.03] [--words 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+
+from app.integrations.evolutionIntegration import EvolutionIntegration
+from app.integrations.openaiIntegration import OpenaiIntegration
+from app.models.contentItem import ContentItem
+from app.models.message import Message
+from app.models.whatsappMessage import WhatsappMessage
+from benchmarks.fake_openai import FakeModelServer, serve_fake_model
+
+SENTENCE = "Nosso horário de atendimento é de segunda a sexta, das 8h às 18h."
+
+
+@contextmanager
+def serve_fake_evolution(sent_at: list[float]) -> Iterator[str]:
+    """Substituto da EvolutionAPI que registra o horário de cada mensagem recebida"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("content-length", 0)))
+            sent_at.append(time.perf_counter())
+            body = json.dumps({"status": "PENDING"}).encode()
+            self.send_response(201)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        host, port = httpd.server_address[:2]
+        yield f"http://{host}:{port}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _zap_message() -> WhatsappMessage:
+    message = Message(
+        role="user", content=[ContentItem(type="input_text", text="Qual o horário?")]
+    )
+    zap_message = WhatsappMessage(to_number="5511999999999", message=message)
+    zap_message.history_to_AI = [message.model_dump(exclude_none=True)]
+    return zap_message
+
+
+async def _buffered(client: OpenaiIntegration, evolution: EvolutionIntegration) -> None:
+    zap_message = _zap_message()
+    await client.acreate_response(zap_message)
+    await asyncio.get_event_loop().run_in_executor(
+        None, evolution.send_message, zap_message
+    )
+
+
+async def _streamed(client: OpenaiIntegration, evolution: EvolutionIntegration) -> None:
+    async def send(text: str) -> None:
+        await asyncio.get_event_loop().run_in_executor(
+            None, evolution.send_text, "5511999999999", text
+        )
+
+    await client.astream_response(_zap_message(), on_chunk=send)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    words = SENTENCE.split(" ")
+    reply = " ".join(words[i % len(words)] for i in range(args.words))
+    model = FakeModelServer(
+        rpm=100000,
+        tpm=10**9,
+        latency=args.latency,
+        reply=reply,
+        token_delay=args.token_delay,
+    )
+
+    print(
+        f"Resposta de {args.words} palavras, {args.token_delay * 1000:.0f} ms por token, "
+        f"{args.latency}s até o primeiro token"
+    )
+    print(f"{'modo':>10} | {'1ª mensagem (s)':>15} | {'total (s)':>9} | {'envios':>6}")
+
+    with serve_fake_model(model) as base_url:
+        os.environ["OPENAI_BASE_URL"] = base_url
+        for name, run in (("completo", _buffered), ("streaming", _streamed)):
+            sent_at: list[float] = []
+            with serve_fake_evolution(sent_at) as evolution_url:
+                evolution = EvolutionIntegration()
+                evolution.base_url = evolution_url
+                client = OpenaiIntegration()
+                client.rate_limiter = None
+
+                start = time.perf_counter()
+                asyncio.run(run(client, evolution))
+                total = time.perf_counter() - start
+
+            print(
+                f"{name:>10} | {sent_at[0] - start:>15.2f} | {total:>9.2f} | "
+                f"{len(sent_at):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
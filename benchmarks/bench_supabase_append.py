@@ -0,0 +1,220 @@
+"""
+Compara o save/get_history do Supabase no caminho atual (select da linha
+inteira, append em Python e update do array) com as funções de
+supabase/migrations (append e corte no servidor em uma chamada).
+
+Vários escritores concorrentes anexam mensagens às mesmas conversas; ao final
+conta quantas mensagens de fato ficaram salvas (o caminho atual perde as
+escritas que se sobrepõem). Depois mede a leitura do histórico.
+
+Uso (requer um Supabase local, ex. `supabase start` com as migrations
+aplicadas, em SUPABASE_URL/SUPABASE_KEY; apaga as conversas bench-*):
+    python -m benchmarks.bench_supabase_append [--writers 8] [--conversations 20] [--turns 400]
+
+Com --dsn fala direto com o Postgres (sem o PostgREST), executando o mesmo SQL
+dos dois caminhos; requer psycopg (`pip install "psycopg[binary]"`):
+    python -m benchmarks.bench_supabase_append --dsn postgresql://postgres@localhost/postgres
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+import argparse
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from app.database.supabaseApp import HISTORY_LIMIT, Supabase
+
+
+def _message(index: int) -> dict[str, Any]:
+    return {
+        "role": "user",
+        "content": [{"type": "input_text", "text": f"Mensagem {index} " * 20}],
+        "id": uuid.uuid4().hex,
+    }
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+class _SupabasePaths:
+    """Os dois caminhos pelo cliente do Supabase (PostgREST)"""
+
+    def __init__(self, atomic: bool) -> None:
+        self.db = Supabase(atomic_append=atomic)
+        assert self.db.client is not None and self.db.is_healthy
+        self.table = self.db.client.table(self.db.conversations_table)
+
+    def reset(self, phones: list[str]) -> None:
+        self.table.delete().like("phone_number", "bench-%").execute()
+        # Conversas já existentes: o insert concorrente do caminho atual
+        # violaria o índice único e não mediria a perda de escritas
+        self.table.insert(
+            [{"phone_number": phone, "messages": []} for phone in phones]
+        ).execute()
+
+    def cleanup(self) -> None:
+        self.table.delete().like("phone_number", "bench-%").execute()
+
+    def save(self, phone_number: str, message: dict[str, Any]) -> None:
+        self.db.save(phone_number, message)
+
+    def get_history(self, phone_number: str, limit: int) -> list[dict[str, Any]]:
+        return self.db.get_history(phone_number, limit=limit)
+
+
+class _PostgresPaths:
+    """O mesmo SQL dos dois caminhos, direto no Postgres (uma conexão por thread)"""
+
+    def __init__(self, atomic: bool, dsn: str) -> None:
+        try:
+            import psycopg
+            from psycopg.rows import dict_row
+            from psycopg.types.json import Jsonb
+        except ImportError as e:
+            raise SystemExit(
+                '--dsn requer psycopg: pip install "psycopg[binary]"'
+            ) from e
+        self._connect = lambda: psycopg.connect(
+            dsn, autocommit=True, row_factory=dict_row
+        )
+        self._jsonb = Jsonb
+        self.atomic = atomic
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> Any:
+        if not hasattr(self._local, "conn"):
+            self._local.conn = self._connect()
+        return self._local.conn
+
+    def reset(self, phones: list[str]) -> None:
+        self.cleanup()
+        with self.conn.cursor() as cursor:
+            cursor.executemany(
+                "insert into conversations (phone_number, messages) values (%s, '[]')",
+                [(phone,) for phone in phones],
+            )
+
+    def cleanup(self) -> None:
+        self.conn.execute("delete from conversations where phone_number like 'bench-%'")
+
+    def save(self, phone_number: str, message: dict[str, Any]) -> None:
+        if self.atomic:
+            self.conn.execute(
+                "select append_conversation_messages(%s, %s)",
+                (self._jsonb({phone_number: [message]}), HISTORY_LIMIT),
+            )
+            return
+        # Caminho atual: lê a linha inteira, anexa no cliente e grava o array
+        row = self.conn.execute(
+            "select * from conversations where phone_number = %s", (phone_number,)
+        ).fetchone()
+        history = (row["messages"] if row else []) + [message]
+        self.conn.execute(
+            "update conversations set messages = %s, update_at = now(), "
+            "expires_at = now() + interval '1 day' where phone_number = %s",
+            (self._jsonb(history[-HISTORY_LIMIT:]), phone_number),
+        )
+
+    def get_history(self, phone_number: str, limit: int) -> list[dict[str, Any]]:
+        if self.atomic:
+            row = self.conn.execute(
+                "select get_conversation_history(%s, %s)", (phone_number, limit)
+            ).fetchone()
+            return row["get_conversation_history"] or []
+        row = self.conn.execute(
+            "select * from conversations where phone_number = %s", (phone_number,)
+        ).fetchone()
+        return (row["messages"] if row else [])[-limit:]
+
+
+def _run(atomic: bool, args: argparse.Namespace) -> dict[str, Any]:
+    paths: Any = (
+        _PostgresPaths(atomic, args.dsn) if args.dsn else _SupabasePaths(atomic)
+    )
+
+    phones = [f"bench-{index}" for index in range(args.conversations)]
+    paths.reset(phones)
+    # Cada escritor percorre as conversas em rodízio; nenhuma passa de
+    # HISTORY_LIMIT mensagens, então nada é cortado e toda perda é real
+    per_writer = min(
+        args.turns, (HISTORY_LIMIT - 1) // args.writers * args.conversations
+    )
+    sent = {phone: 0 for phone in phones}
+    plan = [
+        [phones[(offset + index) % len(phones)] for index in range(per_writer)]
+        for offset in range(args.writers)
+    ]
+    for writer in plan:
+        for phone in writer:
+            sent[phone] += 1
+
+    latencies: list[float] = []
+
+    def write(targets: list[str]) -> None:
+        for index, phone in enumerate(targets):
+            started = time.perf_counter()
+            paths.save(phone, _message(index))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.writers) as pool:
+        list(pool.map(write, plan))
+    elapsed = time.perf_counter() - started
+
+    stored = sum(len(paths.get_history(phone, HISTORY_LIMIT)) for phone in phones)
+
+    reads: list[float] = []
+    for _ in range(args.reads):
+        phone = random.choice(phones)
+        started_read = time.perf_counter()
+        paths.get_history(phone, args.limit)
+        reads.append(time.perf_counter() - started_read)
+
+    paths.cleanup()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "write": _percentiles(latencies),
+        "read": _percentiles(reads),
+        "lost": sum(sent.values()) - stored,
+        "sent": sum(sent.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=400, help="Escritas por escritor")
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--dsn", help="Postgres direto, sem o PostgREST (psycopg)")
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} escritores, {args.conversations} conversas, "
+        f"leitura de {args.limit} mensagens"
+        + (" (Postgres direto)" if args.dsn else "")
+    )
+    print(
+        f"{'caminho':>8} | {'escritas/s':>10} | {'escrita p50/p95 (ms)':>21} | "
+        f"{'leitura p50/p95 (ms)':>21} | {'perdidas':>13}"
+    )
+    for atomic in (False, True):
+        result = _run(atomic, args)
+        write, read = result["write"], result["read"]
+        print(
+            f"{'rpc' if atomic else 'atual':>8} | {result['throughput']:10.1f} | "
+            f"{write[0] * 1000:9.2f} / {write[1] * 1000:9.2f} | "
+            f"{read[0] * 1000:9.2f} / {read[1] * 1000:9.2f} | "
+            f"{result['lost']:6d}/{result['sent']:<6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
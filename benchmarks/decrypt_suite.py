@@ -0,0 +1,192 @@
+"""
+Suíte de benchmarks da descriptografia e do pipeline de mídia.
+
+Gera mídias criptografadas no formato do WhatsApp para cada tipo de appInfo
+e classe de tamanho, serve os arquivos por um servidor HTTP local e mede:
+
+- hkdf: derivação de chaves (_HKDF)
+- aes_decrypt: descriptografia em memória (_AESDecrypt)
+- decrypt_by_name: descriptografia em streaming de arquivo local
+- decrypt_by_link: download + descriptografia + escrita (caminho completo)
+
+Para cada caso são reportados percentis de latência, vazão e pico de memória
+alocada, em JSON, para acompanhar regressões entre versões.
+
+Uso:
+    python -m benchmarks.decrypt_suite [--types image,audio] \\
+        [--sizes small,medium,large] [--output resultado.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from app.core.config import Config
+from app.integrations.decrypt import (
+    _AESDecrypt,
+    _HKDF,
+    appInfo,
+    decryptByLink,
+    decryptByName,
+)
+from benchmarks.fixtures import MB, SIZE_CLASSES, EncryptedFixture, build_fixtures
+from benchmarks.http_server import serve_directory
+
+# Número de repetições por classe de tamanho
+ITERATIONS: dict[str, int] = {"small": 50, "medium": 20, "large": 5}
+HKDF_ITERATIONS = 1000
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _measure(
+    fn: Callable[[], Any], iterations: int, size: int | None = None
+) -> dict[str, Any]:
+    """Executa `fn` repetidamente e resume latência, vazão e pico de memória"""
+    fn()  # aquecimento
+
+    samples: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    # Pico de memória medido numa execução separada (tracemalloc distorce o tempo)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = statistics.fmean(samples)
+    result: dict[str, Any] = {
+        "iterations": iterations,
+        "latency_ms": {
+            "mean": mean * 1000,
+            "p50": _percentile(samples, 50) * 1000,
+            "p90": _percentile(samples, 90) * 1000,
+            "p99": _percentile(samples, 99) * 1000,
+            "max": max(samples) * 1000,
+        },
+        "peak_memory_mb": peak / MB,
+    }
+    if size is not None:
+        result["throughput_mb_s"] = size / MB / mean
+    else:
+        result["ops_per_s"] = 1 / mean
+    return result
+
+
+def _bench_fixture(
+    fixture: EncryptedFixture, base_url: str, workdir: str
+) -> list[dict[str, Any]]:
+    iterations = ITERATIONS[fixture.size_class]
+    case = {
+        "media_type": fixture.media_type,
+        "size_class": fixture.size_class,
+        "size_bytes": fixture.size,
+    }
+
+    mediaKeyExpanded = _HKDF(fixture.media_key, 112, appInfo[fixture.media_type])
+    with open(fixture.path, "rb") as f:
+        encrypted = f.read()
+    output = os.path.join(workdir, "decrypted.out").encode()
+    link = f"{base_url}/{fixture.filename}"
+
+    def aes_decrypt() -> None:
+        _AESDecrypt(mediaKeyExpanded[16:48], encrypted[:-10], mediaKeyExpanded[:16])
+
+    def decrypt_by_name() -> None:
+        if not decryptByName(
+            fixture.path.encode(), fixture.media_key, fixture.media_type, output
+        ):
+            raise RuntimeError(f"decryptByName falhou para {fixture.filename}")
+
+    def decrypt_by_link() -> None:
+        decryptByLink(link, fixture.media_key, fixture.media_type, output="link.out")
+
+    stages: list[tuple[str, Callable[[], None]]] = [
+        ("aes_decrypt", aes_decrypt),
+        ("decrypt_by_name", decrypt_by_name),
+        ("decrypt_by_link", decrypt_by_link),
+    ]
+    return [
+        {"stage": stage, **case, **_measure(fn, iterations, fixture.size)}
+        for stage, fn in stages
+    ]
+
+
+def run_suite(media_types: list[str], size_classes: list[str]) -> dict[str, Any]:
+    results: list[dict[str, Any]] = []
+
+    for media_type in media_types:
+        results.append(
+            {
+                "stage": "hkdf",
+                "media_type": media_type,
+                **_measure(
+                    lambda: _HKDF(os.urandom(32), 112, appInfo[media_type]),
+                    HKDF_ITERATIONS,
+                ),
+            }
+        )
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as fixtures_dir, tempfile.TemporaryDirectory() as workdir:
+        fixtures = build_fixtures(fixtures_dir, media_types, size_classes)
+        # decryptByLink grava em ./static, então isolamos o diretório de trabalho
+        os.chdir(workdir)
+        try:
+            with serve_directory(fixtures_dir) as base_url:
+                for fixture in fixtures:
+                    print(
+                        f"{fixture.media_type} / {fixture.size_class}...",
+                        file=sys.stderr,
+                    )
+                    results.extend(_bench_fixture(fixture, base_url, workdir))
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "decrypt_chunk_size": Config.DECRYPT_CHUNK_SIZE,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--types", default=",".join(appInfo))
+    parser.add_argument("--sizes", default=",".join(SIZE_CLASSES))
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    report = run_suite(args.types.split(","), args.sizes.split(","))
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Servidor local que imita o Responses API da OpenAI nos benchmarks.
+
+Aplica um limite próprio de requisições e tokens por minuto (respondendo 429
+com retry-after-ms quando excedido), simula a latência do modelo e informa o
+uso de tokens na resposta. Com "stream": true a resposta é enviada como
+eventos SSE, um token (palavra) a cada `token_delay` segundos.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+import json
+import threading
+import time
+
+
+@dataclass
+class FakeModelStats:
+    requests: int = 0
+    rate_limited: int = 0
+    completed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class _Bucket:
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def wait_for(self, amount: float) -> float:
+        """Recarrega o bucket e retorna 0, ou os segundos até haver `amount`"""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.capacity / 60
+        )
+        self.updated = now
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+
+class FakeModelServer:
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        latency: float = 0.2,
+        output_tokens: int = 50,
+        reply: str = "Olá! Como posso ajudar?",
+        token_delay: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.reply = reply
+        self.token_delay = token_delay
+        self.stats = FakeModelStats()
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+
+    def _admit(self, input_tokens: int) -> float:
+        """Retorna 0 se a requisição cabe nos limites, ou os segundos de espera"""
+        with self.stats.lock:
+            self.stats.requests += 1
+            wait = max(self._requests.wait_for(1), self._tokens.wait_for(input_tokens))
+            if wait == 0:
+                self._requests.tokens -= 1
+                self._tokens.tokens -= input_tokens
+            else:
+                self.stats.rate_limited += 1
+            return wait
+
+    def response_body(self, input_tokens: int) -> dict[str, Any]:
+        return {
+            "id": f"resp_{time.monotonic_ns()}",
+            "object": "response",
+            "status": "completed",
+            "output": [
+                {
+                    "type": "message",
+                    "id": "msg_fake",
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [
+                        {"type": "output_text", "text": self.reply, "annotations": []}
+                    ],
+                }
+            ],
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": input_tokens + self.output_tokens,
+            },
+        }
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send_json(
+                self, status: int, body: Any, headers: dict[str, str] | None = None
+            ) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, input_tokens: int) -> None:
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(body: dict[str, Any]) -> None:
+                    data = json.dumps(body)
+                    self.wfile.write(
+                        f"event: {body['type']}\ndata: {data}\n\n".encode()
+                    )
+                    self.wfile.flush()
+
+                tokens = server.reply.split(" ")
+                for index, token in enumerate(tokens):
+                    time.sleep(server.token_delay)
+                    event(
+                        {
+                            "type": "response.output_text.delta",
+                            "item_id": "msg_fake",
+                            "output_index": 0,
+                            "content_index": 0,
+                            "sequence_number": index,
+                            "delta": token if index == 0 else f" {token}",
+                        }
+                    )
+                event(
+                    {
+                        "type": "response.completed",
+                        "sequence_number": len(tokens),
+                        "response": server.response_body(input_tokens),
+                    }
+                )
+
+            def do_POST(self) -> None:
+                raw = self.rfile.read(int(self.headers.get("content-length", 0)))
+                input_tokens = max(1, len(raw) // 4)
+                streaming = json.loads(raw or b"{}").get("stream", False)
+
+                wait = server._admit(input_tokens)
+                if wait > 0:
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit", "type": "rate_limit"}},
+                        {"retry-after-ms": str(int(wait * 1000) + 1)},
+                    )
+                    return
+
+                time.sleep(server.latency)
+                if streaming:
+                    self._send_stream(input_tokens)
+                else:
+                    # Sem streaming a resposta só sai após gerar todos os tokens
+                    time.sleep(server.token_delay * len(server.reply.split(" ")))
+                    self._send_json(200, server.response_body(input_tokens))
+                with server.stats.lock:
+                    server.stats.completed += 1
+
+        return Handler
+
+
+@contextmanager
+def serve_fake_model(model: FakeModelServer) -> Iterator[str]:
+    """Sobe o servidor numa porta livre e retorna a base_url para o cliente da OpenAI"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), model.handler())
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = httpd.server_address[:2]
+        yield f"http://{host}:{port}/v1"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,89 @@
+"""
+Geração de mídias criptografadas no formato do WhatsApp para benchmarks.
+
+As chaves são derivadas com o mesmo _HKDF usado em produção, de modo que os
+arquivos gerados podem ser lidos por decryptByName/decryptByLink.
+"""
+
+from Crypto.Cipher import AES
+from dataclasses import dataclass
+from typing import Iterator
+import hashlib
+import hmac
+import os
+
+from app.integrations.decrypt import AES_BLOCK_SIZE, MAC_LENGTH, _HKDF, appInfo
+
+KB = 1024
+MB = 1024 * KB
+
+# Classes de tamanho usadas pela suíte de benchmarks
+SIZE_CLASSES: dict[str, int] = {
+    "small": 16 * KB,
+    "medium": 1 * MB,
+    "large": 16 * MB,
+}
+
+
+@dataclass(frozen=True)
+class EncryptedFixture:
+    path: str
+    media_type: str
+    size_class: str
+    size: int
+    media_key: bytes
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+
+def iter_encrypted(
+    size: int, mediaKey: bytes, mediaType: str, chunk_size: int = MB
+) -> Iterator[bytes]:
+    """Gera, em blocos, uma mídia criptografada com `size` bytes de plaintext aleatório"""
+    mediaKeyExpanded = _HKDF(mediaKey, 112, appInfo[mediaType])
+    iv = mediaKeyExpanded[:16]
+    cipher = AES.new(mediaKeyExpanded[16:48], AES.MODE_CBC, iv)
+    mac = hmac.new(mediaKeyExpanded[48:80], iv, hashlib.sha256)
+
+    chunk_size -= chunk_size % AES_BLOCK_SIZE
+    remaining = size
+    while remaining >= chunk_size:
+        block = cipher.encrypt(os.urandom(chunk_size))
+        mac.update(block)
+        remaining -= chunk_size
+        yield block
+
+    padding = AES_BLOCK_SIZE - remaining % AES_BLOCK_SIZE
+    block = cipher.encrypt(os.urandom(remaining) + bytes([padding]) * padding)
+    mac.update(block)
+    yield block
+    yield mac.digest()[:MAC_LENGTH]
+
+
+def write_encrypted(path: str, size: int, mediaKey: bytes, mediaType: str) -> str:
+    """Escreve uma mídia criptografada em disco e retorna o caminho"""
+    with open(path, "wb") as f:
+        for block in iter_encrypted(size, mediaKey, mediaType):
+            f.write(block)
+    return path
+
+
+def build_fixtures(
+    directory: str, media_types: list[str], size_classes: list[str]
+) -> list[EncryptedFixture]:
+    """Gera uma mídia criptografada para cada combinação de tipo e classe de tamanho"""
+    fixtures: list[EncryptedFixture] = []
+    for media_type in media_types:
+        for size_class in size_classes:
+            size = SIZE_CLASSES[size_class]
+            media_key = os.urandom(32)
+            name = f"{media_type.replace('/', '_')}-{size_class}.enc"
+            path = write_encrypted(
+                os.path.join(directory, name), size, media_key, media_type
+            )
+            fixtures.append(
+                EncryptedFixture(path, media_type, size_class, size, media_key)
+            )
+    return fixtures
@@ -0,0 +1,148 @@
+"""
+Reprocessa os batches guardados no dead-letter.
+
+    python replay.py list [--phone NUMERO] [--stage process|openai|delivered]
+    python replay.py replay [IDS...] [--phone NUMERO] [--stage ...] [--concurrency 8]
+    python replay.py drop IDS...
+
+Os batches de um mesmo número são reprocessados em ordem; números diferentes
+rodam em paralelo até o limite de --concurrency. Na etapa "delivered" a
+resposta já foi enviada: o replay só grava o histórico, sem chamar o modelo.
+"""
+
+from typing import Any
+import argparse
+import asyncio
+import logging
+import time
+
+from app import configure_logging
+from app.core.config import Config
+from app.services.conversationSummarizer import conversation_summarizer
+from app.services.deadLetters import BatchError, dead_letters
+from app.services.decryptExecutor import decrypt_executor
+from app.services.deliveryQueue import delivery_queue
+from app.services.fileJanitor import file_janitor
+from app.services.historyWriter import history_writer
+from app.services.messageProcessor import MessageProcessor
+from app.services.outbox import outbox
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _select(args: argparse.Namespace) -> list[dict[str, Any]]:
+    entries = dead_letters.list(phone_number=args.phone, stage=args.stage)
+    if getattr(args, "ids", None):
+        entries = [e for e in entries if e["id"] in args.ids]
+    return entries
+
+
+def list_entries(args: argparse.Namespace) -> None:
+    entries = _select(args)
+    for entry in entries:
+        created = time.strftime(
+            "%d-%m-%Y %H:%M:%S", time.localtime(float(entry["created_at"]))
+        )
+        print(
+            f"{entry['id']}  {created}  {entry['phone_number']}  "
+            f"etapa={entry['stage']}  mensagens={len(entry['raw_messages'])}  "
+            f"tentativas={entry['attempts']}  {entry['error']}"
+        )
+    print(f"{len(entries)} batches no dead-letter")
+
+
+async def replay_entries(args: argparse.Namespace) -> int:
+    entries = _select(args)
+    if not entries:
+        print("Nenhum batch para reprocessar")
+        return 0
+
+    processor = MessageProcessor()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    by_phone: dict[str, list[dict[str, Any]]] = {}
+    for entry in entries:
+        by_phone.setdefault(entry["phone_number"], []).append(entry)
+
+    results = {"ok": 0, "failed": 0}
+
+    async def replay_phone(phone_number: str, items: list[dict[str, Any]]) -> None:
+        async with semaphore:
+            for entry in items:
+                try:
+                    if entry["stage"] == "delivered":
+                        await processor.save_delivered_reply(
+                            phone_number, entry["raw_messages"], entry["records"]
+                        )
+                    else:
+                        await processor.process_raw_messages(
+                            phone_number, entry["raw_messages"], stage=entry["stage"]
+                        )
+                except BatchError as e:
+                    dead_letters.mark_failed(entry["id"], e)
+                    results["failed"] += 1
+                    logger.error(f"Replay de {entry['id']} falhou: {e}")
+                    # Não adianta seguir com os próximos: a ordem da conversa mudaria
+                    break
+                dead_letters.remove(entry["id"])
+                results["ok"] += 1
+                logger.info(f"Batch {entry['id']} de {phone_number} reprocessado")
+
+    file_janitor.start()
+    if Config.OUTBOX_ENABLED:
+        outbox.start()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(replay_phone(phone, items) for phone, items in by_phone.items())
+        )
+    finally:
+        if Config.OUTBOX_ENABLED:
+            # Tenta entregar o que foi gerado; o que falhar fica para o serviço
+            await outbox.dispatch_due()
+            await outbox.stop()
+        await history_writer.shutdown()
+        await conversation_summarizer.shutdown()
+        await delivery_queue.shutdown()
+        decrypt_executor.shutdown()
+        file_janitor.stop()
+
+    print(
+        f"{results['ok']} reprocessados, {results['failed']} falharam "
+        f"({len(by_phone)} números) em {time.perf_counter() - started:.1f}s"
+    )
+    return 1 if results["failed"] else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("list", "replay"):
+        command = commands.add_parser(name)
+        command.add_argument("--phone", help="Só os batches deste número")
+        command.add_argument("--stage", choices=["process", "openai", "delivered"])
+    commands.choices["replay"].add_argument("ids", nargs="*", help="Padrão: todos")
+    commands.choices["replay"].add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Números reprocessados ao mesmo tempo",
+    )
+    commands.add_parser("drop").add_argument("ids", nargs="+")
+
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == "list":
+        list_entries(args)
+        return 0
+    if args.command == "drop":
+        for entry_id in args.ids:
+            dead_letters.remove(entry_id)
+        print(f"{len(args.ids)} batches removidos")
+        return 0
+    return asyncio.run(replay_entries(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,10 @@
+-- Tabela do histórico usada por app/database/supabaseApp.py. Em projetos que
+-- já têm a tabela (criada pelo painel do Supabase) não altera nada.
+create table if not exists public.conversations (
+    id bigint generated by default as identity primary key,
+    phone_number text not null,
+    messages jsonb not null default '[]'::jsonb,
+    created_at timestamptz not null default now(),
+    update_at timestamptz not null default now(),
+    expires_at timestamptz
+);
@@ -0,0 +1,6 @@
+-- Resumo incremental das mensagens antigas (SUMMARY_ENABLED): texto do resumo,
+-- id da última mensagem resumida e data da última atualização.
+alter table public.conversations
+    add column if not exists summary text,
+    add column if not exists summary_last_id text,
+    add column if not exists summary_updated_at timestamptz;
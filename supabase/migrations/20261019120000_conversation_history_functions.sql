@@ -0,0 +1,69 @@
+-- Funções usadas com SUPABASE_ATOMIC_APPEND=true: anexam e cortam o histórico
+-- no servidor em uma única chamada e leem só o fim do array de mensagens.
+-- Supõe a tabela conversations com messages jsonb.
+
+-- O upsert precisa de unicidade por telefone (remova linhas duplicadas antes)
+create unique index if not exists conversations_phone_number_key
+    on public.conversations (phone_number);
+
+-- Últimos p_limit elementos de um array jsonb
+create or replace function public.jsonb_array_tail(p_items jsonb, p_limit integer)
+returns jsonb
+language sql
+immutable
+as $$
+    select case
+        when p_items is null or jsonb_typeof(p_items) <> 'array' then '[]'::jsonb
+        when p_limit <= 0 then '[]'::jsonb
+        when jsonb_array_length(p_items) <= p_limit then p_items
+        -- Fatia por jsonpath: bem mais rápido que desmontar e reagregar o array
+        else jsonb_path_query_array(
+            p_items,
+            '$[$start to last]',
+            jsonb_build_object('start', jsonb_array_length(p_items) - p_limit)
+        )
+    end
+$$;
+
+-- Anexa as mensagens de várias conversas ({"telefone": [mensagens]}) e mantém
+-- as últimas p_max_messages. O upsert trava a linha: escritas concorrentes na
+-- mesma conversa não se perdem.
+create or replace function public.append_conversation_messages(
+    p_batches jsonb,
+    p_max_messages integer default 100,
+    p_ttl interval default interval '1 day'
+)
+returns void
+language sql
+as $$
+    insert into public.conversations as c
+        (phone_number, messages, created_at, update_at, expires_at)
+    select
+        batch.key,
+        public.jsonb_array_tail(batch.value, p_max_messages),
+        now(),
+        now(),
+        now() + p_ttl
+    from jsonb_each(p_batches) as batch
+    on conflict (phone_number) do update set
+        messages = public.jsonb_array_tail(
+            coalesce(c.messages, '[]'::jsonb) || excluded.messages,
+            p_max_messages
+        ),
+        update_at = excluded.update_at,
+        expires_at = excluded.expires_at
+$$;
+
+-- Últimas p_limit mensagens da conversa (null quando não existe)
+create or replace function public.get_conversation_history(
+    p_phone_number text,
+    p_limit integer
+)
+returns jsonb
+language sql
+stable
+as $$
+    select public.jsonb_array_tail(c.messages, p_limit)
+    from public.conversations as c
+    where c.phone_number = p_phone_number
+$$;
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.integrations.openaiIntegration import OpenaiIntegration
+from app.models.contentItem import ContentItem
+from app.models.message import Message
+from app.models.whatsappMessage import WhatsappMessage
+from app.utils.textChunker import SentenceChunker
+
+
+def _delta(text: str) -> SimpleNamespace:
+    return SimpleNamespace(type="response.output_text.delta", delta=text)
+
+
+def test_flush_partial_sem_trecho_reinicia_prazo():
+    chunker = SentenceChunker(min_chars=80)
+    chunker.feed("Oi")
+    chunker.buffered_since -= 10
+    expired = chunker.buffered_since
+
+    assert chunker.flush_partial() == ""
+    assert chunker.buffered_since > expired
+    assert chunker.buffer == "Oi"
+
+
+def _zap_message() -> WhatsappMessage:
+    return WhatsappMessage(
+        to_number="5500000000000",
+        message=Message(
+            role="user", content=[ContentItem(type="input_text", text="Oi")]
+        ),
+    )
+
+
+def test_stream_continua_apos_flush_sem_trecho():
+    """Delta curto, pausa maior que o flush_timeout e mais deltas: não pode travar"""
+
+    async def stream():
+        yield _delta("Oi")
+        await asyncio.sleep(0.2)
+        yield _delta(", tudo bem?")
+        yield _delta(" Como posso ajudar")
+        yield SimpleNamespace(
+            type="response.completed", response=SimpleNamespace(id="resp_1", usage=None)
+        )
+
+    async def fake_create(breaker, params, tokens, use_semaphore=True):
+        return stream()
+
+    integration = OpenaiIntegration()
+    integration._create = fake_create
+    zapMessage = _zap_message()
+    chunks: list[str] = []
+
+    async def on_chunk(chunk: str) -> None:
+        chunks.append(chunk)
+
+    asyncio.run(
+        asyncio.wait_for(
+            integration.astream_response(
+                zapMessage, on_chunk, min_chars=80, flush_timeout=0.05
+            ),
+            timeout=2,
+        )
+    )
+
+    assert " ".join(chunks) == "Oi, tudo bem? Como posso ajudar"
+    assert zapMessage.message.content[0].text == "Oi, tudo bem? Como posso ajudar"
+    assert zapMessage.response_id == "resp_1"
+
+
+def test_stream_ocupa_vaga_do_semaforo_ate_terminar():
+    """Com OPENAI_MAX_CONCURRENCY=1 o segundo stream só abre após o primeiro terminar"""
+    events: list[str] = []
+
+    def stream(name: str):
+        async def events_of_stream():
+            events.append(f"{name} inicio")
+            yield _delta(f"Resposta {name}.")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} fim")
+            yield SimpleNamespace(
+                type="response.completed",
+                response=SimpleNamespace(id=name, usage=None),
+            )
+
+        return events_of_stream()
+
+    names = iter(["a", "b"])
+
+    async def fake_create(breaker, params, tokens, use_semaphore=True):
+        return stream(next(names))
+
+    integration = OpenaiIntegration()
+    integration.max_concurrency = 1
+    integration._create = fake_create
+
+    async def on_chunk(chunk: str) -> None:
+        pass
+
+    async def main() -> None:
+        await asyncio.gather(
+            integration.astream_response(_zap_message(), on_chunk),
+            integration.astream_response(_zap_message(), on_chunk),
+        )
+
+    asyncio.run(asyncio.wait_for(main(), timeout=2))
+
+    assert events == ["a inicio", "a fim", "b inicio", "b fim"]